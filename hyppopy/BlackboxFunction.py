@@ -16,6 +16,7 @@ import os
 import logging
 import functools
 from hyppopy.globals import DEBUGLEVEL
+from hyppopy.Pruning import TrialPruned
 
 LOG = logging.getLogger(os.path.basename(__file__))
 LOG.setLevel(DEBUGLEVEL)
@@ -74,22 +75,32 @@ class BlackboxFunction(object):
 
     def __call__(self, **kwargs):
         """
-        Call method calls blackbox_func passing the data object and the args passed
+        Call method calls blackbox_func passing the data object and the args passed. A reporter arg is not part of the
+        parameter set, it is passed on as keyword argument reporter.
 
         :param kwargs: [dict] args
 
         :return: blackbox_func(data, kwargs)
         """
+        extra = {}
+        if "reporter" in kwargs:
+            extra["reporter"] = kwargs.pop("reporter")
         try:
             try:
-                return self.blackbox_func(self.data, kwargs)
+                return self.blackbox_func(self.data, kwargs, **extra)
+            except TrialPruned:
+                raise
             except:
-                return self.blackbox_func(self.data, **kwargs)
+                return self.blackbox_func(self.data, **kwargs, **extra)
+        except TrialPruned:
+            raise
         except:
             try:
-                return self.blackbox_func(kwargs)
+                return self.blackbox_func(kwargs, **extra)
+            except TrialPruned:
+                raise
             except:
-                return self.blackbox_func(**kwargs)
+                return self.blackbox_func(**kwargs, **extra)
 
     def setup(self, kwargs):
         """
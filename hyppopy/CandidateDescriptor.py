@@ -1,24 +1,34 @@
+import itertools
+import collections
+import numpy as np
+
+
 class CandidateDescriptor(object):
     """
     Descriptor that defines an candidate the solver wants to be checked.
     It is used to lable/identify the candidates and their results in the case of batch processing.
     """
 
+    __slots__ = ('_definingValues', 'ID', '_hash')
+
+    _ids = itertools.count()
+
     def __init__(self, **definingValues):
         """
         @param definingValues Class assumes that all variables passed to the computer are parameters of the candidate
         the instance should represent.
         """
-        import uuid
-
         self._definingValues = definingValues
+        self.ID = next(CandidateDescriptor._ids)
+        self._hash = None
 
-        self._definingStr = str()
+    def __getstate__(self):
+        # the cached hash is not transferred, string hashes differ between processes
+        return self._definingValues, self.ID
 
-        for item in sorted(definingValues.items()):
-            self._definingStr = self._definingStr + "'" + str(item[0]) + "':'" + str(item[1]) + "',"
-
-        self.ID = str(uuid.uuid4())
+    def __setstate__(self, state):
+        self._definingValues, self.ID = state
+        self._hash = None
 
     def __missing__(self, key):
         return None
@@ -36,7 +46,14 @@ class CandidateDescriptor(object):
             return False
 
     def __hash__(self):
-        return hash(self._definingStr)
+        if self._hash is None:
+            items = tuple(sorted(self._definingValues.items()))
+            try:
+                self._hash = hash(items)
+            except TypeError:
+                # unhashable values, e.g. lists, are hashed by their string representation
+                self._hash = hash(str(items))
+        return self._hash
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -59,50 +76,128 @@ class CandidateDescriptor(object):
         return self._definingValues
 
 
-class CandicateDescriptorWrapper:
+class CandidateBatch(object):
+    """
+    Struct of arrays container of a batch of candidates. Each parameter is kept as numpy column, so bound checks are
+    answered by vectorized comparisons and vectorized blackboxes can work on the columns directly. CandidateDescriptors
+    are only created when converting at the edges via to_candidates.
+    """
+
+    class Column(object):
+        """
+        Column of a CandidateBatch, a comparison holds if it holds for all values of the column. This allows
+        constraint checks written for single values, e.g. lb < value < ub, to be applied to a whole batch.
+        """
 
-    class InternalCandidateValueWrapper:
-        def __init__(self, value_list):
-            self._value_list = value_list
+        def __init__(self, values):
+            self._values = values
 
         def __gt__(self, other):
-            boundary_condition = True
-            for value in self._value_list:
-                if value > other:
-                    continue
-                else:
-                    boundary_condition = False
-                    break
-            return boundary_condition
+            return bool(np.all(self._values > other))
 
         def __lt__(self, other):
-            boundary_condition = True
-            for value in self._value_list:
-                if value < other:
-                    continue
-                else:
-                    boundary_condition = False
-                    break
-            return boundary_condition
+            return bool(np.all(self._values < other))
+
+        def __ge__(self, other):
+            return bool(np.all(self._values >= other))
+
+        def __le__(self, other):
+            return bool(np.all(self._values <= other))
 
         def get(self):
-            return self._value_list
+            return self._values
+
+    def __init__(self, columns, candidates=None):
+        """
+        @param columns dict of parameter name and value array pairs, all arrays need to have the same length
+        @param candidates list of CandidateDescriptors the columns were built from, their IDs are kept by to_candidates
+        """
+        self._columns = collections.OrderedDict((key, np.asarray(values)) for key, values in columns.items())
+        lengths = set(len(values) for values in self._columns.values())
+        assert len(lengths) <= 1, "precondition violation, all columns need to have the same length!"
+        self._size = lengths.pop() if len(lengths) > 0 else 0
+        self._candidates = candidates
+
+    @classmethod
+    def from_dicts(cls, dicts, keys=None):
+        """
+        Creates a batch from a list of parameter dicts.
+
+        @param dicts list of dicts e.g. [{'p1': 0.1, 'p2': 'a'}, ...]
+        @param keys parameter names, if None the keys of the first dict are used
+        """
+        if keys is None:
+            keys = dicts[0].keys() if len(dicts) > 0 else []
+        return cls(collections.OrderedDict((key, [d[key] for d in dicts]) for key in keys))
+
+    @classmethod
+    def from_candidates(cls, candidates):
+        """
+        Creates a batch from a list of CandidateDescriptors.
 
-    def __init__(self, keys):
-        self._cand = None
-        self._keys = keys
+        @param candidates list of CandidateDescriptors sharing the same parameter names
+        """
+        keys = candidates[0].keys() if len(candidates) > 0 else []
+        return cls(collections.OrderedDict((key, [c[key] for c in candidates]) for key in keys), list(candidates))
+
+    def __len__(self):
+        return self._size
 
     def __iter__(self):
-        return iter(self._cand)
+        return iter(self.to_candidates())
+
+    def __contains__(self, key):
+        return key in self._columns
 
     def __getitem__(self, key):
-        return self.InternalCandidateValueWrapper([x[key] for x in self._cand])
+        if key in self._columns:
+            return self.Column(self._columns[key])
+        raise KeyError('Unkown column key was requested. Key: {}'.format(key))
 
     def keys(self):
-        return self._keys
+        return self._columns.keys()
+
+    def column(self, key):
+        return self._columns[key]
+
+    def in_box(self, box):
+        """
+        Checks all candidates against open range box constraints, i.e. lb < x < ub.
+
+        @param box dict of parameter name and [lb, ub] pairs
 
-    def set(self, obj):
-        self._cand = obj
+        @return boolean numpy array, True for the candidates satisfying all constraints
+        """
+        mask = np.ones(self._size, dtype=bool)
+        for key, (lb, ub) in box.items():
+            values = self._columns[key]
+            mask &= (lb < values) & (values < ub)
+        return mask
+
+    def select(self, mask):
+        """
+        Returns a batch of the candidates selected by a boolean mask or an index array.
+        """
+        candidates = None
+        if self._candidates is not None:
+            candidates = [self._candidates[i] for i in np.arange(self._size)[mask]]
+        return CandidateBatch(collections.OrderedDict((key, values[mask]) for key, values in self._columns.items()),
+                              candidates)
+
+    def to_dicts(self):
+        """
+        Returns the candidates as list of parameter dicts holding python values.
+        """
+        columns = [(key, values.tolist()) for key, values in self._columns.items()]
+        return [dict((key, values[i]) for key, values in columns) for i in range(self._size)]
+
+    def to_candidates(self):
+        """
+        Returns the candidates as list of CandidateDescriptors, the descriptors the batch was created from if available.
+        """
+        if self._candidates is None:
+            self._candidates = [CandidateDescriptor(**params) for params in self.to_dicts()]
+        return self._candidates
 
     def get(self):
-        return self._cand
+        return self.to_candidates()
@@ -14,14 +14,29 @@ from hyppopy.BlackboxFunction import BlackboxFunction
 __all__ = ['MPIBlackboxFunction']
 
 import os
+import time
 import logging
+import datetime
 import functools
+import collections
+import numpy as np
 from hyppopy.globals import DEBUGLEVEL, MPI_TAGS
+from hyppopy.Pruning import accepts_keywords
+from hyppopy.MPIWireFormat import CandidateSchema, unpack_results
 from mpi4py import MPI
 
 LOG = logging.getLogger(os.path.basename(__file__))
 LOG.setLevel(DEBUGLEVEL)
 
+# chunk_size='auto' aims at a message overhead of at most this fraction of the evaluation time of a chunk
+AUTO_CHUNK_OVERHEAD = 0.1
+# weight of the latest measurement in the running estimates of evaluation time and message overhead
+AUTO_CHUNK_SMOOTHING = 0.3
+# arrays are broadcast in pieces of at most this many bytes, staying below the 2GB limit of int MPI counts
+MAX_MESSAGE_BYTES = 2 ** 30
+
+DATA_MODES = ('local', 'bcast', 'shared')
+
 
 def default_kwargs(**defaultKwargs):
     """
@@ -30,12 +45,92 @@ def default_kwargs(**defaultKwargs):
     def actual_decorator(fn):
         @functools.wraps(fn)
         def g(*args, **kwargs):
-            defaultKwargs.update(kwargs)
-            return fn(*args, **defaultKwargs)
+            merged = dict(defaultKwargs)
+            merged.update(kwargs)
+            return fn(*args, **merged)
         return g
     return actual_decorator
 
 
+def evaluate_params(blackbox, params, rank=0):
+    """
+    Evaluates a blackbox for a parameter set the way the worker ranks do, passing the data of a BlackboxFunction if the
+    loss function accepts it. Exceptions are logged and result in a nan loss.
+
+    :param blackbox: [object] BlackboxFunction instance or function
+    :param params: [dict] hyperparameter set e.g. {'p1': 0.123, 'p2': 3.87, ...}
+    :param rank: [int] rank evaluating, used in the error message, default=0
+
+    :return: [dict] result e.g. {'loss': 0.5, 'book_time': ..., 'refresh_time': ...}
+    """
+    cand_results = dict()
+    cand_results['book_time'] = datetime.datetime.now()
+    try:
+        if accepts_keywords(blackbox, params.keys()):
+            loss = blackbox(**params)
+        else:
+            loss = blackbox(params)
+    except Exception as e:
+        msg = "Error in Worker(rank={}): {}".format(rank, e)
+        LOG.error(msg)
+        print(msg)
+        loss = np.nan
+    cand_results['loss'] = loss
+    cand_results['refresh_time'] = datetime.datetime.now()
+    return cand_results
+
+
+def split_arrays(data):
+    """
+    Splits a data object into numeric numpy arrays, which can be sent as raw buffers, and the rest, which is pickled.
+
+    :param data: [object] data object, a numpy array, a dict or any picklable object
+
+    :return: [tuple] (rest, arrays), arrays is a dict of the numeric arrays by dict key, or by None if data itself is
+             an array, rest is data without these arrays
+    """
+    def is_numeric(value):
+        return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+    if is_numeric(data):
+        return None, {None: data}
+    if isinstance(data, dict):
+        arrays = dict((key, value) for key, value in data.items() if is_numeric(value))
+        return dict((key, value) for key, value in data.items() if key not in arrays), arrays
+    return data, {}
+
+
+def join_arrays(rest, arrays):
+    """
+    Inverse of split_arrays.
+
+    :param rest: [object] data without the arrays
+    :param arrays: [dict] numeric arrays by key
+
+    :return: [object] data object
+    """
+    if None in arrays:
+        return arrays[None]
+    if isinstance(rest, dict):
+        data = dict(rest)
+        data.update(arrays)
+        return data
+    return rest
+
+
+def broadcast_buffer(comm, array, root=0):
+    """
+    Broadcasts the content of a contiguous array in place, in pieces of at most MAX_MESSAGE_BYTES.
+
+    :param comm: [MPI communicator] communicator
+    :param array: [ndarray] C-contiguous array, the source on root and the destination on the other ranks
+    :param root: [int] rank holding the data, default=0
+    """
+    flat = array.reshape(-1).view(np.uint8)
+    for start in range(0, flat.size, MAX_MESSAGE_BYTES):
+        comm.Bcast([flat[start:start + MAX_MESSAGE_BYTES], MPI.BYTE], root=root)
+
+
 class MPIBlackboxFunction(BlackboxFunction):
     """
     This class is a BlackboxFunction wrapper class encapsulating the loss function.
@@ -49,14 +144,48 @@ class MPIBlackboxFunction(BlackboxFunction):
     :param callback_func: callback function pointer, default=None
     :param data: data object, default=None
     :param mpi_comm: [MPI communicator] MPI communicator instance. If None, we create a new MPI.COMM_WORLD, default=None
+    :param in_flight: [int] number of messages a worker may have queued, further candidates are sent when it returns
+                      a result, default=1
+    :param chunk_size: [int or str] number of candidates sent per message, 'auto' tunes it from the measured evaluation
+                       time against the message round trip, default=1
+    :param data_mode: [str] how the worker ranks get the data, 'local': every rank runs dataloader_func and
+                      preprocess_func itself, 'bcast': only the master does and broadcasts the data once, 'shared': like
+                      'bcast' but the numeric arrays are placed in an MPI shared memory window per node, which all
+                      ranks of the node read without holding a copy. The data is distributed by distribute_data,
+                      MPISolverWrapper.run calls it, default='local'
+    :param master_evaluates: [bool] if True the master evaluates candidates of the batch too, one at a time and only
+                             while no worker result is waiting, so the workers keep being refilled. A worker finishing
+                             during an evaluation on the master waits for it, in_flight > 1 keeps it busy meanwhile,
+                             default=False
     :param kwargs: additional arg=value pairs
     """
 
-    @default_kwargs(blackbox_func=None, dataloader_func=None, preprocess_func=None, callback_func=None, data=None, mpi_comm=None)
+    @default_kwargs(blackbox_func=None, dataloader_func=None, preprocess_func=None, callback_func=None, data=None, mpi_comm=None, in_flight=1, chunk_size=1, data_mode='local', master_evaluates=False)
     def __init__(self, **kwargs):
         mpi_comm = kwargs['mpi_comm']
         del kwargs['mpi_comm']
+        assert kwargs['in_flight'] > 0, "precondition violation, in_flight needs to be greater than 0!"
+        self._in_flight = kwargs['in_flight']
+        del kwargs['in_flight']
+        assert kwargs['chunk_size'] == 'auto' or kwargs['chunk_size'] > 0, \
+            "precondition violation, chunk_size needs to be 'auto' or greater than 0!"
+        self._chunk_size = kwargs['chunk_size']
+        del kwargs['chunk_size']
+        if kwargs['data_mode'] not in DATA_MODES:
+            msg = "unknown data_mode {}, use one of {}!".format(kwargs['data_mode'], DATA_MODES)
+            LOG.error(msg)
+            raise LookupError(msg)
+        self._data_mode = kwargs['data_mode']
+        del kwargs['data_mode']
+        self._master_evaluates = bool(kwargs['master_evaluates'])
+        del kwargs['master_evaluates']
+        self._eval_time = None
+        self._message_overhead = None
         self._mpi_comm = None
+        self._worker_schemas = {}
+        self._windows = []
+        self._async_sent = None
+        self._async_local = collections.deque()
 
         if mpi_comm is None:
             print('MPIBlackboxFunction: No mpi_comm given: Using MPI.COMM_WORLD')
@@ -64,20 +193,276 @@ class MPIBlackboxFunction(BlackboxFunction):
         else:
             self._mpi_comm = mpi_comm
 
-        super().__init__(**kwargs)
+        if self._data_mode != 'local' and self._mpi_comm.Get_rank() != 0:
+            # the workers get the data of the master in distribute_data instead of loading it themselves
+            dataloader_func, preprocess_func = kwargs['dataloader_func'], kwargs['preprocess_func']
+            kwargs['dataloader_func'], kwargs['preprocess_func'], kwargs['data'] = None, None, None
+            super().__init__(**kwargs)
+            self._dataloader_func, self._preprocess_func = dataloader_func, preprocess_func
+        else:
+            super().__init__(**kwargs)
+
+    @property
+    def mpi_comm(self):
+        """
+        Get the MPI communicator the candidates are sent on.
+
+        :return: [MPI communicator] communicator instance
+        """
+        return self._mpi_comm
+
+    @property
+    def data_mode(self):
+        """
+        Get the way the worker ranks get the data, 'local', 'bcast' or 'shared'.
+
+        :return: [str] data mode
+        """
+        return self._data_mode
+
+    def distribute_data(self):
+        """
+        Distributes the data of the master to the workers according to data_mode. This is a collective call, all ranks
+        of the communicator need to call it, for data_mode='local' it does nothing. Numeric numpy arrays, either the
+        data itself or the values of a data dict, are sent as raw buffers, everything else is pickled. The windows of a
+        previous call are freed first, see free.
+        """
+        if self._data_mode == 'local':
+            return
+        self.free()
+        comm = self._mpi_comm
+        rank = comm.Get_rank()
+        rest, arrays, specs = None, {}, None
+        if rank == 0:
+            rest, arrays = split_arrays(self._data)
+            arrays = dict((key, np.ascontiguousarray(array)) for key, array in arrays.items())
+            specs = [(key, array.shape, array.dtype.str) for key, array in arrays.items()]
+        rest, specs = comm.bcast((rest, specs), root=0)
+
+        if self._data_mode == 'bcast':
+            for key, shape, dtype in specs:
+                if rank != 0:
+                    arrays[key] = np.empty(shape, dtype=np.dtype(dtype))
+                broadcast_buffer(comm, arrays[key])
+        else:
+            # one window per array and node, allocated by the lowest rank of the node, which the master is on its node
+            node_comm = comm.Split_type(MPI.COMM_TYPE_SHARED, key=rank)
+            node_rank = node_comm.Get_rank()
+            leader_comm = comm.Split(0 if node_rank == 0 else MPI.UNDEFINED, key=rank)
+            for key, shape, dtype in specs:
+                dtype = np.dtype(dtype)
+                nbytes = int(np.prod(shape)) * dtype.itemsize
+                window = MPI.Win.Allocate_shared(max(nbytes, 1) if node_rank == 0 else 0, dtype.itemsize,
+                                                 comm=node_comm)
+                buffer, _ = window.Shared_query(0)
+                shared = np.ndarray(shape=shape, dtype=dtype, buffer=buffer)
+                if node_rank == 0:
+                    if rank == 0:
+                        shared[...] = arrays[key]
+                    broadcast_buffer(leader_comm, shared)
+                node_comm.Barrier()
+                self._windows.append(window)
+                arrays[key] = shared
+            if leader_comm != MPI.COMM_NULL:
+                leader_comm.Free()
+            node_comm.Free()
+        self._data = join_arrays(rest, arrays)
+
+    def free(self):
+        """
+        Releases the node shared memory windows allocated by distribute_data for data_mode='shared'. This is a
+        collective call like distribute_data. The master keeps a private copy of its data, so distribute_data can be
+        called again, the workers drop theirs.
+        """
+        if len(self._windows) == 0:
+            return
+        if self._mpi_comm.Get_rank() == 0:
+            rest, arrays = split_arrays(self._data)
+            self._data = join_arrays(rest, dict((key, np.array(array, copy=True)) for key, array in arrays.items()))
+        else:
+            self._data = None
+        for window in self._windows:
+            window.Free()
+        self._windows = []
+
+    def send_candidates(self, candidates, dest, schema):
+        """
+        Sends a chunk of candidates to a worker in one message. Numeric candidates are packed into a float64 buffer
+        described by the schema, which is sent to the worker beforehand if it does not know it yet. Other candidates,
+        e.g. with categorical strings, are pickled.
+
+        :param candidates: [list] CandidateDescriptors
+        :param dest: [int] rank of the worker
+        :param schema: [CandidateSchema] schema of the candidates or None
+        """
+        if schema is None:
+            self._mpi_comm.send(candidates, dest=dest, tag=MPI_TAGS.MPI_SEND_CANDIDATE.value)
+            return
+        if self._worker_schemas.get(dest) != schema:
+            self._mpi_comm.send(schema, dest=dest, tag=MPI_TAGS.MPI_SEND_SCHEMA.value)
+            self._worker_schemas[dest] = schema
+        self._mpi_comm.Send([schema.pack(candidates), MPI.DOUBLE], dest=dest,
+                            tag=MPI_TAGS.MPI_SEND_CANDIDATE_BUFFER.value)
+
+    def results_pending(self):
+        """
+        Returns True if a worker result is waiting to be received.
+
+        :return: [bool]
+        """
+        return self._mpi_comm.Iprobe(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG)
+
+    def receive_results(self):
+        """
+        Receives the results of the next worker answering, either as float64 buffer or pickled if they can not be
+        packed.
+
+        :return: [int], [dict] rank of the worker, result dicts by candidate ID
+        """
+        status = MPI.Status()
+        self._mpi_comm.Probe(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
+        source = status.Get_source()
+        if status.Get_tag() == MPI_TAGS.MPI_SEND_RESULTS_BUFFER.value:
+            buffer = np.empty(status.Get_count(MPI.DOUBLE), dtype=np.float64)
+            self._mpi_comm.Recv([buffer, MPI.DOUBLE], source=source, tag=MPI_TAGS.MPI_SEND_RESULTS_BUFFER.value)
+            return source, unpack_results(buffer)
+        return source, dict(self._mpi_comm.recv(source=source, tag=MPI_TAGS.MPI_SEND_RESULTS.value))
+
+    def get_chunk_size(self, queued, workers):
+        """
+        Returns the number of candidates to send in the next message. For chunk_size='auto' the chunk is chosen such
+        that the measured message overhead is at most AUTO_CHUNK_OVERHEAD of the evaluation time of the chunk, but
+        not larger than an even share of the queued candidates, so all workers keep getting work.
+
+        :param queued: [int] number of candidates waiting in the queue
+        :param workers: [int] number of workers
+
+        :return: [int] chunk size
+        """
+        if self._chunk_size != 'auto':
+            return self._chunk_size
+        if self._eval_time is None or self._message_overhead is None:
+            return 1
+        chunk = int(np.ceil(self._message_overhead / (AUTO_CHUNK_OVERHEAD * max(self._eval_time, 1e-9))))
+        return max(1, min(chunk, int(np.ceil(float(queued) / workers))))
+
+    def update_timing(self, round_trip, results):
+        """
+        Updates the running estimates of the evaluation time per candidate and of the message overhead, i.e. the part
+        of a round trip not spent evaluating, from the results of one message.
+
+        :param round_trip: [float] seconds between the worker being able to start the message, i.e. its sending or
+                           the arrival of the previous results of that worker, and receiving its results
+        :param results: [dict] result dicts of the message by candidate ID
+        """
+        eval_times = [(result['refresh_time'] - result['book_time']).total_seconds() for result in results.values()]
+        if len(eval_times) == 0:
+            return
+        eval_time = float(np.mean(eval_times))
+        overhead = max(round_trip - float(np.sum(eval_times)), 0.0)
+        if self._eval_time is None:
+            self._eval_time, self._message_overhead = eval_time, overhead
+        else:
+            self._eval_time += AUTO_CHUNK_SMOOTHING * (eval_time - self._eval_time)
+            self._message_overhead += AUTO_CHUNK_SMOOTHING * (overhead - self._message_overhead)
 
     def call_batch(self, candidates):
+        """
+        Evaluates a batch of candidates on the worker ranks using a work queue. Each worker gets up to in_flight
+        messages of chunk_size candidates, whenever a worker returns the results of a message it is immediately
+        refilled from the queue, so fast workers do not wait for slow ones. With master_evaluates the master takes
+        candidates from the queue itself whenever no result is waiting. See send_candidates and
+        MPISolverWrapper.run_worker_mode.
+
+        :param candidates: [list] CandidateDescriptors
+
+        :return: [dict] result dicts by candidate ID e.g. {id: {'loss': 0.5, 'book_time': ..., 'refresh_time': ...}}
+        """
         results = dict()
         size = self._mpi_comm.Get_size()
+        if size < 2:
+            raise ZeroDivisionError("no worker ranks available, communicator size is {}".format(size))
+
+        schema = CandidateSchema.from_candidates(candidates)
+        queue = collections.deque(candidates)
+        sent = dict((rank, collections.deque()) for rank in range(1, size))
+        last_arrival = dict((rank, None) for rank in range(1, size))
+        workers = size if self._master_evaluates else size - 1
+
+        def refill(dest):
+            while len(queue) > 0 and len(sent[dest]) < self._in_flight:
+                chunk = self.get_chunk_size(len(queue), workers)
+                self.send_candidates([queue.popleft() for _ in range(min(chunk, len(queue)))], dest, schema)
+                sent[dest].append(time.time())
+
+        for dest in sent.keys():
+            refill(dest)
+        while any(len(times) > 0 for times in sent.values()) or (self._master_evaluates and len(queue) > 0):
+            if self._master_evaluates and len(queue) > 0 and not self.results_pending():
+                candidate = queue.popleft()
+                results[candidate.ID] = evaluate_params(self, candidate.get_values())
+                continue
+            source, received = self.receive_results()
+            # a worker answers its messages in order, so the oldest send time belongs to these results, but with
+            # in_flight > 1 the worker could only start the message once it had finished the previous one
+            arrival = time.time()
+            start = sent[source].popleft()
+            if last_arrival[source] is not None:
+                start = max(start, last_arrival[source])
+            last_arrival[source] = arrival
+            self.update_timing(arrival - start, received)
+            results.update(received)
+            refill(source)
+        return results
+
+    def free_slots(self):
+        """
+        Returns the number of candidates submit accepts right now, in_flight per worker plus one on the master with
+        master_evaluates, minus the candidates pending.
+
+        :return: [int] number of free slots
+        """
+        size = self._mpi_comm.Get_size()
+        if size < 2:
+            raise ZeroDivisionError("no worker ranks available, communicator size is {}".format(size))
+        if self._async_sent is None:
+            self._async_sent = dict((rank, 0) for rank in range(1, size))
+        slots = sum(self._in_flight - sent for sent in self._async_sent.values())
+        if self._master_evaluates:
+            slots += 1 - len(self._async_local)
+        return slots
+
+    def submit(self, candidate):
+        """
+        Dispatches a single candidate to the least loaded worker without waiting for its result, which is later
+        returned by wait_any. With master_evaluates and all workers busy the candidate is kept for the master. The
+        asynchronous interface must not be mixed with call_batch while candidates are pending.
+
+        :param candidate: [CandidateDescriptor] candidate to evaluate
+        """
+        if self.free_slots() < 1:
+            msg = "no free slot, wait_any for a result before submitting further candidates!"
+            LOG.error(msg)
+            raise AssertionError(msg)
+        dest = min(self._async_sent.keys(), key=lambda rank: self._async_sent[rank])
+        if self._async_sent[dest] < self._in_flight:
+            self.send_candidates([candidate], dest, CandidateSchema.from_candidates([candidate]))
+            self._async_sent[dest] += 1
+        else:
+            self._async_local.append(candidate)
+
+    def wait_any(self):
+        """
+        Blocks until at least one of the submitted candidates is finished. A candidate kept for the master is only
+        evaluated while no worker result is waiting.
 
-        for i, candidate in enumerate(candidates):
-            dest = (i % (size-1)) + 1
-            self._mpi_comm.send(candidate, dest=dest, tag=MPI_TAGS.MPI_SEND_CANDIDATE.value)
-
-        while True:
-            for i in range(size - 1):
-                if len(candidates) == len(results):
-                    print('All results received!')
-                    return results
-                cand_id, result_dict = MPI.COMM_WORLD.recv(source=i + 1, tag=MPI_TAGS.MPI_SEND_RESULTS.value)
-                results[cand_id] = result_dict
\ No newline at end of file
+        :return: [dict] result dicts of the finished candidates by candidate ID, empty if nothing is pending
+        """
+        if len(self._async_local) > 0 and not self.results_pending():
+            candidate = self._async_local.popleft()
+            return {candidate.ID: evaluate_params(self, candidate.get_values())}
+        if self._async_sent is None or sum(self._async_sent.values()) == 0:
+            return {}
+        source, received = self.receive_results()
+        self._async_sent[source] -= 1
+        return received
@@ -0,0 +1,182 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+__all__ = ['CandidateSchema',
+           'pack_results',
+           'unpack_results']
+
+import os
+import logging
+import datetime
+import numpy as np
+from hyppopy.globals import DEBUGLEVEL
+
+LOG = logging.getLogger(os.path.basename(__file__))
+LOG.setLevel(DEBUGLEVEL)
+
+# integers beyond this magnitude are not exactly representable as float64
+MAX_EXACT_INT = 2 ** 53
+
+TYPES = {'bool': bool, 'int': int, 'float': float}
+
+
+def numeric_type(value):
+    """
+    Returns the name of the type a value is transferred as, None if it can not be represented exactly by a float64.
+
+    :param value: [object] parameter value
+
+    :return: [str] 'bool', 'int', 'float' or None
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return 'bool'
+    if isinstance(value, (int, np.integer)):
+        return 'int' if abs(int(value)) <= MAX_EXACT_INT else None
+    if isinstance(value, (float, np.floating)):
+        return 'float'
+    return None
+
+
+class CandidateSchema(object):
+    """
+    Describes numeric candidates by the order and type of their parameters. With it a batch of candidates is sent as
+    one contiguous float64 buffer of shape (candidates, 1 + parameters), the first column holding the candidate ID,
+    instead of pickling every CandidateDescriptor. The schema itself is sent only once to each worker.
+    """
+
+    def __init__(self, keys, types):
+        """
+        The constructor accepts the parameter names and their type names.
+
+        :param keys: [list] parameter names
+        :param types: [list] type names, 'bool', 'int' or 'float'
+        """
+        assert len(keys) == len(types), "precondition violation, keys and types need to have the same length!"
+        self._keys = tuple(keys)
+        self._types = tuple(types)
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return self._keys == other._keys and self._types == other._types
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self._keys, self._types))
+
+    def __repr__(self):
+        return 'CandidateSchema({})'.format(list(zip(self._keys, self._types)))
+
+    @property
+    def keys(self):
+        return self._keys
+
+    @property
+    def types(self):
+        return self._types
+
+    @classmethod
+    def from_candidates(cls, candidates):
+        """
+        Creates the schema of a batch of candidates.
+
+        :param candidates: [list] CandidateDescriptors
+
+        :return: [CandidateSchema] schema or None if the candidates have different parameters or a parameter value can
+                 not be transferred as float64, e.g. a categorical string
+        """
+        if len(candidates) == 0:
+            return None
+        keys = sorted(candidates[0].keys())
+        types = {}
+        for candidate in candidates:
+            if len(candidate) != len(keys):
+                return None
+            for key in keys:
+                if key not in candidate:
+                    return None
+                dtype = numeric_type(candidate[key])
+                if dtype is None:
+                    return None
+                if types.get(key, dtype) != dtype:
+                    if 'float' not in (dtype, types[key]):
+                        return None
+                    dtype = 'float'
+                types[key] = dtype
+        return cls(keys, [types[key] for key in keys])
+
+    def pack(self, candidates):
+        """
+        Packs candidates into a contiguous float64 buffer.
+
+        :param candidates: [list] CandidateDescriptors matching the schema
+
+        :return: [ndarray] buffer of shape (candidates, 1 + parameters)
+        """
+        buffer = np.empty((len(candidates), 1 + len(self._keys)), dtype=np.float64)
+        for n, candidate in enumerate(candidates):
+            buffer[n, 0] = candidate.ID
+            buffer[n, 1:] = [candidate[key] for key in self._keys]
+        return buffer
+
+    def unpack(self, buffer):
+        """
+        Unpacks a buffer created by pack.
+
+        :param buffer: [ndarray] float64 buffer, either flat or of shape (candidates, 1 + parameters)
+
+        :return: [list] (candidate ID, parameter dict) pairs
+        """
+        buffer = np.asarray(buffer, dtype=np.float64).reshape(-1, 1 + len(self._keys))
+        columns = [(key, [TYPES[dtype](value) for value in buffer[:, n + 1].tolist()])
+                   for n, (key, dtype) in enumerate(zip(self._keys, self._types))]
+        ids = [int(value) for value in buffer[:, 0].tolist()]
+        return [(cand_id, dict((key, values[n]) for key, values in columns)) for n, cand_id in enumerate(ids)]
+
+
+def pack_results(results):
+    """
+    Packs evaluation results into a contiguous float64 buffer of shape (results, 4) with the columns candidate ID,
+    loss, book time and refresh time as POSIX timestamps.
+
+    :param results: [list] (candidate ID, result dict) pairs, result dicts e.g. {'loss': 0.5, 'book_time': ...,
+                    'refresh_time': ...}
+
+    :return: [ndarray] buffer or None if a result holds more than a scalar loss and the two times, e.g. a loss vector
+    """
+    buffer = np.empty((len(results), 4), dtype=np.float64)
+    for n, (cand_id, result) in enumerate(results):
+        if set(result.keys()) != {'loss', 'book_time', 'refresh_time'}:
+            return None
+        loss = result['loss']
+        if numeric_type(loss) is None or numeric_type(cand_id) != 'int':
+            return None
+        buffer[n] = [cand_id, loss, result['book_time'].timestamp(), result['refresh_time'].timestamp()]
+    return buffer
+
+
+def unpack_results(buffer):
+    """
+    Unpacks a buffer created by pack_results.
+
+    :param buffer: [ndarray] float64 buffer, either flat or of shape (results, 4)
+
+    :return: [dict] result dicts by candidate ID
+    """
+    results = {}
+    for cand_id, loss, book_time, refresh_time in np.asarray(buffer, dtype=np.float64).reshape(-1, 4).tolist():
+        results[int(cand_id)] = {'book_time': datetime.datetime.fromtimestamp(book_time),
+                                 'loss': loss,
+                                 'refresh_time': datetime.datetime.fromtimestamp(refresh_time)}
+    return results
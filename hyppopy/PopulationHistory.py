@@ -0,0 +1,242 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+__all__ = ['PopulationHistory']
+
+import os
+import logging
+import numpy as np
+from hyppopy.globals import DEBUGLEVEL
+
+LOG = logging.getLogger(os.path.basename(__file__))
+LOG.setLevel(DEBUGLEVEL)
+
+
+class PopulationHistory(object):
+    """
+    Sliding window over the generations of a population based solver, e.g. DynamicPSOSolver. The particle positions
+    and objective vectors are kept in preallocated arrays of shape (size, particles, dims) and
+    (size, particles, num_args_obj), the oldest generation is overwritten once the window is full, so memory stays
+    constant over a run. Additionally per objective term summary statistics over all generations ever appended are
+    updated incrementally (Welford), so they do not need to rescan the history. Objective values that are nan, e.g.
+    of particles violating the constraints, are excluded from the statistics.
+    """
+
+    def __init__(self, size, keys=None):
+        """
+        The constructor accepts the window size, the arrays are allocated with the first generation appended.
+
+        :param size: [int] number of generations kept
+        :param keys: [list] names of the position dimensions, default=None
+        """
+        assert size > 0, "precondition violation, size needs to be greater than 0!"
+        self._size = int(size)
+        self._keys = None if keys is None else list(keys)
+        self._positions = None
+        self._objectives = None
+        self._generations = 0
+        self._count = None
+        self._mean = None
+        self._m2 = None
+        self._minimum = None
+        self._maximum = None
+
+    def __len__(self):
+        return min(self._generations, self._size)
+
+    def _allocate(self, num_particles, num_dims, num_args_obj):
+        self._positions = np.full((self._size, num_particles, num_dims), np.nan)
+        self._objectives = np.full((self._size, num_particles, num_args_obj), np.nan)
+        self._count = np.zeros(num_args_obj, dtype=int)
+        self._mean = np.zeros(num_args_obj)
+        self._m2 = np.zeros(num_args_obj)
+        self._minimum = np.full(num_args_obj, np.nan)
+        self._maximum = np.full(num_args_obj, np.nan)
+
+    def append(self, positions, objectives):
+        """
+        Appends a generation, overwriting the oldest one if the window is full.
+
+        :param positions: [array] particle positions of shape (particles, dims)
+        :param objectives: [array] objective vectors of shape (particles, num_args_obj), nan for missing values
+        """
+        positions = np.asarray(positions, dtype=float)
+        objectives = np.asarray(objectives, dtype=float)
+        if objectives.ndim == 1:
+            objectives = objectives[:, np.newaxis]
+        if self._positions is None:
+            self._allocate(positions.shape[0], positions.shape[1], objectives.shape[1])
+        if positions.shape != self._positions.shape[1:] or objectives.shape != self._objectives.shape[1:]:
+            msg = "generation shape mismatch, expected {} and {}, got {} and {}!".format(
+                self._positions.shape[1:], self._objectives.shape[1:], positions.shape, objectives.shape)
+            LOG.error(msg)
+            raise AssertionError(msg)
+        index = self._generations % self._size
+        self._positions[index] = positions
+        self._objectives[index] = objectives
+        self._generations += 1
+        self._update_statistics(objectives)
+
+    def _update_statistics(self, objectives):
+        # merge the statistics of the new generation into the running ones (Chan et al.)
+        finite = np.isfinite(objectives)
+        count = finite.sum(axis=0)
+        update = count > 0
+        if not np.any(update):
+            return
+        values = np.where(finite, objectives, 0.0)
+        mean = values.sum(axis=0) / np.maximum(count, 1)
+        m2 = (np.where(finite, objectives - mean, 0.0) ** 2).sum(axis=0)
+        total = self._count + count
+        delta = mean - self._mean
+        self._mean = np.where(update, self._mean + delta * count / np.maximum(total, 1), self._mean)
+        self._m2 = np.where(update, self._m2 + m2 + delta ** 2 * self._count * count / np.maximum(total, 1), self._m2)
+        self._count = total
+        self._minimum = np.where(update, np.fmin(self._minimum, np.where(finite, objectives, np.inf).min(axis=0)),
+                                 self._minimum)
+        self._maximum = np.where(update, np.fmax(self._maximum, np.where(finite, objectives, -np.inf).max(axis=0)),
+                                 self._maximum)
+
+    def _ordered(self, array):
+        if array is None:
+            return None
+        if self._generations <= self._size:
+            return array[:self._generations]
+        index = self._generations % self._size
+        return np.concatenate((array[index:], array[:index]))
+
+    @property
+    def size(self):
+        """
+        Get the window size.
+
+        :return: [int] number of generations kept
+        """
+        return self._size
+
+    @property
+    def keys(self):
+        """
+        Get the names of the position dimensions.
+
+        :return: [list] names or None
+        """
+        return self._keys
+
+    @property
+    def generations(self):
+        """
+        Get the number of generations appended so far, including those that left the window.
+
+        :return: [int] number of generations
+        """
+        return self._generations
+
+    @property
+    def positions(self):
+        """
+        Get the positions of the generations in the window, oldest first.
+
+        :return: [array] positions of shape (generations, particles, dims)
+        """
+        return self._ordered(self._positions)
+
+    @property
+    def objectives(self):
+        """
+        Get the objective vectors of the generations in the window, oldest first.
+
+        :return: [array] objectives of shape (generations, particles, num_args_obj)
+        """
+        return self._ordered(self._objectives)
+
+    @property
+    def latest_positions(self):
+        """
+        Get the positions of the last generation.
+
+        :return: [array] positions of shape (particles, dims) or None
+        """
+        if self._generations == 0:
+            return None
+        return self._positions[(self._generations - 1) % self._size]
+
+    @property
+    def latest_objectives(self):
+        """
+        Get the objective vectors of the last generation.
+
+        :return: [array] objectives of shape (particles, num_args_obj) or None
+        """
+        if self._generations == 0:
+            return None
+        return self._objectives[(self._generations - 1) % self._size]
+
+    @property
+    def count(self):
+        """
+        Get the number of finite values per objective term the statistics are based on.
+
+        :return: [array] counts of shape (num_args_obj,)
+        """
+        return self._count
+
+    @property
+    def mean(self):
+        """
+        Get the mean per objective term over all generations appended.
+
+        :return: [array] means of shape (num_args_obj,), nan for terms without values
+        """
+        if self._mean is None:
+            return None
+        return np.where(self._count > 0, self._mean, np.nan)
+
+    @property
+    def variance(self):
+        """
+        Get the sample variance per objective term over all generations appended.
+
+        :return: [array] variances of shape (num_args_obj,), nan for terms with less than two values
+        """
+        if self._m2 is None:
+            return None
+        return np.where(self._count > 1, self._m2 / np.maximum(self._count - 1, 1), np.nan)
+
+    @property
+    def std(self):
+        """
+        Get the sample standard deviation per objective term over all generations appended.
+
+        :return: [array] standard deviations of shape (num_args_obj,)
+        """
+        if self._m2 is None:
+            return None
+        return np.sqrt(self.variance)
+
+    @property
+    def minimum(self):
+        """
+        Get the minimum per objective term over all generations appended.
+
+        :return: [array] minima of shape (num_args_obj,)
+        """
+        return self._minimum
+
+    @property
+    def maximum(self):
+        """
+        Get the maximum per objective term over all generations appended.
+
+        :return: [array] maxima of shape (num_args_obj,)
+        """
+        return self._maximum
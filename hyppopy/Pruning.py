@@ -0,0 +1,287 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+__all__ = ['TrialPruned',
+           'Reporter',
+           'Pruner',
+           'PercentilePruner',
+           'MedianPruner',
+           'ThresholdPruner',
+           'get_pruner',
+           'accepts_reporter',
+           'accepts_keywords']
+
+import os
+import inspect
+import logging
+import numpy as np
+from hyppopy.globals import DEBUGLEVEL
+
+LOG = logging.getLogger(os.path.basename(__file__))
+LOG.setLevel(DEBUGLEVEL)
+
+
+class TrialPruned(Exception):
+    """
+    Raised by Reporter.report if the trial should be stopped. The blackbox may let it propagate or raise it itself,
+    the solver then records the trial as pruned with the last reported value as loss.
+    """
+    pass
+
+
+class Reporter(object):
+    """
+    The Reporter is passed to blackbox functions declaring a reporter argument. Iterative blackboxes call report with
+    intermediate losses, e.g. the validation loss after each epoch, report raises TrialPruned if the pruner decides
+    to stop the trial.
+    """
+
+    def __init__(self, pruner=None):
+        """
+        The constructor accepts the pruner deciding about the trial.
+
+        :param pruner: [Pruner] pruner instance, if None the trial is never pruned, default=None
+        """
+        self._pruner = pruner
+        self._values = {}
+        self._last_step = None
+
+    def report(self, value, step=None):
+        """
+        Reports an intermediate loss.
+
+        :param value: [float] intermediate loss
+        :param step: [int] step of the value, e.g. the epoch, if None the number of values reported so far is used
+
+        :raises TrialPruned: if the trial should be stopped
+        """
+        step = len(self._values) if step is None else int(step)
+        self._values[step] = float(value)
+        self._last_step = step
+        if self.should_prune():
+            raise TrialPruned("trial pruned at step {} with value {}".format(step, value))
+
+    def should_prune(self):
+        """
+        Returns True if the trial should be stopped.
+
+        :return: [bool] prune decision
+        """
+        if self._pruner is None or self._last_step is None:
+            return False
+        return self._pruner.should_prune(self)
+
+    @property
+    def values(self):
+        """
+        Get the intermediate losses reported so far.
+
+        :return: [dict] step value pairs
+        """
+        return self._values
+
+    @property
+    def last_step(self):
+        """
+        Get the step of the last report.
+
+        :return: [int] step or None
+        """
+        return self._last_step
+
+    @property
+    def last_value(self):
+        """
+        Get the last reported value, nan if nothing was reported yet.
+
+        :return: [float] value
+        """
+        if self._last_step is None:
+            return np.nan
+        return self._values[self._last_step]
+
+
+class Pruner(object):
+    """
+    Base class of the pruning rules. A pruner keeps the intermediate values of the completed trials and decides, based
+    on them, if a running trial should be stopped. Child classes implement should_prune.
+    """
+
+    def __init__(self, n_startup_trials=5, n_warmup_steps=0):
+        """
+        The constructor accepts the pruning warm up settings.
+
+        :param n_startup_trials: [int] no trial is pruned before n_startup_trials trials are completed, default=5
+        :param n_warmup_steps: [int] no trial is pruned before it reported step n_warmup_steps, default=0
+        """
+        self._n_startup_trials = n_startup_trials
+        self._n_warmup_steps = n_warmup_steps
+        self._completed = []
+
+    def complete(self, reporter):
+        """
+        Registers the intermediate values of a trial that ran to completion.
+
+        :param reporter: [Reporter] reporter of the trial
+        """
+        if len(reporter.values) > 0:
+            self._completed.append(dict(reporter.values))
+
+    def in_warmup(self, reporter):
+        """
+        Returns True if the trial can not be pruned yet.
+
+        :param reporter: [Reporter] reporter of the trial
+
+        :return: [bool] warm up state
+        """
+        return len(self._completed) < self._n_startup_trials or reporter.last_step < self._n_warmup_steps
+
+    def should_prune(self, reporter):
+        """
+        Returns True if the trial should be stopped.
+
+        :param reporter: [Reporter] reporter of the trial
+
+        :return: [bool] prune decision
+        """
+        raise NotImplementedError('users must define should_prune to use this class')
+
+
+class PercentilePruner(Pruner):
+    """
+    Prunes a trial if its best intermediate loss is worse than the given percentile of the intermediate losses the
+    completed trials reported at the same step.
+    """
+
+    def __init__(self, percentile=25.0, n_startup_trials=5, n_warmup_steps=0):
+        """
+        The constructor accepts the percentile and the pruning warm up settings.
+
+        :param percentile: [float] percentile in [0, 100], the trials worse than it are pruned, default=25.0
+        :param n_startup_trials: [int] no trial is pruned before n_startup_trials trials are completed, default=5
+        :param n_warmup_steps: [int] no trial is pruned before it reported step n_warmup_steps, default=0
+        """
+        assert 0 <= percentile <= 100, "precondition violation, percentile needs to be in [0, 100]!"
+        Pruner.__init__(self, n_startup_trials, n_warmup_steps)
+        self._percentile = percentile
+
+    def should_prune(self, reporter):
+        if self.in_warmup(reporter):
+            return False
+        step = reporter.last_step
+        others = [values[step] for values in self._completed if step in values]
+        if len(others) == 0:
+            return False
+        best = np.nanmin([value for s, value in reporter.values.items() if s <= step])
+        return bool(np.isnan(best) or best > np.nanpercentile(others, self._percentile))
+
+
+class MedianPruner(PercentilePruner):
+    """
+    Prunes a trial if its best intermediate loss is worse than the median of the intermediate losses the completed
+    trials reported at the same step (median stopping rule).
+    """
+
+    def __init__(self, n_startup_trials=5, n_warmup_steps=0):
+        """
+        The constructor accepts the pruning warm up settings.
+
+        :param n_startup_trials: [int] no trial is pruned before n_startup_trials trials are completed, default=5
+        :param n_warmup_steps: [int] no trial is pruned before it reported step n_warmup_steps, default=0
+        """
+        PercentilePruner.__init__(self, 50.0, n_startup_trials, n_warmup_steps)
+
+
+class ThresholdPruner(Pruner):
+    """
+    Prunes a trial if an intermediate loss leaves the range [lower, upper] or is nan.
+    """
+
+    def __init__(self, lower=None, upper=None, n_warmup_steps=0):
+        """
+        The constructor accepts the bounds.
+
+        :param lower: [float] lower bound, if None there is no lower bound, default=None
+        :param upper: [float] upper bound, if None there is no upper bound, default=None
+        :param n_warmup_steps: [int] no trial is pruned before it reported step n_warmup_steps, default=0
+        """
+        Pruner.__init__(self, 0, n_warmup_steps)
+        self._lower = lower
+        self._upper = upper
+
+    def should_prune(self, reporter):
+        if self.in_warmup(reporter):
+            return False
+        value = reporter.last_value
+        if np.isnan(value):
+            return True
+        if self._lower is not None and value < self._lower:
+            return True
+        return self._upper is not None and value > self._upper
+
+
+def get_pruner(pruner):
+    """
+    Returns the pruner described by the pruner setting, either a Pruner instance or one of the names 'median',
+    'percentile' or 'threshold', the latter pruning nan values only.
+
+    :param pruner: [object] Pruner instance or name
+
+    :return: [Pruner] pruner instance or None if pruner is None
+    """
+    if pruner is None or isinstance(pruner, Pruner):
+        return pruner
+    if pruner == "median":
+        return MedianPruner()
+    if pruner == "percentile":
+        return PercentilePruner()
+    if pruner == "threshold":
+        return ThresholdPruner()
+    msg = "unknown pruner {}, use a Pruner instance or one of 'median', 'percentile', 'threshold'!".format(pruner)
+    LOG.error(msg)
+    raise LookupError(msg)
+
+
+def accepts_reporter(func):
+    """
+    Returns True if the function declares an argument named reporter.
+
+    :param func: [callable] function
+
+    :return: [bool]
+    """
+    try:
+        return "reporter" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def accepts_keywords(func, names):
+    """
+    Returns True if the function can be called with the given keyword arguments, i.e. it declares all of them or takes
+    **kwargs. If the signature can not be inspected the function is assumed to accept them.
+
+    :param func: [callable] function
+    :param names: [iterable] argument names
+
+    :return: [bool]
+    """
+    try:
+        parameters = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return True
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values()):
+        return True
+    keywords = [name for name, p in parameters.items()
+                if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)]
+    return all(name in keywords for name in names)
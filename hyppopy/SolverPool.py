@@ -23,6 +23,9 @@ from hyppopy.solvers.OptunitySolver import OptunitySolver
 from hyppopy.solvers.GridsearchSolver import GridsearchSolver
 from hyppopy.solvers.RandomsearchSolver import RandomsearchSolver
 from hyppopy.solvers.QuasiRandomsearchSolver import QuasiRandomsearchSolver
+from hyppopy.solvers.LatinHypercubeSolver import LatinHypercubeSolver
+from hyppopy.solvers.SobolSolver import SobolSolver
+from hyppopy.solvers.TPESolver import TPESolver
 from hyppopy.globals import DEBUGLEVEL
 
 LOG = logging.getLogger(os.path.basename(__file__))
@@ -45,6 +48,9 @@ class SolverPool(metaclass=Singleton):
                              "optuna",
                              "randomsearch",
                              "quasirandomsearch",
+                             "latinhypercube",
+                             "sobol",
+                             "tpe",
                              "gridsearch"]
 
     def get_solver_names(self):
@@ -97,3 +103,15 @@ class SolverPool(metaclass=Singleton):
             if project is not None:
                 return QuasiRandomsearchSolver(project)
             return QuasiRandomsearchSolver()
+        elif solver_name == "latinhypercube":
+            if project is not None:
+                return LatinHypercubeSolver(project)
+            return LatinHypercubeSolver()
+        elif solver_name == "sobol":
+            if project is not None:
+                return SobolSolver(project)
+            return SobolSolver()
+        elif solver_name == "tpe":
+            if project is not None:
+                return TPESolver(project)
+            return TPESolver()
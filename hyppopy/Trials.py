@@ -0,0 +1,90 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+__all__ = ['Trials']
+
+import os
+import logging
+import numpy as np
+from hyppopy.globals import DEBUGLEVEL
+
+LOG = logging.getLogger(os.path.basename(__file__))
+LOG.setLevel(DEBUGLEVEL)
+
+
+class Trials(object):
+    """
+    Container of the optimization history. It keeps the trial dicts in the layout of hyperopt's Trials object, e.g.
+    {'tid': 0, 'result': {'loss': 0.5, 'status': 'ok'}, 'misc': {'tid': 0, 'idxs': {...}, 'vals': {...}},
+    'book_time': ..., 'refresh_time': ...}, so the solvers do not need to depend on hyperopt for bookkeeping.
+    """
+
+    def __init__(self):
+        self._trials = []
+
+    def __len__(self):
+        return len(self._trials)
+
+    def __iter__(self):
+        return iter(self._trials)
+
+    @property
+    def trials(self):
+        """
+        Get the list of trial dicts.
+
+        :return: [list] trial dicts
+        """
+        return self._trials
+
+    def losses(self):
+        """
+        Returns the loss of each trial, None if the trial has no loss.
+
+        :return: [list] losses
+        """
+        return [trial['result'].get('loss') for trial in self._trials]
+
+    def statuses(self):
+        """
+        Returns the status of each trial.
+
+        :return: [list] status strings
+        """
+        return [trial['result'].get('status') for trial in self._trials]
+
+    @property
+    def best_trial(self):
+        """
+        Get the successful trial with the lowest loss.
+
+        :return: [dict] trial dict
+        """
+        candidates = [trial for trial in self._trials
+                      if trial['result'].get('status') == 'ok' and trial['result'].get('loss') is not None
+                      and not np.isnan(trial['result']['loss'])]
+        if len(candidates) == 0:
+            msg = "no successful trial available!"
+            LOG.error(msg)
+            raise AssertionError(msg)
+        losses = [trial['result']['loss'] for trial in candidates]
+        return candidates[int(np.argmin(losses))]
+
+    @property
+    def argmin(self):
+        """
+        Get the parameter set of the best trial.
+
+        :return: [dict] parameter set e.g. {'p1': 0.123, 'p2': 3.87, ...}
+        """
+        vals = self.best_trial['misc']['vals']
+        return {name: value[0] for name, value in vals.items() if len(value) > 0}
@@ -37,4 +37,7 @@ logging.basicConfig(filename=LOGFILENAME, filemode='w', format='%(levelname)s: %
 
 class MPI_TAGS(Enum):
      MPI_SEND_CANDIDATE = 55
+     MPI_SEND_SCHEMA = 56
+     MPI_SEND_CANDIDATE_BUFFER = 57
+     MPI_SEND_RESULTS_BUFFER = 98
      MPI_SEND_RESULTS = 99
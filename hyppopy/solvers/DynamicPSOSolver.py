@@ -18,15 +18,16 @@ import logging
 import optunity
 from pprint import pformat
 
-from hyppopy.CandidateDescriptor import CandidateDescriptor, CandicateDescriptorWrapper
+from hyppopy.CandidateDescriptor import CandidateDescriptor, CandidateBatch
 from hyppopy.globals import DEBUGLEVEL
-from hyperopt import Trials
+from hyppopy.Trials import Trials
+from hyppopy.PopulationHistory import PopulationHistory
 
 LOG = logging.getLogger(os.path.basename(__file__))
 LOG.setLevel(DEBUGLEVEL)
 
 from hyppopy.solvers.HyppopySolver import HyppopySolver
-from .OptunitySolver import OptunitySolver
+from .OptunitySolver import OptunitySolver, seeded_random_module
 
 class DynamicPSOSolver(OptunitySolver):
     """Dynamic PSO HyppoPy Solver Class"""
@@ -45,6 +46,8 @@ class DynamicPSOSolver(OptunitySolver):
         self._add_member("num_params_obj", int)         # Pass number of parameters of obj. func.
         self._add_member("phi1", float, default=1.5)    # Pass first PSO acceleration coefficient.
         self._add_member("phi2", float, default=2.0)    # Pass second PSO acceleration coefficient.
+        self._add_member("history_size", int, optional=True)  # Pass number of generations kept in the population history,
+                                                              # if set update_param gets the PopulationHistory.
         self._add_hyperparameter_signature(name="domain", dtype=str, options=["uniform", "loguniform", "categorical"])
 
     def _add_method(self, name, func=None, default=None):
@@ -74,71 +77,89 @@ class DynamicPSOSolver(OptunitySolver):
         :return: [object] converted hyperparameter space
         :return: [dict] dict keeping domains for different hyperparameters.
         """
-        LOG.debug("convert input parameter\n\n\t{}\n".format(pformat(hyperparameter)))
-        # Split input in categorical and non-categorical data.
-        cat, uni = self.split_categorical(hyperparameter)
-        # Build up dict keeping all non-categorical data.
-        uniforms = {}
+        # Categorical parameters are encoded as continuous index ranges, see OptunitySolver.decode, which the solver
+        # lib samples like any other uniform parameter.
+        searchspace = super().convert_searchspace(hyperparameter)
         domains = {}
-        for key, value in uni.items():
-            for key2, value2 in value.items():
-                if key2 == "data":
-                    if len(value2) == 3:
-                        uniforms[key] = value2[0:2]
-                    elif len(value2) == 2:
-                        uniforms[key] = value2
-                    else:
-                        raise AssertionError("precondition violation, optunity searchspace needs list with left and right range bounds!")
-                if key2 == "domain":
-                    domains[key] = value2
-
-        if len(cat) == 0:
-            return uniforms, domains
-        # Build nested categorical structure.
-        inner_level = uniforms
-        for key, value in cat.items():
-            tmp = {}
-            optunity_space = {}
-            for key2, value2 in value.items():
-                if key2 == "data":
-                    for elem in value2:
-                        tmp[elem] = inner_level
-                if key2 == "domain":
-                    domains[key] = value2
-            optunity_space[key] = tmp
-            inner_level = optunity_space
-        return optunity_space, domains
+        for key, value in hyperparameter.items():
+            if "domain" in value:
+                domains[key] = "uniform" if key in self._categories else value["domain"]
+        return searchspace, domains
 
     def hyppopy_optunity_solver_pmap(self, f, seq):
-        # Check if seq is empty. I so, return an empty result list.
+        """
+        Map function passed to optimize_dyn_PSO. The not yet evaluated particles of a generation that satisfy the box
+        constraints are evaluated as a single batch via loss_function_batch, so batch capable blackboxes, e.g.
+        MPIBlackboxFunction, receive all particles at once, but no more than max_iterations candidates are evaluated
+        in total. Afterwards f is called for each particle and reads the losses from the batch cache, like
+        OptunitySolver.optunity_pmap does, keeping optunity's call log intact. Particles violating the box constraints
+        get the constraint default assigned by f, failed evaluations and particles beyond the budget get it as well.
+
+        :param f: [callable] wrapped objective function, see execute_solver
+        :param seq: [list] particles of one generation in the internal search space representation
+
+        :return: [list] objective vectors in the order of seq
+        """
         if len(seq) == 0:
             return []
 
-        candidates = []
-        for elem in seq:
-            can = CandidateDescriptor(**elem)
-            candidates.append(can)
+        particles = CandidateBatch.from_dicts(seq, self._box.keys())
+        valid = particles.in_box(self._box)
+        candidates = [None] * len(seq)
+        for n, particle in zip(numpy.flatnonzero(valid), particles.select(valid).to_dicts()):
+            candidates[n] = CandidateDescriptor(**self.decode(particle))
+
+        pending = []
+        for candidate in candidates:
+            if candidate is not None and candidate not in self._batch_cache and candidate not in pending:
+                pending.append(candidate)
+        pending = pending[:max(self.max_iterations - len(self._batch_cache), 0)]
+        results = self.loss_function_batch(pending) if len(pending) > 0 else {}
+        for candidate in pending:
+            loss = results[candidate.ID].get('loss')
+            if loss is None or results[candidate.ID].get('status', 'ok') != 'ok' or \
+                    numpy.any(numpy.isnan(numpy.asarray(loss, dtype=float))):
+                loss = self._constraint_default
+            self._batch_cache[candidate] = loss
+
+        f_result = []
+        for particle, candidate in zip(seq, candidates):
+            if candidate is not None and candidate not in self._batch_cache:
+                f_result.append(self._constraint_default)
+            else:
+                f_result.append(f(**particle))
 
-        cand_list = CandicateDescriptorWrapper(keys=seq[0].keys())
-        cand_list.set(candidates)
+        if self._population_history is not None:
+            positions = numpy.column_stack([particles.column(key).astype(float) for key in self._box.keys()])
+            objectives = numpy.full((len(seq), self.num_args_obj), numpy.nan)
+            for n, candidate in enumerate(candidates):
+                loss = self._batch_cache.get(candidate) if candidate is not None else None
+                if loss is not None and loss is not self._constraint_default:
+                    objectives[n] = numpy.ravel(numpy.asarray(loss, dtype=float))
+            self._population_history.append(positions, objectives)
+        return f_result
 
-        f_result = f(cand_list)
+    @property
+    def population_history(self):
+        """
+        Get the population history of the current run, available if history_size is set. The user functions
+        update_param and combine_obj can use its summary statistics instead of rescanning the history.
 
-        # If one candidate does not match the constraints, f() returns a single default value.
-        # This is a problem as all the other candidates are not calculated either.
-        # The following is a workaround. We split the candidate_list into 2 lists and call the map function recursively until all valid parameters are processed.
-        if not isinstance(f_result, list):
-            # First half
-            seq_A = seq[:len(seq) // 2]
-            temp_result_a = self.hyppopy_optunity_solver_pmap(f, seq_A)
+        :return: [PopulationHistory] population history or None
+        """
+        return self._population_history
 
-            seq_B = seq[len(seq) // 2:]
-            temp_result_b = self.hyppopy_optunity_solver_pmap(f, seq_B)
-            # f_result = [42]
+    def update_param_from_history(self, pop_history, num_params_obj):
+        """
+        Passed to optimize_dyn_PSO as update_param if history_size is set. It calls the user function update_param
+        with the bounded PopulationHistory instead of the full history the solver lib keeps.
 
-            f_result = temp_result_a + temp_result_b
+        :param pop_history: population history of the solver lib, unused
+        :param num_params_obj: [int] number of parameters of obj. func.
 
-        return f_result
+        :return: parameters of obj. func.
+        """
+        return self.update_param(self._population_history, num_params_obj)
 
     def execute_solver(self, searchspace, domains):
         """
@@ -148,30 +169,39 @@ class DynamicPSOSolver(OptunitySolver):
         :param searchspace: converted hyperparameter space
         """
         LOG.debug("execute_solver using solution space:\n\n\t{}\n".format(pformat(searchspace)))
-        tree = optunity.search_spaces.SearchTree(searchspace)   # Set up tree structure to model search space.
-        box = tree.to_box()                                     # Create set of box constraints to define given search space.
-        f = optunity.functions.logged(self.loss_function_batch)       # Call log here because function signature used later on is internal logic.
-        f = tree.wrap_decoder(f)                                # Wrap decoder and constraints for internal search space rep.
-        f = optunity.constraints.wrap_constraints(f, default=sys.float_info.max*numpy.ones(self.num_args_obj), range_oo=box)
+        box = dict(searchspace)                                 # Flat box constraints, categoricals are index ranges.
+        # Box and default are used by the pmap to check, decode and evaluate a whole generation at once.
+        self._box = box
+        self._batch_cache = {}
+        self._constraint_default = sys.float_info.max*numpy.ones(self.num_args_obj)
+        self._population_history = None
+        update_param = self.update_param
+        if self.history_size is not None:
+            self._population_history = PopulationHistory(self.history_size, box.keys())
+            update_param = self.update_param_from_history
+        f = optunity.functions.logged(self.cached_loss_function)      # Call log here because function signature used later on is internal logic.
+        f = self.wrap_decoder(f)                                # Wrap decoder and constraints for internal search space rep.
+        f = optunity.constraints.wrap_constraints(f, default=self._constraint_default, range_oo=box)
         # 'wrap_constraints' decorates function f with given input domain constraints. default [float] gives a 
         # function value to default to in case of constraint violations. range_oo [dict] gives open range 
         # constraints lb and lu, i.e. lb < x < ub and range = (lb, ub), respectively.
 
         try:
-            self.best, _ = optunity.optimize_dyn_PSO(func=f,
-                                                     box=box,
-                                                     domains=domains,
-                                                     maximize=False,
-                                                     max_evals=self.max_iterations,
-                                                     num_args_obj=self.num_args_obj,
-                                                     num_params_obj=self.num_params_obj,
-                                                     pmap=self.hyppopy_optunity_solver_pmap, #map,#optunity.pmap,
-                                                     decoder=tree.decode,
-                                                     update_param=self.update_param,
-                                                     eval_obj=self.combine_obj,   
-                                                     phi1=self.phi1,
-                                                     phi2=self.phi2
-                                                     )
+            with seeded_random_module(self.spawn_seed()):
+                self.best, _ = optunity.optimize_dyn_PSO(func=f,
+                                                         box=box,
+                                                         domains=domains,
+                                                         maximize=False,
+                                                         max_evals=self.max_iterations,
+                                                         num_args_obj=self.num_args_obj,
+                                                         num_params_obj=self.num_params_obj,
+                                                         pmap=self.hyppopy_optunity_solver_pmap, #map,#optunity.pmap,
+                                                         decoder=self.decode,
+                                                         update_param=update_param,
+                                                         eval_obj=self.combine_obj,
+                                                         phi1=self.phi1,
+                                                         phi2=self.phi2
+                                                         )
             # Workaround: Unpack best result, im max_iterations was reached.
             try:
                 for key in self.best:
@@ -222,6 +252,8 @@ class DynamicPSOSolver(OptunitySolver):
         """
         self._idx = 0
         self.trials = Trials()
+        self._init_random_streams()
+        self._pruner = self.setup_pruner()
 
         start_time = datetime.datetime.now()
         try:
@@ -15,10 +15,14 @@ import copy
 import logging
 import numpy as np
 from pprint import pformat
-from hyperopt import fmin, tpe, hp, STATUS_OK, STATUS_FAIL, Trials
+from hyperopt import fmin, tpe, hp, space_eval, STATUS_OK, STATUS_FAIL, Trials
+from hyperopt.base import Domain, JOB_STATE_DONE, JOB_STATE_NEW, JOB_STATE_RUNNING, spec_from_misc
 
 from hyppopy.globals import DEBUGLEVEL
-from hyppopy.solvers.HyppopySolver import HyppopySolver
+from hyppopy.Trials import Trials as HyppopyTrials
+from hyppopy.solvers.HyppopySolver import HyppopySolver, select_history
+from hyppopy.CandidateDescriptor import CandidateDescriptor
+from hyppopy.Pruning import TrialPruned
 from hyppopy.BlackboxFunction import BlackboxFunction
 
 LOG = logging.getLogger(os.path.basename(__file__))
@@ -45,6 +49,10 @@ class HyperoptSolver(HyppopySolver):
         settings passed fullfill solver needs.
         """
         self._add_member("max_iterations", int)
+        self._add_member("batch_size", int, optional=True)
+        self._add_member("history_size", int, optional=True)
+        self._add_member("history_strategy", str, default="recent")
+        self._add_member("asynchronous", bool, default=False)
         self._add_hyperparameter_signature(name="domain", dtype=str,
                                           options=["uniform", "normal", "loguniform", "categorical"])
         self._add_hyperparameter_signature(name="data", dtype=list)
@@ -58,19 +66,26 @@ class HyperoptSolver(HyppopySolver):
 
         :return: [float] loss
         """
-        for name, p in self._searchspace.items():
-            if p["domain"] != "categorical":
-                if params[name] < p["data"][0]:
-                    params[name] = p["data"][0]
-                if params[name] > p["data"][1]:
-                    params[name] = p["data"][1]
+        params = self.clip_params(params)
         status = STATUS_FAIL
+        state = None
+        reporter = self.create_reporter(CandidateDescriptor(**params))
         try:
-            loss = self.blackbox(**params)
+            if reporter is None:
+                loss = self.blackbox(**params)
+            else:
+                loss = self.blackbox(reporter=reporter, **params)
+                self._pruner.complete(reporter)
             if loss is not None:
                 status = STATUS_OK
             else:
                 loss = 1e9
+        except TrialPruned as e:
+            # hyperopt knows no pruned status, the trial counts with its last reported value
+            LOG.debug("trial pruned: {}".format(e))
+            loss = reporter.last_value if reporter is not None and np.isfinite(reporter.last_value) else 1e9
+            status = STATUS_OK
+            state = 'pruned'
         except Exception as e:
             LOG.error("execution of self.blackbox(**params) failed due to:\n {}".format(e))
             status = STATUS_FAIL
@@ -78,69 +93,266 @@ class HyperoptSolver(HyppopySolver):
         cbd = copy.deepcopy(params)
         cbd['iterations'] = self._trials.trials[-1]['tid'] + 1
         cbd['loss'] = loss
-        cbd['status'] = status
+        cbd['status'] = status if state is None else state
         cbd['book_time'] = self._trials.trials[-1]['book_time']
         cbd['refresh_time'] = self._trials.trials[-1]['refresh_time']
         if isinstance(self.blackbox, BlackboxFunction) and self.blackbox.callback_func is not None:
             self.blackbox.callback_func(**cbd)
         if self._visdom_viewer is not None:
             self._visdom_viewer.update(cbd)
+        if state is not None:
+            return {'loss': loss, 'status': status, 'state': state}
         return {'loss': loss, 'status': status}
 
-    def loss_func_cand_preprocess(self, params):
+    def clip_params(self, params):
         """
-        Loss function wrapper function.
+        Clips the non categorical values of a parameter set to the bounds of their hyperparameter domain. Integer
+        ranges are sampled as quantized floats by hyperopt, they are rounded and cast to int here.
 
         :param params: [dict] hyperparameter set
 
-        :return: [float] loss
+        :return: [dict] clipped hyperparameter set
         """
         for name, p in self._searchspace.items():
-            if p["domain"] != "categorical":
-                if params[name] < p["data"][0]:
-                    params[name] = p["data"][0]
-                if params[name] > p["data"][1]:
-                    params[name] = p["data"][1]
-
+            if p["domain"] != "categorical" and name in params:
+                params[name] = min(max(params[name], p["data"][0]), p["data"][1])
+                if p["type"] is int:
+                    params[name] = int(np.round(params[name]))
         return params
 
-    def loss_func_postprocess(self, loss):
+    def loss_func_cand_preprocess(self, candidates):
         """
-        Loss function wrapper function.
+        Clips the non categorical values of each candidate to the bounds of its hyperparameter domain.
 
-        :param params: [dict] hyperparameter set
+        :param candidates: [list of CandidateDescriptors]
 
-        :return: [float] loss
+        :return: [list of CandidateDescriptors] clipped candidates
         """
+        for candidate in candidates:
+            self.clip_params(candidate.get_values())
+        return candidates
 
-        if loss is not None:
-            status = STATUS_OK
-        else:
-            loss = 1e9
+    def suggest(self, new_ids, domain, trials, seed):
+        """
+        Wraps tpe.suggest to bound the cost of a suggestion. If history_size is set the model is fit on at most
+        history_size finished trials selected by history_strategy (see select_history), pending trials are always
+        passed on. The finished trials are collected incrementally, see add_history, so only the selected docs are
+        handled and the cost of a suggestion does not grow with the number of trials.
+
+        :param new_ids: [list] trial ids to suggest
+        :param domain: [Domain] hyperopt domain
+        :param trials: [Trials] hyperopt Trials instance
+        :param seed: [int] seed
+
+        :return: [list] new trial docs
+        """
+        if self.history_size is None:
+            return tpe.suggest(new_ids, domain, trials, seed)
+        self.add_history(trials.trials[self._n_history_seen:])
+        self._n_history_seen = len(trials.trials)
+        indices = select_history(self._history_loss[:len(self._history_docs)], self.history_size,
+                                 self.history_strategy, self.rng)
+        history = Trials()
+        history.insert_trial_docs([self._history_docs[i] for i in indices] + self._history_pending)
+        history.refresh()
+        # the ids handed out by the subset are not used, new_ids still come from the full trials object
+        return tpe.suggest(new_ids, domain, history, seed)
 
-        # return {'loss': loss, 'status': status}
-        return loss
+    def reset_history(self):
+        """
+        Clears the history collected by add_history, called at the beginning of a run.
+        """
+        self._history_loss = np.empty(self.max_iterations)
+        self._history_docs = []
+        self._history_pending = []
+        self._n_history_seen = 0
+
+    def add_history(self, docs):
+        """
+        Adds new trial docs to the history. Finished docs are appended to the history the model is fit on, the others
+        are kept as pending until they are finished, only the new and the pending docs are checked.
+
+        :param docs: [list] new trial docs
+        """
+        pending = []
+        for doc in self._history_pending + list(docs):
+            if doc['state'] in (JOB_STATE_NEW, JOB_STATE_RUNNING):
+                pending.append(doc)
+                continue
+            loss = doc['result'].get('loss', np.nan) if doc['result'].get('status') == STATUS_OK else np.nan
+            self._history_loss[len(self._history_docs)] = np.nan if loss is None else loss
+            self._history_docs.append(doc)
+        self._history_pending = pending
 
     def execute_solver(self, searchspace):
         """
         This function is called immediately after convert_searchspace and get the output of the latter as input. It's
-        purpose is to call the solver libs main optimization function.
+        purpose is to call the solver libs main optimization function. If asynchronous is set the asynchronous mode is
+        used, if batch_size is set the batched mode, otherwise hyperopt.fmin drives the optimization sequentially.
 
         :param searchspace: converted hyperparameter space
         """
         LOG.debug("execute_solver using solution space:\n\n\t{}\n".format(pformat(searchspace)))
+        if self.history_size is not None and self.history_size < tpe._default_n_startup_jobs:
+            msg = "history_size needs to be at least {}, the number of random startup trials of tpe.suggest, " \
+                  "otherwise the model never takes over!".format(tpe._default_n_startup_jobs)
+            LOG.error(msg)
+            raise AssertionError(msg)
+        self.reset_history()
+        if self.asynchronous:
+            self.execute_solver_async(searchspace)
+            return
+        if self.batch_size is not None:
+            self.execute_solver_batched(searchspace)
+            return
         self.trials = Trials()
 
         try:
-            self.best = fmin(fn=self.loss_function,
-                             space=searchspace,
-                             algo=tpe.suggest,
-                             max_evals=self.max_iterations,
-                             trials=self.trials)
+            best = fmin(fn=self.loss_function,
+                        space=searchspace,
+                        algo=self.suggest,
+                        max_evals=self.max_iterations,
+                        trials=self.trials,
+                        rstate=self.spawn_rngs(1)[0])
+            # fmin returns the indices of categorical choices, the other modes the values
+            self.best = self.clip_params(space_eval(searchspace, best))
         except Exception as e:
             msg = "internal error in hyperopt.fmin occured. {}".format(e)
             LOG.error(msg)
             raise BrokenPipeError(msg)
+        self.trials = self.decode_trials(searchspace, self.trials)
+
+    def decode_trials(self, searchspace, trials):
+        """
+        Converts the history of hyperopt.fmin into the Trials the other modes record via register_results. The
+        parameters are decoded and cast like the evaluated candidates, i.e. categorical choices are values instead of
+        indices and integers are ints, failed trials get a nan loss.
+
+        :param searchspace: converted hyperparameter space
+        :param trials: [Trials] hyperopt Trials instance
+
+        :return: [HyppopyTrials] decoded trials
+        """
+        history = HyppopyTrials()
+        for doc in trials.trials:
+            tid = doc['tid'] + 1
+            params = self.clip_params(space_eval(searchspace, spec_from_misc(doc['misc'])))
+            result = {'loss': doc['result'].get('loss'), 'status': doc['result'].get('state', 'ok')}
+            if doc['result'].get('status') != STATUS_OK:
+                result = {'loss': np.nan, 'status': 'failed'}
+            history.trials.append({'tid': tid,
+                                   'result': result,
+                                   'misc': {
+                                       'tid': tid,
+                                       'idxs': dict((name, [tid]) for name in params.keys()),
+                                       'vals': dict((name, [value]) for name, value in params.items())
+                                   },
+                                   'book_time': doc['book_time'],
+                                   'refresh_time': doc['refresh_time']})
+        return history
+
+    def execute_solver_batched(self, searchspace):
+        """
+        Batched optimization mode. Each step asks tpe.suggest for batch_size new trials and evaluates them at once via
+        loss_function_batch, e.g. distributed to the workers of an MPIBlackboxFunction. Like in hyperopt's parallel
+        backends the trials of a batch are suggested one after another and are inserted as pending trials, a pending
+        trial counts as a trial of infinite loss for the following suggestions, this way the batch spreads out instead
+        of proposing the same point batch_size times.
+
+        :param searchspace: converted hyperparameter space
+        """
+        assert self.batch_size > 0, "precondition violation, batch_size needs to be > 0!"
+        rstate = self.spawn_rngs(1)[0]
+        domain = Domain(lambda params: None, searchspace)
+        model_trials = Trials()
+        try:
+            n_done = 0
+            while n_done < self.max_iterations:
+                docs = [self.ask_trial(domain, model_trials, rstate)
+                        for _ in range(min(self.batch_size, self.max_iterations - n_done))]
+                candidates = [CandidateDescriptor(**self.clip_params(space_eval(searchspace, spec_from_misc(doc['misc']))))
+                              for doc in docs]
+                results = self.loss_function_batch(candidates)
+                for doc, candidate in zip(docs, candidates):
+                    self.tell_trial(doc, results[candidate.ID])
+                if self.history_size is None:
+                    model_trials.refresh()
+                n_done += len(docs)
+        except Exception as e:
+            msg = "internal error in hyperopt batched execute_solver occured. {}".format(e)
+            LOG.error(msg)
+            raise BrokenPipeError(msg)
+        self.best = self._trials.argmin
+
+    def execute_solver_async(self, searchspace):
+        """
+        Asynchronous optimization mode, see HyppopySolver.loss_function_async. Whenever a worker is free tpe.suggest is
+        asked for a single new trial, which is inserted as pending trial like in the batched mode, and each result is
+        told to the model as soon as it arrives.
+
+        :param searchspace: converted hyperparameter space
+        """
+        rstate = self.spawn_rngs(1)[0]
+        domain = Domain(lambda params: None, searchspace)
+        model_trials = Trials()
+        docs = {}
+
+        def ask():
+            doc = self.ask_trial(domain, model_trials, rstate)
+            candidate = CandidateDescriptor(**self.clip_params(space_eval(searchspace, spec_from_misc(doc['misc']))))
+            docs[candidate.ID] = doc
+            return candidate
+
+        def tell(candidate, result):
+            self.tell_trial(docs.pop(candidate.ID), result)
+            if self.history_size is None:
+                model_trials.refresh()
+
+        try:
+            self.loss_function_async(ask, tell, self.max_iterations)
+        except Exception as e:
+            msg = "internal error in hyperopt asynchronous execute_solver occured. {}".format(e)
+            LOG.error(msg)
+            raise BrokenPipeError(msg)
+        self.best = self._trials.argmin
+
+    def ask_trial(self, domain, model_trials, rstate):
+        """
+        Asks tpe.suggest for a new trial and inserts it into the model trials as pending trial. If history_size is set
+        the model is only fit on the history, the doc is added there instead, see add_history, so the model trials
+        are not refreshed for each trial.
+
+        :param domain: [Domain] hyperopt domain
+        :param model_trials: [Trials] hyperopt Trials instance the model is fit on, providing the trial ids
+        :param rstate: [Generator] random generator the suggestion seeds are drawn from
+
+        :return: [dict] trial doc
+        """
+        tid = model_trials.new_trial_ids(1)[0]
+        docs = self.suggest([tid], domain, model_trials, int(rstate.integers(2 ** 31 - 1)))
+        if self.history_size is not None:
+            self.add_history(docs)
+            return docs[0]
+        model_trials.insert_trial_docs(docs)
+        model_trials.refresh()
+        return model_trials.trials[-1]
+
+    def tell_trial(self, doc, result):
+        """
+        Stores the result of a pending trial in its doc, the model trials need to be refreshed afterwards unless
+        history_size is set.
+
+        :param doc: [dict] trial doc
+        :param result: [dict] result dict e.g. {'loss': 0.5, 'book_time': ..., 'refresh_time': ...}
+        """
+        loss = result['loss']
+        if loss is None or not np.isfinite(loss):
+            doc['result'] = {'status': STATUS_FAIL}
+        else:
+            doc['result'] = {'loss': float(loss), 'status': STATUS_OK}
+        doc['state'] = JOB_STATE_DONE
+        doc['book_time'] = result['book_time']
+        doc['refresh_time'] = result['refresh_time']
 
     def convert_searchspace(self, hyperparameter):
         """
@@ -183,8 +395,8 @@ class HyperoptSolver(HyppopySolver):
             if dtype is float:
                 return hp.uniform(name, data[0], data[1])
             elif dtype is int:
-                data = list(np.arange(int(data[0]), int(data[1] + 1)))
-                return hp.choice(name, data)
+                # each integer gets an interval of width one, so the bounds are as likely as the inner values
+                return hp.quniform(name, int(data[0]) - 0.5, int(data[1]) + 0.5, 1)
             else:
                 msg = "cannot convert the type {} in domain {}".format(dtype, domain)
                 LOG.error(msg)
@@ -202,6 +414,10 @@ class HyperoptSolver(HyppopySolver):
                 assert rexp is not np.nan, "precondition violation, right bound input error, results in nan!"
 
                 return hp.loguniform(name, lexp, rexp)
+            elif dtype is int:
+                assert data[0] >= 1, "precondition Violation, a < 1!"
+                assert data[0] < data[1], "precondition Violation, a > b!"
+                return hp.qloguniform(name, np.log(int(data[0]) - 0.5), np.log(int(data[1]) + 0.5), 1)
             else:
                 msg = "cannot convert the type {} in domain {}".format(dtype, domain)
                 LOG.error(msg)
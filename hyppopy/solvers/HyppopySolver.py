@@ -13,7 +13,7 @@ from _pytest import deprecated
 
 from hyppopy import CandidateDescriptor
 
-__all__ = ['HyppopySolver']
+__all__ = ['HyppopySolver', 'select_history']
 
 import abc
 import copy
@@ -21,8 +21,9 @@ import types
 import datetime
 import numpy as np
 import pandas as pd
-from hyperopt import Trials
 from hyppopy.globals import *
+from hyppopy.Trials import Trials
+from hyppopy.Pruning import TrialPruned, Reporter, get_pruner, accepts_reporter, accepts_keywords
 from hyppopy.CandidateDescriptor import CandidateDescriptor
 from hyppopy.VisdomViewer import VisdomViewer
 from hyppopy.HyppopyProject import HyppopyProject
@@ -35,6 +36,53 @@ LOG = logging.getLogger(os.path.basename(__file__))
 LOG.setLevel(DEBUGLEVEL)
 
 
+HISTORY_STRATEGIES = ["recent", "topk", "stratified"]
+
+
+def select_history(losses, size, strategy="recent", rng=None):
+    """
+    Selects the subset of the history a model based solver is fit on, this bounds the cost of a suggestion for long
+    runs. Available strategies are:
+
+    - recent: the size most recent trials
+    - topk: the size // 2 best trials plus a random subsample of the remaining ones
+    - stratified: the trials are sorted by loss and divided into size strata of equal size, one random trial per
+                  stratum is selected, the best trial is always kept
+
+    Trials with a nan loss are considered worst.
+
+    :param losses: [array_like] losses of the history in chronological order
+    :param size: [int] maximum number of trials selected, if None all trials are selected
+    :param strategy: [str] selection strategy, one of 'recent', 'topk' or 'stratified', default='recent'
+    :param rng: [Generator] numpy random Generator, if None a fresh one is created, default=None
+
+    :return: [ndarray] sorted indices of the selected trials
+    """
+    if strategy not in HISTORY_STRATEGIES:
+        msg = "unknown history strategy {}, available are {}!".format(strategy, HISTORY_STRATEGIES)
+        LOG.error(msg)
+        raise LookupError(msg)
+    losses = np.asarray(losses, dtype=float)
+    N = len(losses)
+    if size is None or N <= size:
+        return np.arange(N)
+    assert size > 0, "precondition violation, history size needs to be > 0!"
+    if strategy == "recent":
+        return np.arange(N - size, N)
+    if rng is None:
+        rng = np.random.default_rng()
+    ranks = np.argsort(np.where(np.isnan(losses), np.inf, losses), kind="stable")
+    if strategy == "topk":
+        n_top = max(size // 2, 1)
+        rest = ranks[n_top:]
+        subsample = rest[np.argsort(rng.random(len(rest)))[:size - n_top]]
+        return np.sort(np.concatenate([ranks[:n_top], subsample]))
+    bounds = np.linspace(0, N, size + 1).astype(int)
+    picks = bounds[:-1] + np.floor(rng.random(size) * (bounds[1:] - bounds[:-1])).astype(int)
+    picks[0] = 0
+    return np.sort(ranks[picks])
+
+
 class HyppopySolver(object):
     """
     The HyppopySolver class is the base class for all solver addons. It defines virtual functions a child class has
@@ -79,16 +127,22 @@ class HyppopySolver(object):
         """
         self._idx = 0                        # current iteration counter
         self._best = None                       # best parameter set
-        self._trials = None                     # trials object, hyppopy uses the Trials object from hyperopt
+        self._trials = None                     # trials object, hyppopy.Trials or a solver lib Trials object of the same layout
         self._blackbox = None                   # blackbox function, eiter a  function or a BlackboxFunction instance
         self._total_duration = None             # keeps track of the solvers running time
         self._solver_overhead = None            # stores the time overhead of the solver, means total time minus time in blackbox
         self._time_per_iteration = None         # mean time per iterration
         self._accumulated_blackbox_time = None  # summed time the solver was in the blackbox function
         self._visdom_viewer = None              # visdom viewer instance
+        self._seed_sequence = None              # numpy SeedSequence all random streams of a run are spawned from
+        self._rng = None                        # numpy Generator used by the solver for its own random draws
+        self._worker_seed_sequence = None       # numpy SeedSequence the streams of parallel worker processes are spawned from
+        self._pruner = None                     # Pruner instance deciding about stopping trials early
 
         self._child_members = {}                # this dict keeps track of the settings the child solver defines
         self._hopt_signatures = {}              # this dict keeps track of the hyperparameter signatures the child solver defines
+        self._add_member("seed", int, optional=True)  # optional seed making all random draws of a run reproducible
+        self._add_member("pruner", object, optional=True)  # optional Pruner instance or name, see hyppopy.Pruning.get_pruner
         self.define_interface()                 # the child define interface function is called which defines settings and hyperparameter signatures
 
         if project is not None:
@@ -160,15 +214,17 @@ class HyppopySolver(object):
         """
         raise NotImplementedError('users must define define_interface to use this class')
 
-    def _add_member(self, name, dtype, value=None, default=None):
+    def _add_member(self, name, dtype, value=None, default=None, optional=False):
         """
         When designing your child solver class you need to implement the define_interface abstract method where you can
-        call _add_member to define custom solver options that are automatically converted to class attributes.
+        call _add_member to define custom solver options that are automatically converted to class attributes. Options
+        with a default value or flagged optional may be missing in the project, they are then set to their default.
 
         :param name: [str] option name
         :param dtype: [type] option data type
         :param value: [object] option value
         :param default: [object] option default value
+        :param optional: [bool] if True the option may be missing in the project even if default is None
         """
         assert isinstance(name, str), "precondition violation, name needs to be of type str, got {}".format(type(name))
         if value is not None:
@@ -176,7 +232,7 @@ class HyppopySolver(object):
         if default is not None:
             assert isinstance(default, dtype), "precondition violation, default does not match dtype condition!"
         setattr(self, name, value)
-        self._child_members[name] = {"type": dtype, "value": value, "default": default}
+        self._child_members[name] = {"type": dtype, "value": value, "default": default, "optional": optional}
 
     def _add_hyperparameter_signature(self, name, dtype, options=None):
         """
@@ -217,8 +273,11 @@ class HyppopySolver(object):
                             raise LookupError(msg)
 
         # check child members
-        for name in self._child_members.keys():
+        for name, member in self._child_members.items():
             if name not in self.project.__dict__.keys():
+                if member["default"] is not None or member.get("optional", False):
+                    self.__dict__[name] = member["default"]
+                    continue
                 msg = "missing settings field {}!".format(name)
                 LOG.error(msg)
                 raise LookupError(msg)
@@ -238,6 +297,56 @@ class HyppopySolver(object):
         tmp = self.total_duration - self._accumulated_blackbox_time
         self._solver_overhead = int(np.round(100.0 / (self.total_duration + 1e-12) * tmp))
 
+    def _init_random_streams(self):
+        """
+        Creates the root SeedSequence of a run from the seed setting and the solvers own random Generator. All other
+        random streams, e.g. for solver libs, parallel workers or batch chunks, are spawned from the root sequence,
+        which makes them statistically independent and, if a seed is set, reproducible.
+        """
+        self._seed_sequence, self._worker_seed_sequence = np.random.SeedSequence(self.seed).spawn(2)
+        self._rng = np.random.default_rng(self._seed_sequence.spawn(1)[0])
+
+    def spawn_rngs(self, n):
+        """
+        Returns n independent random Generators spawned from the runs SeedSequence.
+
+        :param n: [int] number of Generators
+
+        :return: [list] list of numpy Generators
+        """
+        if self._seed_sequence is None:
+            self._init_random_streams()
+        return [np.random.default_rng(s) for s in self._seed_sequence.spawn(n)]
+
+    def worker_seed_sequence(self, rank):
+        """
+        Returns the SeedSequence of a parallel worker process. The worker sequences are spawned from a separate branch
+        of the runs root sequence, so they neither overlap with each other nor with the solvers own streams and each
+        process can derive its own sequence independently.
+
+        :param rank: [int] worker index
+
+        :return: [SeedSequence] worker seed sequence
+        """
+        if self._worker_seed_sequence is None:
+            self._init_random_streams()
+        return np.random.SeedSequence(self._worker_seed_sequence.entropy,
+                                      spawn_key=self._worker_seed_sequence.spawn_key + (rank,),
+                                      pool_size=self._worker_seed_sequence.pool_size)
+
+    def spawn_seed(self):
+        """
+        Returns an integer seed spawned from the runs SeedSequence, for solver libs not accepting numpy Generators.
+        If no seed is set None is returned, leaving the solver lib with its own entropy source.
+
+        :return: [int] seed or None
+        """
+        if self.seed is None:
+            return None
+        if self._seed_sequence is None:
+            self._init_random_streams()
+        return int(self._seed_sequence.spawn(1)[0].generate_state(1)[0])
+
     def loss_function(self, **params):
         """
         This function is called each iteration with a selected parameter set. The parameter set selection is driven by
@@ -254,39 +363,65 @@ class HyppopySolver(object):
 
         return list(results.values())[0]['loss']  # Here 'results' will always contain a single dict. We extract the loss from it and return it.
 
+    def setup_pruner(self):
+        """
+        Creates the Pruner instance of a run from the pruner setting, see hyppopy.Pruning.get_pruner.
+
+        :return: [Pruner] pruner instance or None
+        """
+        return get_pruner(self.pruner)
+
+    def create_reporter(self, candidate):
+        """
+        Creates the Reporter passed to the blackbox when evaluating a candidate. A reporter is only created if a pruner
+        is set and the blackbox function declares a reporter argument. Solvers with their own pruning mechanism can
+        overwrite this function (e.g. OptunaSolver).
+
+        :param candidate: [CandidateDescriptor] candidate to be evaluated
+
+        :return: [Reporter] reporter instance or None
+        """
+        if self._pruner is None:
+            return None
+        func = self.blackbox.blackbox_func if isinstance(self.blackbox, BlackboxFunction) else self.blackbox
+        if not accepts_reporter(func):
+            return None
+        return Reporter(self._pruner)
+
     def loss_function_batch(self, candidates):
         """
         This function is called with a list of candidates. This list is driven by the solver lib itself.
         The purpose of this function is to take care of the iteration reporting and the calling
         of the callback_func if available. As a developer you might want to overwrite this function (or the 'non-batch'-version completely (e.g.
-        HyperoptSolver).
+        HyperoptSolver). If the blackbox supports batch evaluation via call_batch (e.g. MPIBlackboxFunction) the whole
+        batch is passed to it, otherwise, or if call_batch fails, the candidates are evaluated one after another.
 
         :param candidates: [list of CandidateDescriptors]
 
         :return: [dict] result e.g. {'loss': 0.5, 'book_time': ..., 'refresh_time': ...}
         """
 
-        # print('hello'*10)
-        results = dict()
-        try:
-            candidates = self.loss_func_cand_preprocess(candidates)
-            results = self.blackbox.call_batch(candidates)
-            if results is None:
-                results = np.nan
-            results = self.loss_func_postprocess(results)
-        except ZeroDivisionError as e:
-            # Fallback: If call_batch is not supported in BlackboxFunction, we iterate over the candidates in the batch.
-            message = "Script not started via MPI:\n {}".format(e)
-            LOG.error(message)
-            print(message)
-        except Exception as e:
-            message = "call_batch not supported in BlackboxFunction:\n {}".format(e)
-            LOG.error(message)
-            print(message)
-        finally:
+        results = None
+        if hasattr(self.blackbox, "call_batch"):
+            try:
+                candidates = self.loss_func_cand_preprocess(candidates)
+                results = self.blackbox.call_batch(candidates)
+                results = self.loss_func_postprocess(results)
+            except ZeroDivisionError as e:
+                # Fallback: If the script was not started via MPI, we iterate over the candidates in the batch.
+                message = "Script not started via MPI:\n {}".format(e)
+                LOG.error(message)
+                print(message)
+                results = None
+            except Exception as e:
+                message = "call_batch failed, falling back to sequential evaluation:\n {}".format(e)
+                LOG.error(message)
+                print(message)
+                results = None
+        if results is None:
+            results = dict()
             for i, candidate in enumerate(candidates):
                 cand_id = candidate.ID
-                # params = candidate.get_values()
 
                 cand_results = dict()
                 cand_results['book_time'] = datetime.datetime.now()
@@ -294,10 +429,22 @@ class HyppopySolver(object):
                     preprocessed_candidate_list = self.loss_func_cand_preprocess([candidate])
                     candidate = preprocessed_candidate_list[0]
                     params = candidate.get_values()
+                    reporter = self.create_reporter(candidate)
+                    kwargs = dict(params) if reporter is None else dict(params, reporter=reporter)
                     try:
-                        loss = self.blackbox(**params)
-                    except:
-                        loss = self.blackbox(params)
+                        if accepts_keywords(self.blackbox, kwargs.keys()):
+                            loss = self.blackbox(**kwargs)
+                        elif reporter is None:
+                            loss = self.blackbox(params)
+                        else:
+                            loss = self.blackbox(params, reporter=reporter)
+                    except TrialPruned as e:
+                        LOG.debug("trial pruned: {}".format(e))
+                        cand_results['status'] = 'pruned'
+                        loss = np.nan if reporter is None else reporter.last_value
+                    else:
+                        if reporter is not None and self._pruner is not None:
+                            self._pruner.complete(reporter)
                     if loss is None:
                         loss = np.nan
                     cand_results['loss'] = loss
@@ -308,7 +455,16 @@ class HyppopySolver(object):
                 results[cand_id] = cand_results
             results = self.loss_func_postprocess(results)
 
-        # initialize trials
+        self.register_results(candidates, results)
+        return results
+
+    def register_results(self, candidates, results):
+        """
+        Appends the evaluated candidates to the trials and calls the callback_func of the blackbox if available.
+
+        :param candidates: [list of CandidateDescriptors] evaluated candidates
+        :param results: [dict] result dicts by candidate ID e.g. {id: {'loss': 0.5, 'book_time': ..., 'refresh_time': ...}}
+        """
         for i, candidate in enumerate(candidates):
             self._idx += 1
             vals = {}
@@ -329,8 +485,8 @@ class HyppopySolver(object):
             try:
                 loss = results[candidate.ID]['loss']
                 trial['result']['loss'] = loss
-                trial['result']['status'] = 'ok'
-                if loss is np.nan:
+                trial['result']['status'] = results[candidate.ID].get('status', 'ok')
+                if loss is np.nan and trial['result']['status'] == 'ok':
                     trial['result']['status'] = 'failed'
             except Exception as e:
                 LOG.error("computing loss failed due to:\n {}".format(e))
@@ -347,7 +503,47 @@ class HyppopySolver(object):
             if (isinstance(self.blackbox, BlackboxFunction) or isinstance(self.blackbox, MPIBlackboxFunction)) and self.blackbox.callback_func is not None:
                 self.blackbox.callback_func(**cbd)
 
-        return results
+    def loss_function_async(self, ask, tell, num_candidates):
+        """
+        Asynchronous counterpart of loss_function_batch for model based solvers. Whenever the blackbox has a free
+        worker the solver is asked for a new candidate, which is submitted right away, and each finished candidate is
+        told to the solver as soon as its result arrives. There are no batch barriers, all workers are kept busy and
+        each suggestion is made knowing the results so far and the candidates still pending. This requires a blackbox
+        supporting submit, free_slots and wait_any, e.g. MPIBlackboxFunction run on several ranks, otherwise the
+        candidates are asked for and evaluated one after another.
+
+        :param ask: [callable] returns the next CandidateDescriptor, the solver keeps track of the candidates it handed
+                    out, those not told yet are pending
+        :param tell: [callable] tell(candidate, result) passes the result dict of a finished candidate to the solver
+        :param num_candidates: [int] number of candidates to evaluate
+        """
+        asynchronous = hasattr(self.blackbox, "submit")
+        if asynchronous:
+            try:
+                self.blackbox.free_slots()
+            except ZeroDivisionError as e:
+                LOG.warning("Script not started via MPI, evaluating sequentially: {}".format(e))
+                asynchronous = False
+        if not asynchronous:
+            for n in range(num_candidates):
+                candidate = ask()
+                results = self.loss_function_batch([candidate])
+                tell(candidate, results[candidate.ID])
+            return
+
+        pending = {}
+        num_asked = 0
+        while num_asked < num_candidates or len(pending) > 0:
+            while num_asked < num_candidates and self.blackbox.free_slots() > 0:
+                candidate = self.loss_func_cand_preprocess([ask()])[0]
+                pending[candidate.ID] = candidate
+                self.blackbox.submit(candidate)
+                num_asked += 1
+            results = self.loss_func_postprocess(self.blackbox.wait_any())
+            for cand_id in results.keys():
+                candidate = pending.pop(cand_id)
+                self.register_results([candidate], results)
+                tell(candidate, results[cand_id])
 
     def run(self, print_stats=True):
         """
@@ -357,6 +553,8 @@ class HyppopySolver(object):
         """
         self._idx = 0
         self.trials = Trials()
+        self._init_random_streams()
+        self._pruner = self.setup_pruner()
 
         start_time = datetime.datetime.now()
         try:
@@ -389,8 +587,8 @@ class HyppopySolver(object):
 
         :return: [DataFrame], [dict] history and optimal parameter set
         """
-        assert isinstance(self.trials, Trials), "precondition violation, wrong trials type! Maybe solver was not yet executed?"
-        results = {'duration': [], 'losses': [], 'status': []}
+        assert hasattr(self.trials, "trials"), "precondition violation, wrong trials type! Maybe solver was not yet executed?"
+        results = {'duration': [], 'losses': [], 'status': [], 'state': []}
         pset = self.trials.trials[0]['misc']['vals']
         for p in pset.keys():
             results[p] = []
@@ -400,7 +598,9 @@ class HyppopySolver(object):
             t2 = trial['refresh_time']
             results['duration'].append((t2 - t1).microseconds / 1000.0)
             results['losses'].append(trial['result']['loss'])
-            results['status'].append(trial['result']['status'] == 'ok')
+            state = trial['result'].get('state', trial['result']['status'])
+            results['status'].append(state == 'ok')
+            results['state'].append(state)
             losses = np.array(results['losses'])
             results['losses'] = list(losses)
             pset = trial['misc']['vals']
@@ -533,6 +733,17 @@ class HyppopySolver(object):
             raise TypeError(msg)
         self._best = value
 
+    @property
+    def rng(self):
+        """
+        Get the solvers random Generator, seeded via the seed setting.
+
+        :return: [Generator] numpy random Generator
+        """
+        if self._rng is None:
+            self._init_random_streams()
+        return self._rng
+
     @property
     def trials(self):
         """
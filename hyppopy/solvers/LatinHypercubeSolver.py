@@ -0,0 +1,126 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+__all__ = ['LatinHypercubeSolver', 'get_latin_hypercube']
+
+import os
+import logging
+import numpy as np
+from pprint import pformat
+from hyppopy.globals import DEBUGLEVEL
+from hyppopy.CandidateDescriptor import CandidateDescriptor
+from hyppopy.solvers.HyppopySolver import HyppopySolver
+from hyppopy.solvers.RandomsearchSolver import transform_unit_samples
+
+LOG = logging.getLogger(os.path.basename(__file__))
+LOG.setLevel(DEBUGLEVEL)
+
+
+def get_latin_hypercube(N_samples, N_dims, rng=None):
+    """
+    Returns a latin hypercube design in the unit cube. Each axis is divided into N_samples strata of equal width and
+    each stratum of each axis is hit by exactly one sample, the samples are randomly placed within their strata.
+
+    :param N_samples: [int] number of samples
+    :param N_dims: [int] number of dimensions
+    :param rng: [Generator] numpy random Generator, if None a fresh one is created, default=None
+
+    :return: [ndarray] design of shape (N_samples, N_dims) with values in [0, 1)
+    """
+    assert isinstance(N_samples, int), "condition N_samples of type int violated!"
+    assert isinstance(N_dims, int), "condition N_dims of type int violated!"
+    if rng is None:
+        rng = np.random.default_rng()
+    strata = np.argsort(rng.random((N_samples, N_dims)), axis=0)
+    return (strata + rng.random((N_samples, N_dims))) / N_samples
+
+
+class LatinHypercubeSolver(HyppopySolver):
+    """
+    The LatinHypercubeSolver class implements a stratified space filling search. The solver creates a latin hypercube
+    design with max_iterations samples in the unit cube and maps each axis onto its hyperparameter domain via the
+    inverse cumulative distribution function. This way categorical, uniform, normal and loguniform domains are
+    supported and, for a fixed number of evaluations, the space is covered much more evenly than by independent random
+    draws. The whole design is created at once and evaluated as a single batch.
+    """
+    def __init__(self, project=None):
+        """
+        The constructor accepts a HyppopyProject.
+
+        :param project: [HyppopyProject] project instance, default=None
+        """
+        HyppopySolver.__init__(self, project)
+
+    def define_interface(self):
+        """
+        This function is called when HyppopySolver.__init__ function finished. Child classes need to define their
+        individual parameter here by calling the _add_member function for each class member variable need to be defined.
+        Using _add_hyperparameter_signature the structure of a hyperparameter the solver expects must be defined.
+        Both, members and hyperparameter signatures are later get checked, before executing the solver, ensuring
+        settings passed fullfill solver needs.
+        """
+        self._add_member("max_iterations", int)
+        self._add_hyperparameter_signature(name="domain", dtype=str,
+                                          options=["uniform", "normal", "loguniform", "categorical"])
+        self._add_hyperparameter_signature(name="data", dtype=list)
+        self._add_hyperparameter_signature(name="type", dtype=type)
+
+    def get_unit_design(self, N_samples, N_dims):
+        """
+        Returns the design in the unit cube the candidates are created from.
+
+        :param N_samples: [int] number of samples
+        :param N_dims: [int] number of dimensions
+
+        :return: [ndarray] design of shape (N_samples, N_dims) with values in [0, 1)
+        """
+        return get_latin_hypercube(N_samples, N_dims, self.rng)
+
+    def get_candidates(self, searchspace):
+        """
+        This function converts the searchspace to a candidate_list that can then be used to distribute via MPI.
+
+        :param searchspace: converted hyperparameter space
+        """
+        names = list(searchspace.keys())
+        design = self.get_unit_design(self.max_iterations, len(names))
+        columns = [transform_unit_samples(searchspace[name], design[:, n]) for n, name in enumerate(names)]
+        return [CandidateDescriptor(**dict(zip(names, row))) for row in zip(*columns)]
+
+    def execute_solver(self, searchspace):
+        """
+        This function is called immediately after convert_searchspace and get the output of the latter as input. It's
+        purpose is to call the solver libs main optimization function.
+
+        :param searchspace: converted hyperparameter space
+        """
+        candidates = self.get_candidates(searchspace)
+        try:
+            self.loss_function_batch(candidates)
+        except Exception as e:
+            msg = "internal error in {} execute_solver occured. {}".format(self.__class__.__name__, e)
+            LOG.error(msg)
+            raise BrokenPipeError(msg)
+        self.best = self._trials.argmin
+
+    def convert_searchspace(self, hyperparameter):
+        """
+        This function gets the unified hyppopy-like parameterspace description as input and, if necessary, should
+        convert it into a solver lib specific format. The function is invoked when run is called and what it returns
+        is passed as searchspace argument to the function execute_solver.
+
+        :param hyperparameter: [dict] nested parameter description dict e.g. {'name': {'domain':'uniform', 'data':[0,1], 'type':'float'}, ...}
+
+        :return: [object] converted hyperparameter space
+        """
+        LOG.debug("convert input parameter\n\n\t{}\n".format(pformat(hyperparameter)))
+        return hyperparameter
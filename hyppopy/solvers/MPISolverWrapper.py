@@ -9,18 +9,54 @@
 # A PARTICULAR PURPOSE.
 #
 # See LICENSE
-import datetime
+
+__all__ = ['MPISolverWrapper', 'create_solver_groups']
+
 import os
+import random
 import logging
 
 import numpy as np
 from mpi4py import MPI
 from hyppopy.globals import DEBUGLEVEL, MPI_TAGS
+from hyppopy.MPIWireFormat import pack_results
+from hyppopy.MPIBlackboxFunction import MPIBlackboxFunction, evaluate_params
 
 LOG = logging.getLogger(os.path.basename(__file__))
 LOG.setLevel(DEBUGLEVEL)
 
 
+def create_solver_groups(num_groups, mpi_comm=None):
+    """
+    Splits a communicator into num_groups independent groups of consecutive ranks, e.g. to run several optimizations
+    with different projects, seeds or solvers within one allocation. Each group gets its own communicator in which
+    rank 0 is the master running the solver and the other ranks are its workers. As every group communicates on its
+    own communicator, the messages of different groups can not interfere although they use the same MPI_TAGS.
+
+    Example with 8 ranks in two groups of 4:
+
+        group, group_comm = create_solver_groups(2)
+        solver = MPISolverWrapper(solver=SolverPool.get(project=projects[group]), mpi_comm=group_comm)
+        solver.blackbox = MPIBlackboxFunction(blackbox_func=my_loss, mpi_comm=group_comm)
+        solver.run()
+
+    :param num_groups: [int] number of groups, at most the communicator size
+    :param mpi_comm: [MPI communicator] communicator to split. If None, MPI.COMM_WORLD is used, default=None
+
+    :return: [tuple] (group index of the calling rank, communicator of its group)
+    """
+    if mpi_comm is None:
+        mpi_comm = MPI.COMM_WORLD
+    size = mpi_comm.Get_size()
+    if not 0 < num_groups <= size:
+        msg = "cannot split {} ranks into {} groups!".format(size, num_groups)
+        LOG.error(msg)
+        raise AssertionError(msg)
+    rank = mpi_comm.Get_rank()
+    group = rank * num_groups // size
+    return group, mpi_comm.Split(color=group, key=rank)
+
+
 class MPISolverWrapper:
     """
     TODO Class description
@@ -55,10 +91,15 @@ class MPISolverWrapper:
     def blackbox(self, value):
         """
         Set the BlackboxFunction wrapper class encapsulating the loss function or a function accepting a hyperparameter set
-        and returning a float.
+        and returning a float. An MPIBlackboxFunction needs to use the communicator of the wrapper, otherwise the master
+        would send the candidates to ranks the workers of this wrapper do not listen to.
 
         :return:
         """
+        if isinstance(value, MPIBlackboxFunction) and MPI.Comm.Compare(value.mpi_comm, self._mpi_comm) != MPI.IDENT:
+            msg = "the MPIBlackboxFunction and the MPISolverWrapper need to use the same mpi_comm!"
+            LOG.error(msg)
+            raise AssertionError(msg)
         self._solver.blackbox = value
 
     def get_results(self):
@@ -72,59 +113,67 @@ class MPISolverWrapper:
             return self._solver.get_results()
         return None, None
 
+    def seed_worker(self):
+        """
+        Seeds the module-level random and numpy random generators of a worker rank with a stream spawned for this rank
+        from the solvers seed. Every rank thus draws from an independent, reproducible stream instead of sharing the
+        identical global state, which e.g. forked processes would inherit.
+        """
+        rank = self._mpi_comm.Get_rank()
+        state = self._solver.worker_seed_sequence(rank).generate_state(1)[0]
+        np.random.seed(state)
+        random.seed(int(state))
+
+    def evaluate(self, params):
+        """
+        Evaluates the blackbox function of the solver for a parameter set, passing the data of the blackbox if the loss
+        function accepts it.
+
+        :param params: [dict] hyperparameter set e.g. {'p1': 0.123, 'p2': 3.87, ...}
+
+        :return: [dict] result e.g. {'loss': 0.5, 'book_time': ..., 'refresh_time': ...}
+        """
+        return evaluate_params(self._solver.blackbox, params, self._mpi_comm.Get_rank())
+
     def run_worker_mode(self):
         """
         This function is called if the wrapper should run as a worker for a specific MPI rank.
         It receives messages for the following tags:
-        tag==MPI_SEND_CANDIDATE: parameters for the loss calculation. It param==None, the worker finishes.
-        It sends messages for the following tags:
-        tag==MPI_SEND_RESULT: result of an evaluated candidate.
-
-        :return: the evaluated loss of the candidate
+        tag==MPI_SEND_SCHEMA: CandidateSchema describing the following candidate buffers.
+        tag==MPI_SEND_CANDIDATE_BUFFER: float64 buffer of numeric candidates for the loss calculation.
+        tag==MPI_SEND_CANDIDATE: list of pickled candidates for the loss calculation. If it is None, the worker finishes.
+        It sends one message per received batch for the following tags:
+        tag==MPI_SEND_RESULTS_BUFFER: float64 buffer of the results, see MPIWireFormat.pack_results.
+        tag==MPI_SEND_RESULTS: list of pickled (cand_id, result) pairs if the results can not be packed.
         """
         rank = self._mpi_comm.Get_rank()
         print("Starting worker {}. Waiting for param...".format(rank))
 
-        cand_results = dict()
-
+        schema = None
+        status = MPI.Status()
         while True:
-            try:
-                candidate = self._mpi_comm.recv(source=0, tag=MPI_TAGS.MPI_SEND_CANDIDATE.value)  # Wait here till params are received
-
-                if candidate is None:
+            self._mpi_comm.Probe(source=0, tag=MPI.ANY_TAG, status=status)  # Wait here till params are received
+            tag = status.Get_tag()
+            if tag == MPI_TAGS.MPI_SEND_SCHEMA.value:
+                schema = self._mpi_comm.recv(source=0, tag=tag)
+                continue
+            if tag == MPI_TAGS.MPI_SEND_CANDIDATE_BUFFER.value:
+                buffer = np.empty(status.Get_count(MPI.DOUBLE), dtype=np.float64)
+                self._mpi_comm.Recv([buffer, MPI.DOUBLE], source=0, tag=tag)
+                batch = schema.unpack(buffer)
+            else:
+                candidates = self._mpi_comm.recv(source=0, tag=MPI_TAGS.MPI_SEND_CANDIDATE.value)
+                if candidates is None:
                     print("[RECEIVE] Process {} received finish signal.".format(rank))
                     return
+                batch = [(candidate.ID, candidate.get_values()) for candidate in candidates]
 
-                # if candidate.ID == 9999:
-                #     comm.gather(losses, root=0)
-                #     continue
-
-                # print("[WORKING] Process {} is actually doing things.".format(rank))
-                cand_id = candidate.ID
-                params = candidate.get_values()
-
-                try:
-                    loss = self._solver.blackbox.blackbox_func(params)
-                except:
-                    loss = self._solver.blackbox.blackbox_func(**params)
-
-            except Exception as e:
-                msg = "Error in Worker(rank={}): {}".format(rank, e)
-                LOG.error(msg)
-                print(msg)
-
-                loss = np.nan
-            finally:
-                cand_results['book_time'] = datetime.datetime.now()
-                cand_results['loss'] = loss  # Write loss to dictionary. This dictionary will be send back to the master via gather
-                cand_results['refresh_time'] = datetime.datetime.now()
-
-                cand_results['book_time'] = datetime.datetime.now()
-
-                cand_results['loss'] = loss  # Write loss to dictionary. This dictionary will be send back to the master via gather
-                cand_results['refresh_time'] = datetime.datetime.now()
-
-                self._mpi_comm.send((cand_id, cand_results), dest=0, tag=MPI_TAGS.MPI_SEND_RESULTS.value)
+            results = [(cand_id, self.evaluate(params)) for cand_id, params in batch]
+            buffer = pack_results(results)
+            if buffer is None:
+                self._mpi_comm.send(results, dest=0, tag=MPI_TAGS.MPI_SEND_RESULTS.value)
+            else:
+                self._mpi_comm.Send([buffer, MPI.DOUBLE], dest=0, tag=MPI_TAGS.MPI_SEND_RESULTS_BUFFER.value)
 
     def signal_worker_finished(self):
         """
@@ -142,6 +191,8 @@ class MPISolverWrapper:
         This function starts the optimization process of the underlying solver and takes care of the MPI awareness.
         """
 
+        if isinstance(self.blackbox, MPIBlackboxFunction):
+            self.blackbox.distribute_data()
         mpi_rank = self._mpi_comm.Get_rank()
         if mpi_rank == 0:
             # This is the master process. From here we run the solver and start all the other processes.
@@ -149,7 +200,10 @@ class MPISolverWrapper:
             self.signal_worker_finished()  # Tell the workers to finish.
         else:
             # this script execution should be in worker mode as it is an mpi worker.
+            self.seed_worker()
             self.run_worker_mode()
+        if isinstance(self.blackbox, MPIBlackboxFunction):
+            self.blackbox.free()
 
     def is_master(self):
         mpi_rank = self._mpi_comm.Get_rank()
@@ -11,21 +11,178 @@
 # See LICENSE
 
 import os
+import copy
 import optuna
 import logging
 import warnings
 import numpy as np
 from pprint import pformat
 
+from optuna.trial import TrialState
+
 from hyppopy.globals import DEBUGLEVEL
-from hyppopy.solvers.HyppopySolver import HyppopySolver
+from hyppopy.solvers.HyppopySolver import HyppopySolver, select_history
 
 from hyppopy.CandidateDescriptor import CandidateDescriptor
+from hyppopy.BlackboxFunction import BlackboxFunction
+from hyppopy.Pruning import Reporter, TrialPruned, accepts_reporter
 
 LOG = logging.getLogger(os.path.basename(__file__))
 LOG.setLevel(DEBUGLEVEL)
 
 
+class HistoryStudy(object):
+    """
+    Proxy of an optuna Study passed to the sampler. All attributes are forwarded to the study, except the trial
+    queries which only return the given trials, i.e. the finished trials selected by the HistorySampler and the running
+    ones.
+    """
+
+    def __init__(self, study, trials):
+        """
+        The constructor accepts the study to wrap and the trials the queries return.
+
+        :param study: [Study] optuna study
+        :param trials: [list] FrozenTrials seen by the sampler
+        """
+        self._study = study
+        self._trials = trials
+
+    def __getattr__(self, name):
+        return getattr(self._study, name)
+
+    def _select(self, deepcopy, states):
+        trials = self._trials if states is None else [trial for trial in self._trials if trial.state in states]
+        return copy.deepcopy(trials) if deepcopy else list(trials)
+
+    def _get_trials(self, deepcopy=True, states=None, use_cache=False):
+        return self._select(deepcopy, states)
+
+    def get_trials(self, deepcopy=True, states=None):
+        return self._select(deepcopy, states)
+
+    @property
+    def trials(self):
+        return self.get_trials()
+
+
+class HistorySampler(optuna.samplers.BaseSampler):
+    """
+    Sampler wrapper bounding the history the wrapped sampler is fit on. The sampling calls are forwarded with a
+    HistoryStudy proxy. The finished trials and their losses are collected incrementally and the selection is cached
+    per trial number, so all calls of a trial see the same history and the cost of a sampling call does not grow with
+    the number of trials.
+    """
+
+    def __init__(self, sampler, size, strategy="recent", seed=None):
+        """
+        The constructor accepts the sampler to wrap and the history settings.
+
+        :param sampler: [BaseSampler] optuna sampler
+        :param size: [int] maximum number of finished trials the sampler is fit on
+        :param strategy: [str] history selection strategy, see select_history, default='recent'
+        :param seed: [int] seed of the selection, default=None
+        """
+        self._sampler = sampler
+        self._size = size
+        self._strategy = strategy
+        self._seed = seed if seed is not None else int(np.random.default_rng().integers(2 ** 31 - 1))
+        self._finished = []
+        self._losses = np.empty(64)
+        self._running = []
+        self._n_seen = 0
+        self._selection = None
+
+    def add_history(self, trials):
+        """
+        Appends the trials finished since the last call to the history, only the trials added since and the ones
+        running before are checked.
+
+        :param trials: [list] all FrozenTrials of the study, not copied
+        """
+        running = []
+        for n in self._running + list(range(self._n_seen, len(trials))):
+            trial = trials[n]
+            if not trial.state.is_finished():
+                running.append(n)
+                continue
+            if len(self._finished) == len(self._losses):
+                self._losses = np.concatenate([self._losses, np.empty(len(self._losses))])
+            value = trial.value if trial.state == TrialState.COMPLETE else None
+            self._losses[len(self._finished)] = np.nan if value is None else value
+            self._finished.append(trial)
+        self._running = running
+        self._n_seen = len(trials)
+
+    def select(self, study, trial):
+        """
+        Returns the trials the wrapped sampler sees when sampling a trial, the finished trials selected by
+        select_history and the running ones.
+
+        :param study: [Study] optuna study
+        :param trial: [FrozenTrial] trial sampled
+
+        :return: [list] FrozenTrials
+        """
+        if self._selection is not None and self._selection[0] == trial.number:
+            return self._selection[1]
+        trials = study._get_trials(deepcopy=False)
+        self.add_history(trials)
+        indices = select_history(self._losses[:len(self._finished)], self._size, self._strategy,
+                                 np.random.default_rng([self._seed, trial.number]))
+        selection = [self._finished[i] for i in indices] + [trials[n] for n in self._running]
+        self._selection = (trial.number, selection)
+        return selection
+
+    def _proxy(self, study, trial):
+        return HistoryStudy(study, self.select(study, trial))
+
+    def infer_relative_search_space(self, study, trial):
+        return self._sampler.infer_relative_search_space(self._proxy(study, trial), trial)
+
+    def sample_relative(self, study, trial, search_space):
+        return self._sampler.sample_relative(self._proxy(study, trial), trial, search_space)
+
+    def sample_independent(self, study, trial, param_name, param_distribution):
+        return self._sampler.sample_independent(self._proxy(study, trial), trial, param_name, param_distribution)
+
+    def before_trial(self, study, trial):
+        self._sampler.before_trial(study, trial)
+
+    def after_trial(self, study, trial, state, values):
+        self._sampler.after_trial(study, trial, state, values)
+
+    def reseed_rng(self):
+        self._sampler.reseed_rng()
+
+
+class OptunaReporter(Reporter):
+    """
+    Reporter forwarding the intermediate values to an optuna trial, the pruning decision is made by the pruner of the
+    study.
+    """
+
+    def __init__(self, trial):
+        """
+        The constructor accepts the optuna trial the values are reported to.
+
+        :param trial: [Trial] optuna trial
+        """
+        Reporter.__init__(self)
+        self._trial = trial
+
+    def report(self, value, step=None):
+        step = len(self.values) if step is None else int(step)
+        self._values[step] = float(value)
+        self._last_step = step
+        self._trial.report(float(value), step)
+        if self._trial.should_prune():
+            raise TrialPruned("trial pruned at step {} with value {}".format(step, value))
+
+    def should_prune(self):
+        return self._last_step is not None and self._trial.should_prune()
+
+
 class OptunaSolver(HyppopySolver):
 
     def __init__(self, project=None):
@@ -36,7 +193,8 @@ class OptunaSolver(HyppopySolver):
         """
         HyppopySolver.__init__(self, project)
         self._searchspace = None
-        self.candidates_list = list()
+        self.study = None
+        self._asked_trials = {}
 
     def define_interface(self):
         """
@@ -47,89 +205,155 @@ class OptunaSolver(HyppopySolver):
         settings passed fullfill solver needs.
         """
         self._add_member("max_iterations", int)
+        self._add_member("batch_size", int, default=1)
+        self._add_member("storage", str, optional=True)
+        self._add_member("study_name", str, optional=True)
+        self._add_member("history_size", int, optional=True)
+        self._add_member("history_strategy", str, default="recent")
+        self._add_member("asynchronous", bool, default=False)
         self._add_hyperparameter_signature(name="domain", dtype=str,
                                           options=["uniform", "categorical"])
         self._add_hyperparameter_signature(name="data", dtype=list)
         self._add_hyperparameter_signature(name="type", dtype=type)
 
-    def get_candidates(self, trial=None):
+    def get_sampler(self):
         """
-        This function converts the searchspace to a candidate_list that can then be used to distribute via MPI.
+        Returns the optuna sampler, a TPESampler, wrapped by a HistorySampler if history_size is set. If trials are
+        evaluated in batches or asynchronously or the study is shared via storage the constant liar strategy is used,
+        so running trials are taken into account and parallel trials spread out.
 
-        :param searchspace: converted hyperparameter space
+        :return: [BaseSampler] sampler
         """
+        constant_liar = self.batch_size > 1 or self.asynchronous or self.storage is not None
+        sampler = optuna.samplers.TPESampler(seed=self.spawn_seed(), constant_liar=constant_liar)
+        if self.history_size is not None:
+            sampler = HistorySampler(sampler, self.history_size, self.history_strategy, self.spawn_seed())
+        return sampler
 
-        candidates_list = list()
-        N = self.max_iterations
-        for n in range(N):
-            print(n)
-            # Todo: Ugly hack that does not even work...
-            from optuna import trial as trial_module
-            # temp_study = optuna.create_study()
-            trial_id = self.study._storage.create_new_trial_id(0)
-            trial = trial_module.Trial(self.study, trial_id)
-            ## trial.report(result)
-            ## self._storage.set_trial_state(trial_id, structs.TrialState.COMPLETE)
-            ## self._log_completed_trial(trial_number, result)
-
-            params = {}
-            for name, param in self._searchspace.items():
-                if param["domain"] == "categorical":
-                    params[name] = trial.suggest_categorical(name, param["data"])
-                else:
-                    params[name] = trial.suggest_uniform(name, param["data"][0], param["data"][1])
-            candidates_list.append(CandidateDescriptor(**params))
+    def get_storage(self):
+        """
+        Returns the storage backing the study. The storage setting can either be a database URL, e.g.
+        'sqlite:///study.db', or the path of a journal file, e.g. 'study.log', which several processes on a node can
+        share. If storage is not set the study is kept in memory.
 
-        return candidates_list
+        :return: [object] storage or None
+        """
+        if self.storage is None or "://" in self.storage:
+            return self.storage
+        try:
+            from optuna.storages.journal import JournalFileBackend
+        except ImportError:
+            from optuna.storages import JournalFileStorage as JournalFileBackend
+        return optuna.storages.JournalStorage(JournalFileBackend(self.storage))
 
-        N = self.max_iterations
-        for n in range(N):
-            params = {}
-            for name, param in self._searchspace.items():
-                if param["domain"] == "categorical":
-                    params[name] = trial.suggest_categorical(name, param["data"])
-                else:
-                    params[name] = trial.suggest_uniform(name, param["data"][0], param["data"][1])
-            candidates_list.append(CandidateDescriptor(**params))
+    def setup_pruner(self):
+        """
+        Creates the Pruner instance of a run from the pruner setting. If the setting is an optuna pruner it is passed
+        to the study instead and the intermediate values are reported to the optuna trials.
 
-        return candidates_list
+        :return: [Pruner] pruner instance or None
+        """
+        if isinstance(self.pruner, optuna.pruners.BasePruner):
+            return None
+        return HyppopySolver.setup_pruner(self)
 
-    def trial_cache(self, trial):
+    def create_reporter(self, candidate):
         """
-        Optuna specific loss function wrapper
+        Creates the Reporter passed to the blackbox when evaluating a candidate, an OptunaReporter if the pruner
+        setting is an optuna pruner.
 
-        :param trial: [Trial] instance
+        :param candidate: [CandidateDescriptor] candidate to be evaluated
 
-        :return: [function] loss function
+        :return: [Reporter] reporter instance or None
         """
+        if isinstance(self.pruner, optuna.pruners.BasePruner) and candidate.ID in self._asked_trials:
+            func = self.blackbox.blackbox_func if isinstance(self.blackbox, BlackboxFunction) else self.blackbox
+            if accepts_reporter(func):
+                return OptunaReporter(self._asked_trials[candidate.ID])
+            return None
+        return HyppopySolver.create_reporter(self, candidate)
 
-        params = {}
+    def get_params(self, trial):
+        """
+        Asks the trial for a parameter set.
+
+        :param trial: [Trial] optuna trial
 
+        :return: [dict] parameter set
+        """
+        params = {}
         for name, param in self._searchspace.items():
             if param["domain"] == "categorical":
                 params[name] = trial.suggest_categorical(name, param["data"])
+            elif param["type"] is int:
+                params[name] = trial.suggest_int(name, int(param["data"][0]), int(param["data"][1]))
             else:
-                params[name] = trial.suggest_uniform(name, param["data"][0], param["data"][1])
+                params[name] = trial.suggest_float(name, param["data"][0], param["data"][1])
+        return params
 
-        return self.loss_function(**params)
+    def ask_trial(self):
+        """
+        Asks the study for a new trial.
+
+        :return: [CandidateDescriptor] candidate of the trial
+        """
+        trial = self.study.ask()
+        candidate = CandidateDescriptor(**self.get_params(trial))
+        self._asked_trials[candidate.ID] = trial
+        return candidate
+
+    def tell_trial(self, candidate, result):
+        """
+        Tells the study the result of an asked trial, a nan loss as failed trial.
+
+        :param candidate: [CandidateDescriptor] candidate of the trial
+        :param result: [dict] result dict of the candidate
+        """
+        trial = self._asked_trials.pop(candidate.ID)
+        try:
+            loss = float(result['loss'])
+        except (TypeError, ValueError):
+            loss = np.nan
+        if result.get('status') == 'pruned':
+            self.study.tell(trial, state=TrialState.PRUNED)
+        elif np.isfinite(loss):
+            self.study.tell(trial, loss)
+        else:
+            self.study.tell(trial, state=TrialState.FAIL)
 
     def execute_solver(self, searchspace):
         """
         This function is called immediately after convert_searchspace and get the output of the latter as input. It's
-        purpose is to call the solver libs main optimization function.
+        purpose is to call the solver libs main optimization function. The study is driven via ask and tell, each
+        step batch_size trials are asked for and evaluated at once via loss_function_batch. If asynchronous is set a
+        trial is asked for whenever a worker is free and told as soon as its result arrives, see
+        HyppopySolver.loss_function_async.
 
         :param searchspace: converted hyperparameter space
         """
         LOG.debug("execute_solver using solution space:\n\n\t{}\n".format(pformat(searchspace)))
         self._searchspace = searchspace
+        assert self.batch_size > 0, "precondition violation, batch_size needs to be > 0!"
 
         try:
-            study = optuna.create_study()
-            study.optimize(self.trial_cache, n_trials=self.max_iterations)
-            self.best = study.best_trial.params
+            pruner = self.pruner if isinstance(self.pruner, optuna.pruners.BasePruner) else None
+            self.study = optuna.create_study(sampler=self.get_sampler(), pruner=pruner, storage=self.get_storage(),
+                                             study_name=self.study_name, load_if_exists=True)
+            self._asked_trials = {}
+            if self.asynchronous:
+                self.loss_function_async(self.ask_trial, self.tell_trial, self.max_iterations)
+            else:
+                n_done = 0
+                while n_done < self.max_iterations:
+                    candidates = [self.ask_trial() for _ in range(min(self.batch_size, self.max_iterations - n_done))]
+                    results = self.loss_function_batch(candidates)
+                    for candidate in candidates:
+                        self.tell_trial(candidate, results[candidate.ID])
+                    n_done += len(candidates)
+            self.best = self.study.best_trial.params
         except Exception as e:
-            LOG.error("internal error in bayes_opt maximize occured. {}".format(e))
-            raise BrokenPipeError("internal error in bayes_opt maximize occured. {}".format(e))
+            LOG.error("internal error in optuna execute_solver occured. {}".format(e))
+            raise BrokenPipeError("internal error in optuna execute_solver occured. {}".format(e))
 
     def convert_searchspace(self, hyperparameter):
         """
@@ -11,11 +11,16 @@
 # See LICENSE
 
 import os
+import sys
+import math
+import random
 import logging
+import functools
 import optunity
+import contextlib
 from pprint import pformat
 
-from hyppopy.CandidateDescriptor import CandidateDescriptor, CandicateDescriptorWrapper
+from hyppopy.CandidateDescriptor import CandidateDescriptor, CandidateBatch
 from hyppopy.globals import DEBUGLEVEL
 
 LOG = logging.getLogger(os.path.basename(__file__))
@@ -24,6 +29,25 @@ LOG.setLevel(DEBUGLEVEL)
 from hyppopy.solvers.HyppopySolver import HyppopySolver
 
 
+@contextlib.contextmanager
+def seeded_random_module(seed):
+    """
+    Context manager seeding the module-level random generator optunity draws from and restoring its previous state on
+    exit, so a seeded run neither depends on nor changes the global random state of the caller.
+
+    :param seed: [int] seed, if None the random module is left untouched
+    """
+    if seed is None:
+        yield
+        return
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
 class OptunitySolver(HyppopySolver):
 
     def __init__(self, project=None):
@@ -43,6 +67,8 @@ class OptunitySolver(HyppopySolver):
         settings passed fullfill solver needs.
         """
         self._add_member("max_iterations", int)
+        self._add_member("solver_name", str, default="particle swarm")
+        self._add_member("population_size", int, optional=True)
         self._add_hyperparameter_signature(name="domain", dtype=str,
                                           options=["uniform", "categorical"])
         self._add_hyperparameter_signature(name="data", dtype=list)
@@ -51,18 +77,115 @@ class OptunitySolver(HyppopySolver):
     def execute_solver(self, searchspace):
         """
         This function is called immediately after convert_searchspace and get the output of the latter as input. It's
-        purpose is to call the solver libs main optimization function.
+        purpose is to call the solver libs main optimization function. The setup follows
+        optunity.minimize_structured, but the solver is chosen via the solver_name setting, the population of
+        particle swarm via population_size, and each generation is evaluated as one batch via optunity_pmap.
 
         :param searchspace: converted hyperparameter space
         """
         LOG.debug("execute_solver using solution space:\n\n\t{}\n".format(pformat(searchspace)))
+        self._box = dict(searchspace)
+        self._batch_cache = {}
+        # the call log needs to be positioned here because the function signature used later on is internal logic
+        f = optunity.functions.logged(self.cached_loss_function)
+        f = self.wrap_decoder(f)
+        f = optunity.constraints.wrap_constraints(f, default=sys.float_info.max, range_oo=self._box)
         try:
-            self.best, _, _ = optunity.minimize_structured(f=self.loss_function,
-                                         num_evals=self.max_iterations,
-                                         search_space=searchspace)
+            with seeded_random_module(self.spawn_seed()):
+                suggestion = optunity.suggest_solver(self.max_iterations, self.solver_name, **self._box)
+                if self.population_size is not None and 'num_particles' in suggestion:
+                    suggestion['num_particles'] = self.population_size
+                    suggestion['num_generations'] = int(math.ceil(float(self.max_iterations) / self.population_size))
+                solver = optunity.make_solver(**suggestion)
+                self.best, _ = optunity.optimize(solver, f, maximize=False, max_evals=self.max_iterations,
+                                                 pmap=self.optunity_pmap, decoder=self.decode)
         except Exception as e:
-            LOG.error("internal error in optunity.minimize_structured occured. {}".format(e))
-            raise BrokenPipeError("internal error in optunity.minimize_structured occured. {}".format(e))
+            LOG.error("internal error in optunity.optimize occured. {}".format(e))
+            raise BrokenPipeError("internal error in optunity.optimize occured. {}".format(e))
+
+    def decode(self, particle):
+        """
+        Decodes a candidate of the internal search space representation, categorical parameters are encoded as
+        continuous index in [0, number of options) and decoded by rounding down.
+
+        :param particle: [dict] candidate in the internal search space representation
+
+        :return: [dict] hyperparameter set e.g. {'p1': 0.123, 'p2': 'a', ...}
+        """
+        params = dict(particle)
+        for name, options in self._categories.items():
+            if name in params:
+                params[name] = options[min(max(int(math.floor(params[name])), 0), len(options) - 1)]
+        return params
+
+    def wrap_decoder(self, f):
+        """
+        Wraps a function to decode its arguments from the internal search space representation, see decode.
+
+        :param f: [callable] function accepting the hyperparameters as keyword arguments
+
+        :return: [callable] function accepting the internal representation as keyword arguments
+        """
+        @functools.wraps(f)
+        def wrapped(**kwargs):
+            return f(**self.decode(kwargs))
+        return wrapped
+
+    def as_particle(self, args):
+        """
+        Converts the arguments a solver maps the objective function over into a dict in the internal search space
+        representation. Particle swarm passes dicts, sobol a list of values per candidate and random and grid search
+        the values as positional arguments, the latter in the order of the box constraints.
+
+        :param args: [tuple] arguments of one function call
+
+        :return: [dict] candidate in the internal search space representation
+        """
+        if len(args) == 1 and isinstance(args[0], dict):
+            return args[0]
+        if len(args) == 1 and isinstance(args[0], (list, tuple)):
+            args = args[0]
+        return dict(zip(self._box.keys(), args))
+
+    def optunity_pmap(self, f, *iterables):
+        """
+        Map function passed to optunity. The not yet evaluated candidates of a generation that satisfy the box
+        constraints are evaluated as one batch via loss_function_batch, so batch capable blackboxes, e.g.
+        MPIBlackboxFunction, evaluate them in parallel. Afterwards f is mapped over the generation as usual and
+        reads the losses from the batch cache, keeping optunity's call log and evaluation budget intact.
+
+        :param f: [callable] wrapped objective function
+        :param iterables: [list] arguments of the function calls of one generation, see as_particle
+
+        :return: [list] function values in call order
+        """
+        iterables = [list(iterable) for iterable in iterables]
+        particles = CandidateBatch.from_dicts([self.as_particle(args) for args in zip(*iterables)], self._box.keys())
+        candidates = []
+        for particle in particles.select(particles.in_box(self._box)).to_dicts():
+            candidate = CandidateDescriptor(**self.decode(particle))
+            if candidate not in self._batch_cache and candidate not in candidates:
+                candidates.append(candidate)
+        candidates = candidates[:max(self.max_iterations - len(self._batch_cache), 0)]
+        if len(candidates) > 0:
+            results = self.loss_function_batch(candidates)
+            for candidate in candidates:
+                self._batch_cache[candidate] = results[candidate.ID]['loss']
+        return list(map(f, *iterables))
+
+    def cached_loss_function(self, **params):
+        """
+        Objective function passed to optunity, it returns the loss computed by optunity_pmap for the parameter set or
+        falls back to loss_function if the parameter set was not evaluated in a batch.
+
+        :param params: [dict] hyperparameter space sample e.g. {'p1': 0.123, 'p2': 3.87, ...}
+
+        :return: [float] loss
+        """
+        candidate = CandidateDescriptor(**params)
+        if candidate not in self._batch_cache:
+            self._batch_cache[candidate] = self.loss_function(**params)
+        return self._batch_cache[candidate]
 
     def split_categorical(self, pdict):
         """
@@ -86,7 +209,8 @@ class OptunitySolver(HyppopySolver):
         """
         This function gets the unified hyppopy-like parameterspace description as input and, if necessary, should
         convert it into a solver lib specific format. The function is invoked when run is called and what it returns
-        is passed as searchspace argument to the function execute_solver.
+        is passed as searchspace argument to the function execute_solver. The result is a flat box, e.g.
+        {'x': [0, 1], 'kernel': [0.0, 3.0]}, where categorical parameters are index ranges, see decode.
 
         :param hyperparameter: [dict] nested parameter description dict e.g. {'name': {'domain':'uniform', 'data':[0,1], 'type':'float'}, ...}
 
@@ -96,28 +220,20 @@ class OptunitySolver(HyppopySolver):
         # split input in categorical and non-categorical data
         cat, uni = self.split_categorical(hyperparameter)
         # build up dictionary keeping all non-categorical data
-        uniforms = {}
+        searchspace = {}
         for key, value in uni.items():
             for key2, value2 in value.items():
                 if key2 == 'data':
                     if len(value2) == 3:
-                        uniforms[key] = value2[0:2]
+                        searchspace[key] = value2[0:2]
                     elif len(value2) == 2:
-                        uniforms[key] = value2
+                        searchspace[key] = value2
                     else:
                         raise AssertionError("precondition violation, optunity searchspace needs list with left and right range bounds!")
-
-        if len(cat) == 0:
-            return uniforms
-        # build nested categorical structure
-        inner_level = uniforms
+        # categorical data is encoded as continuous index range instead of nesting the search space under each option,
+        # the options are kept for decoding
+        self._categories = {}
         for key, value in cat.items():
-            tmp = {}
-            optunity_space = {}
-            for key2, value2 in value.items():
-                if key2 == 'data':
-                    for elem in value2:
-                        tmp[elem] = inner_level
-            optunity_space[key] = tmp
-            inner_level = optunity_space
-        return optunity_space
+            self._categories[key] = list(value['data'])
+            searchspace[key] = [0.0, float(len(value['data']))]
+        return searchspace
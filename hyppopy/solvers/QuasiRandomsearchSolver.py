@@ -10,80 +10,261 @@
 #
 # See LICENSE
 
-__all__ = ['HaltonSequenceGenerator', 'QuasiRandomSampleGenerator', 'QuasiRandomsearchSolver']
+__all__ = ['get_primes', 'HaltonSequenceGenerator', 'QuasiRandomSampleGenerator', 'QuasiRandomsearchSolver']
 
 import os
 import logging
-import warnings
 import numpy as np
 from pprint import pformat
 from hyppopy.globals import DEBUGLEVEL
 from hyppopy.solvers.HyppopySolver import HyppopySolver
+from hyppopy.solvers.RandomsearchSolver import inverse_cdf
+from hyppopy.CandidateDescriptor import CandidateDescriptor
 
 LOG = logging.getLogger(os.path.basename(__file__))
 LOG.setLevel(DEBUGLEVEL)
 
 
+def get_primes(N):
+    """
+    Returns the first N prime numbers computed with a sieve of Eratosthenes.
+
+    :param N: [int] number of primes
+
+    :return: [ndarray] first N primes
+    """
+    assert isinstance(N, int), "condition N of type int violated!"
+    if N < 1:
+        return np.zeros(0, dtype=np.int64)
+    # upper bound of the N-th prime for N >= 6 is N*(log(N) + log(log(N)))
+    limit = max(15, int(N * (np.log(N) + np.log(np.log(max(N, 3))))) + 1)
+    sieve = np.ones(limit + 1, dtype=bool)
+    sieve[:2] = False
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = False
+    return np.flatnonzero(sieve)[:N]
+
+
 class HaltonSequenceGenerator(object):
     """
-    This class generates Halton sequences (https://en.wikipedia.org/wiki/Halton_sequence). The class needs a total
-    number of samples and the number of dimensions to generate a quasirandom sequence for each axis. The method
-    get_unit_space returns a sequence list with N_samples for each axis representing N_samples vectors on a unit sphere.
+    This class generates Halton sequences (https://en.wikipedia.org/wiki/Halton_sequence). Each axis is the van der
+    Corput sequence of a different prime base, as before the bases start at 5. The digit reversal is vectorized over
+    all requested indices, so any index range, or any set of indices, can be generated on demand and shards of the
+    sequence can be computed independently of each other. Optionally the digits are scrambled with random
+    permutations, one per base and digit position, which removes the correlations between the axes of high
+    dimensional bases. The permutations only depend on the Generator passed, so all shards generated with equally
+    seeded Generators belong to the same scrambled sequence.
     """
-    def __init__(self):
-        pass
+    # number of leading primes (2 and 3) which are not used as bases
+    SKIP_PRIMES = 2
+    # maximum size of the digit block lookup tables
+    MAX_TABLE_SIZE = 4096
+
+    def __init__(self, scramble=False, rng=None):
+        """
+        Constructor
+
+        :param scramble: [bool] en- or disable random digit permutation scrambling, default=False
+        :param rng: [Generator] numpy random Generator used to draw the scrambling permutations, default=None
+        """
+        self._scramble = scramble
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self._bases = np.zeros(0, dtype=np.int64)
+        self._permutations = []
+        self._tables = {}
+
+    def get_bases(self, N_dims):
+        """
+        Returns the prime bases of the first N_dims axis.
+
+        :param N_dims: [int] Number of dimensions
+
+        :return: [ndarray] prime bases
+        """
+        if len(self._bases) < N_dims:
+            self._bases = get_primes(N_dims + self.SKIP_PRIMES)[self.SKIP_PRIMES:]
+            if self._scramble:
+                # permutations are drawn in axis order, they are thus independent of the order indices are requested
+                for base in self._bases[len(self._permutations):]:
+                    n_digits = int(np.ceil(53 * np.log(2) / np.log(base)))
+                    self._permutations.append(np.argsort(self._rng.random((n_digits, base)), axis=1))
+        return self._bases[:N_dims]
+
+    def __digit_table(self, axis, level, k):
+        """
+        Returns the lookup table of the radical inverse contribution of the digit block at position level for all
+        block values.
+
+        :param axis: [int] axis index
+        :param level: [int] digit block position
+        :param k: [int] number of digits per block
+
+        :return: [ndarray] table of size base**k
+        """
+        key = (axis, level if self._scramble else 0)
+        if key not in self._tables:
+            base = int(self._bases[axis])
+            values = np.arange(base ** k, dtype=np.int64)
+            table = np.zeros(values.shape)
+            factor = 1.0 / base
+            for m in range(k):
+                values, digits = np.divmod(values, base)
+                position = level * k + m
+                if self._scramble and position < self._permutations[axis].shape[0]:
+                    digits = self._permutations[axis][position][digits]
+                table += digits * factor
+                factor /= base
+            self._tables[key] = table
+        return self._tables[key]
+
+    def __block_size(self, axis):
+        """
+        Returns the number of digits per digit block of an axis.
+
+        :param axis: [int] axis index
 
-    def __next_prime(self):
+        :return: [int] number of digits
         """
-        Checks if num is a prime value
+        return max(1, int(np.log(self.MAX_TABLE_SIZE) / np.log(int(self._bases[axis]))))
+
+    def __radical_inverse(self, indices, axis, first_level=0):
+        """
+        Returns the radical inverse of indices whose digit blocks below first_level were already split off.
+
+        :param indices: [ndarray] sequence indices divided by block**first_level
+        :param axis: [int] axis index
+        :param first_level: [int] position of the lowest digit block of the indices
+
+        :return: [ndarray] radical inverse contribution of the digit blocks from first_level on
+        """
+        k = self.__block_size(axis)
+        block = int(self._bases[axis]) ** k
+        n_levels = 1
+        max_index = int(indices.max()) if indices.size > 0 else 0
+        while max_index >= block:
+            max_index //= block
+            n_levels += 1
+        result = np.zeros(indices.shape)
+        scale = 1.0
+        for level in range(first_level, first_level + n_levels):
+            indices, digits = np.divmod(indices, block)
+            result += self.__digit_table(axis, level, k)[digits] * scale
+            scale /= block
+        if self._scramble:
+            # the higher digits are zero for all indices, their permuted values add the same constant to all of them
+            tail = 0.0
+            for level in range(int(np.ceil(self._permutations[axis].shape[0] / k)) - 1, first_level + n_levels - 1, -1):
+                tail = tail / block + self.__digit_table(axis, level, k)[0]
+            result += tail * scale
+        return result
+
+    def radical_inverse(self, indices, axis):
+        """
+        Returns the radical inverse, the digit reversed index, of all indices in the base of the given axis. The
+        indices are processed in blocks of digits using precomputed lookup tables.
+
+        :param indices: [ndarray] sequence indices
+        :param axis: [int] axis index
+
+        :return: [ndarray] radical inverse values in [0, 1)
+        """
+        self.get_bases(axis + 1)
+        return self.__radical_inverse(np.asarray(indices, dtype=np.int64), axis)
+
+    def radical_inverse_range(self, start, stop, axis):
+        """
+        Returns the radical inverse of the index range [start, stop). Within a contiguous range the lowest digit block
+        cycles through all its values, so the result is assembled by broadcasting the lowest block table against the
+        radical inverse of the few higher blocks, which avoids the digit decomposition of every single index.
+
+        :param start: [int] first index
+        :param stop: [int] index after the last one
+        :param axis: [int] axis index
+
+        :return: [ndarray] radical inverse values in [0, 1)
+        """
+        self.get_bases(axis + 1)
+        if stop <= start:
+            return np.zeros(0)
+        k = self.__block_size(axis)
+        block = int(self._bases[axis]) ** k
+        first, last = start // block, (stop - 1) // block + 1
+        high = self.__radical_inverse(np.arange(first, last, dtype=np.int64), axis, first_level=1)
+        values = (high[:, np.newaxis] / block + self.__digit_table(axis, 0, k)[np.newaxis, :]).ravel()
+        return values[start - first * block:stop - first * block]
+
+    def get_points_at(self, indices, N_dims):
+        """
+        Returns the sequence points at the given indices.
+
+        :param indices: [ndarray] sequence indices
+        :param N_dims: [int] Number of dimensions
+
+        :return: [ndarray] points of shape (len(indices), N_dims) with values in [0, 1)
         """
-        def is_prime(num):
-            for i in range(2, int(num ** 0.5) + 1):
-                if (num % i) == 0: return False
-            return True
+        indices = np.asarray(indices, dtype=np.int64)
+        self.get_bases(N_dims)
+        points = np.empty((indices.shape[0], N_dims), order="F")
+        for d in range(N_dims):
+            points[:, d] = self.radical_inverse(indices, d)
+        return points
 
-        prime = 3
-        while 1:
-            if is_prime(prime):
-                yield prime
-            prime += 2
+    def get_points(self, start, stop, N_dims):
+        """
+        Returns the sequence points of the index range [start, stop).
 
-    def __vdc(self, n, base):
-        vdc, denom = 0, 1
-        while n:
-            denom *= base
-            n, remainder = divmod(n, base)
-            vdc += remainder / float(denom)
-        return vdc
+        :param start: [int] first index
+        :param stop: [int] index after the last one
+        :param N_dims: [int] Number of dimensions
+
+        :return: [ndarray] points of shape (stop-start, N_dims) with values in [0, 1)
+        """
+        self.get_bases(N_dims)
+        # column major layout keeps the per axis writes contiguous
+        points = np.empty((max(stop - start, 0), N_dims), order="F")
+        for d in range(N_dims):
+            points[:, d] = self.radical_inverse_range(start, stop, d)
+        return points
 
     def get_unit_space(self, N_samples, N_dims):
         """
-        Returns a unit space in form of a sequence list keeping N_dims sequences with N_sample samplings. Each sample
-        represents a N_dims dimensional vector on a unit sphere.
+        Returns a unit space in form of a sequence array keeping N_dims sequences with N_sample samplings. Each sample
+        represents a N_dims dimensional vector in the unit cube.
 
         :param N_samples: [int] Number of samples
         :param N_dims: [int] Number of dimensions
 
-        :return: [list] samples list of length N_dims keeping lists each of length N_samples
+        :return: [ndarray] samples array of shape (N_dims, N_samples)
         """
-        seq = []
-        primeGen = self.__next_prime()
-        next(primeGen)
-        for d in range(N_dims):
-            base = next(primeGen)
-            seq.append([self.__vdc(i, base) for i in range(N_samples)])
-        return seq
+        return self.get_points(0, N_samples, N_dims).T
 
 
 class QuasiRandomSampleGenerator(object):
     """
-    This class takes care of the hyperparameter space creation and next sample delivery.
+    This class takes care of the hyperparameter space creation and next sample delivery. Each axis, numerical or
+    categorical, is an axis of a Halton sequence which is mapped onto the axis domain via the inverse cumulative
+    distribution function, so uniform, normal, loguniform and categorical axis are supported. The samples are kept in
+    a sample matrix with one column per axis, categorical columns keep the category index. They are delivered via a
+    cursor running over a pre-permuted index, or in sequence order if shuffle is disabled.
     """
-    def __init__(self, N_samples=None):
-        self._axis = None
-        self._samples = []
-        self._numerical = []
-        self._categorical = []
+    def __init__(self, N_samples=None, rng=None, scramble=False, shuffle=True):
+        """
+        Constructor
+
+        :param N_samples: [int] number of samples
+        :param rng: [Generator] numpy random Generator used for the delivery order and scrambling, default=None
+        :param scramble: [bool] en- or disable scrambling of the Halton sequence, default=False
+        :param shuffle: [bool] deliver the samples in random instead of sequence order, default=True
+        """
+        self._axis = []
+        self._samples = None
+        self._order = None
+        self._cursor = 0
+        self._generator = None
+        self._scramble = scramble
+        self._shuffle = shuffle
+        self._rng = rng if rng is not None else np.random.default_rng()
         self._N_samples = N_samples
 
     def set_axis(self, name, data, domain, dtype):
@@ -91,7 +272,7 @@ class QuasiRandomSampleGenerator(object):
         Add an axis description.
 
         :param name: [str] axis name
-        :param data: [list] axis range [min, max]
+        :param data: [list] axis range [min, max] or list of categories
         :param domain: [str] axis domain
         :param dtype: [type] axis data type
         """
@@ -102,9 +283,73 @@ class QuasiRandomSampleGenerator(object):
                 data = [str(i) for i in data]
             elif dtype is float:
                 data = [float(i) for i in data]
-            self._categorical.append({"name": name, "data": data, "type": dtype})
-        else:
-            self._numerical.append({"name": name, "data": data, "type": dtype, "domain": domain})
+        self._axis.append({"name": name, "data": data, "type": dtype, "domain": domain})
+        self._samples = None
+
+    @property
+    def generator(self):
+        """
+        Get the HaltonSequenceGenerator instance, it is created on first access.
+
+        :return: [HaltonSequenceGenerator] sequence generator
+        """
+        if self._generator is None:
+            self._generator = HaltonSequenceGenerator(self._scramble, self._rng)
+        return self._generator
+
+    def __to_samples(self, unit_space):
+        """
+        Maps Halton sequence points onto the axis domains.
+
+        :param unit_space: [ndarray] points of shape (N, number of axis) in the unit cube
+
+        :return: [ndarray] sample matrix of shape (N, number of axis)
+        """
+        samples = np.empty(unit_space.shape, order="F")
+        for n, axis in enumerate(self._axis):
+            samples[:, n] = inverse_cdf(axis, unit_space[:, n])
+        return samples
+
+    def get_samples(self, start, stop):
+        """
+        Returns the sample matrix rows of the Halton sequence index range [start, stop).
+
+        :param start: [int] first index
+        :param stop: [int] index after the last one
+
+        :return: [ndarray] sample matrix of shape (stop-start, number of axis)
+        """
+        return self.__to_samples(self.generator.get_points(start, stop, len(self._axis)))
+
+    def get_samples_at(self, indices):
+        """
+        Returns the sample matrix rows of the given Halton sequence indices. Since the rows only depend on their
+        sequence index, any subset of the samples can be generated independently.
+
+        :param indices: [ndarray] sequence indices
+
+        :return: [ndarray] sample matrix of shape (len(indices), number of axis)
+        """
+        return self.__to_samples(self.generator.get_points_at(indices, len(self._axis)))
+
+    def to_params(self, samples):
+        """
+        Converts sample matrix rows into parameter dicts.
+
+        :param samples: [ndarray] sample matrix
+
+        :return: [list] list of sample dicts [{'name':value, ...}, ...]
+        """
+        columns = []
+        for n, axis in enumerate(self._axis):
+            if axis["domain"] == "categorical":
+                columns.append([axis["data"][i] for i in samples[:, n].astype(int)])
+            elif axis["type"] is int:
+                columns.append(samples[:, n].astype(int).tolist())
+            else:
+                columns.append(samples[:, n].tolist())
+        names = [axis["name"] for axis in self._axis]
+        return [dict(zip(names, row)) for row in zip(*columns)]
 
     def generate_samples(self, N_samples=None):
         """
@@ -112,34 +357,16 @@ class QuasiRandomSampleGenerator(object):
 
         :param N_samples: [int] number of samples
         """
-        self._axis = []
         if N_samples is None:
             assert isinstance(self._N_samples, int), "Precondition violation, no number of samples specified!"
         else:
             self._N_samples = N_samples
-
-        axis_samples = {}
-        if len(self._numerical) > 0:
-            generator = HaltonSequenceGenerator()
-            unit_space = generator.get_unit_space(self._N_samples, len(self._numerical))
-            for n, axis in enumerate(self._numerical):
-                width = abs(axis["data"][1] - axis["data"][0])
-                unit_space[n] = [x * width for x in unit_space[n]]
-                unit_space[n] = [x + axis["data"][0] for x in unit_space[n]]
-                if axis["type"] is int:
-                    unit_space[n] = [int(round(x)) for x in unit_space[n]]
-                axis_samples[axis["name"]] = unit_space[n]
+        self._samples = self.get_samples(0, self._N_samples)
+        if self._shuffle:
+            self._order = self._rng.permutation(self._N_samples)
         else:
-            warnings.warn("No numerical axis defined, this warning can be ignored if searchspace is categorical only, otherwise check if axis was set!")
-
-        for n in range(self._N_samples):
-            sample = {}
-            for name, data in axis_samples.items():
-               sample[name] = data[n]
-            for cat in self._categorical:
-                choice = np.random.choice(len(cat["data"]), 1)[0]
-                sample[cat["name"]] = cat["data"][choice]
-            self._samples.append(sample)
+            self._order = np.arange(self._N_samples)
+        self._cursor = 0
 
     def next(self):
         """
@@ -147,20 +374,28 @@ class QuasiRandomSampleGenerator(object):
 
         :return: [dict] sample dict {'name':value, ...}
         """
-        if len(self._samples) == 0:
+        if self._samples is None:
             self.generate_samples()
-        if len(self._samples) == 0:
+        if self._cursor >= self._N_samples:
             return None
-        next_index = np.random.choice(len(self._samples), 1)[0]
-        sample = self._samples.pop(next_index)
+        row = self._samples[self._order[self._cursor]]
+        self._cursor += 1
+        sample = {}
+        for n, axis in enumerate(self._axis):
+            if axis["domain"] == "categorical":
+                sample[axis["name"]] = axis["data"][int(row[n])]
+            elif axis["type"] is int:
+                sample[axis["name"]] = int(row[n])
+            else:
+                sample[axis["name"]] = float(row[n])
         return sample
 
 
 class QuasiRandomsearchSolver(HyppopySolver):
     """
     The QuasiRandomsearchSolver class implements a quasi randomsearch optimization. The quasi randomsearch supports
-    categorical and uniform sampling. The solver defines a Halton Sequence distributed hyperparameter space. This
-    means a rather evenly distributed space sampling but no real randomness.
+    categorical, uniform, normal and loguniform sampling. The solver defines a Halton Sequence distributed
+    hyperparameter space. This means a rather evenly distributed space sampling but no real randomness.
     """
     def __init__(self, project=None):
         """
@@ -180,30 +415,70 @@ class QuasiRandomsearchSolver(HyppopySolver):
         settings passed fullfill solver needs.
         """
         self._add_member("max_iterations", int)
+        self._add_member("scramble", bool, default=False)
+        self._add_member("batch_size", int, optional=True)
+        self._add_member("shard_index", int, default=0)
+        self._add_member("num_shards", int, default=1)
         self._add_hyperparameter_signature(name="domain", dtype=str,
-                                          options=["uniform", "categorical"])
+                                          options=["uniform", "normal", "loguniform", "categorical"])
         self._add_hyperparameter_signature(name="data", dtype=list)
         self._add_hyperparameter_signature(name="type", dtype=type)
 
+    def get_shard_indices(self):
+        """
+        Returns the Halton sequence indices this solver instance evaluates. The max_iterations samples of the design
+        are sharded rank-strided, shard n of num_shards evaluates the indices n, n+num_shards, n+2*num_shards, ...
+        Since the samples only depend on their sequence index, independent solver instances, e.g. one per process or
+        MPI solver group, can each generate and evaluate their own shard of the same design. With scramble the shards
+        only share the design if they draw the same scramble permutations, so a seed is required then.
+
+        :return: [ndarray] sequence indices
+        """
+        assert self.num_shards > 0, "precondition violation, num_shards needs to be > 0!"
+        assert 0 <= self.shard_index < self.num_shards, "precondition violation, shard_index not in [0, num_shards)!"
+        return np.arange(self.shard_index, self.max_iterations, self.num_shards)
+
+    def get_candidates(self, indices):
+        """
+        This function converts the design samples at the given sequence indices to a candidate_list that can then be
+        used to distribute via MPI.
+
+        :param indices: [ndarray] sequence indices
+
+        :return: [list] list of CandidateDescriptors
+        """
+        if self.num_shards == 1 and len(indices) > 0:
+            samples = self._sampler.get_samples(int(indices[0]), int(indices[-1]) + 1)
+        else:
+            samples = self._sampler.get_samples_at(indices)
+        return [CandidateDescriptor(**params) for params in self._sampler.to_params(samples)]
+
     def execute_solver(self, searchspace):
         """
         This function is called immediately after convert_searchspace and get the output of the latter as input. It's
-        purpose is to call the solver libs main optimization function.
+        purpose is to call the solver libs main optimization function. The design is known in advance, so it is
+        generated and dispatched in batches of batch_size candidates via loss_function_batch, the whole shard at once
+        if batch_size is not set.
 
         :param searchspace: converted hyperparameter space
         """
+        if self.scramble and self.num_shards > 1 and self.seed is None:
+            msg = "scrambled shards need a seed, otherwise each shard draws its own permutations and the shards " \
+                  "do not form one design!"
+            LOG.error(msg)
+            raise AssertionError(msg)
         N = self.max_iterations
-        self._sampler = QuasiRandomSampleGenerator(N)
+        self._sampler = QuasiRandomSampleGenerator(N, self.rng, self.scramble)
         for name, axis in searchspace.items():
             self._sampler.set_axis(name, axis["data"], axis["domain"], axis["type"])
+        indices = self.get_shard_indices()
+        batch_size = self.batch_size if self.batch_size is not None else max(len(indices), 1)
+        assert batch_size > 0, "precondition violation, batch_size needs to be > 0!"
         try:
-            for n in range(N):
-                params = self._sampler.next()
-                if params is None:
-                    break
-                self.loss_function(**params)
+            for n in range(0, len(indices), batch_size):
+                self.loss_function_batch(self.get_candidates(indices[n:n + batch_size]))
         except Exception as e:
-            msg = "internal error in randomsearch execute_solver occured. {}".format(e)
+            msg = "internal error in quasirandomsearch execute_solver occured. {}".format(e)
             LOG.error(msg)
             raise BrokenPipeError(msg)
         self.best = self._trials.argmin
@@ -16,14 +16,20 @@ __all__ = ['RandomsearchSolver',
            'draw_normal_sample',
            'draw_loguniform_sample',
            'draw_categorical_sample',
-           'draw_sample']
+           'draw_sample',
+           'draw_uniform_samples',
+           'draw_normal_samples',
+           'draw_loguniform_samples',
+           'draw_categorical_samples',
+           'draw_samples',
+           'inverse_cdf',
+           'transform_unit_samples']
 
 import os
-import copy
-import random
 import logging
 import numpy as np
 from pprint import pformat
+from scipy.stats import norm
 from hyppopy.globals import DEBUGLEVEL
 from hyppopy.solvers.HyppopySolver import HyppopySolver
 
@@ -31,105 +37,227 @@ LOG = logging.getLogger(os.path.basename(__file__))
 LOG.setLevel(DEBUGLEVEL)
 
 
-def draw_uniform_sample(param):
+def draw_uniform_samples(param, N, rng=None):
     """
-    Function draws a random sample from a uniform range
+    Function draws N random samples from a uniform range at once
 
     :param param: [dict] input hyperparameter discription
+    :param N: [int] number of samples
+    :param rng: [Generator] numpy random Generator, if None a fresh one is created, default=None
 
-    :return: random sample value of type data['type']
+    :return: [ndarray] N random sample values of type data['type']
     """
     assert param['type'] is not str, "cannot sample a string list!"
     assert param['data'][0] < param['data'][1], "precondition violation: data[0] > data[1]!"
-    s = random.random()
-    s *= np.abs(param['data'][1] - param['data'][0])
-    s += param['data'][0]
+    if rng is None:
+        rng = np.random.default_rng()
+    a, b = param['data'][0], param['data'][1]
+    s = rng.uniform(a, b, size=N)
     if param['type'] is int:
-        s = int(np.round(s))
-        if s < param['data'][0]:
-            s = int(param['data'][0])
-        if s > param['data'][1]:
-            s = int(param['data'][1])
+        s = np.clip(np.round(s), a, b).astype(int)
     return s
 
 
-def draw_normal_sample(param):
+def draw_normal_samples(param, N, rng=None):
     """
-    Function draws a random sample from a normal distributed range
+    Function draws N random samples from a normal distributed range at once
 
     :param param: [dict] input hyperparameter discription
+    :param N: [int] number of samples
+    :param rng: [Generator] numpy random Generator, if None a fresh one is created, default=None
 
-    :return: random sample value of type data['type']
+    :return: [ndarray] N random sample values of type data['type']
     """
     assert param['type'] is not str, "cannot sample a string list!"
     assert param['data'][0] < param['data'][1], "precondition violation: data[0] > data[1]!"
-    mu = (param['data'][1] - param['data'][0]) / 2
+    if rng is None:
+        rng = np.random.default_rng()
+    a, b = param['data'][0], param['data'][1]
+    mu = (b - a) / 2
     sigma = mu / 3
-    s = np.random.normal(loc=param['data'][0] + mu, scale=sigma)
-    if s > param['data'][1]:
-        s = param['data'][1]
-    if s < param['data'][0]:
-        s = param['data'][0]
-    s = float(s)
+    s = np.clip(rng.normal(loc=a + mu, scale=sigma, size=N), a, b)
     if param["type"] is int:
-        s = int(np.round(s))
+        s = np.round(s).astype(int)
     return s
 
 
-def draw_loguniform_sample(param):
+def draw_loguniform_samples(param, N, rng=None):
     """
-    Function draws a random sample from a logarithmic distributed range
+    Function draws N random samples from a logarithmic distributed range at once
 
     :param param: [dict] input hyperparameter discription
+    :param N: [int] number of samples
+    :param rng: [Generator] numpy random Generator, if None a fresh one is created, default=None
 
-    :return: random sample value of type data['type']
+    :return: [ndarray] N random sample values of type data['type']
     """
     assert param['type'] is not str, "cannot sample a string list!"
     assert param['data'][0] < param['data'][1], "precondition violation: data[0] > data[1]!"
-    p = copy.deepcopy(param)
-    p['data'][0] = np.log(param['data'][0])
-    p['data'][1] = np.log(param['data'][1])
-    assert p['data'][0] is not np.nan, "Precondition violation, left bound input error, results in nan!"
-    assert p['data'][1] is not np.nan, "Precondition violation, right bound input error, results in nan!"
-    x = draw_uniform_sample(p)
-    s = np.exp(x)
-    if s > param['data'][1]:
-        s = param['data'][1]
-    if s < param['data'][0]:
-        s = param['data'][0]
+    if rng is None:
+        rng = np.random.default_rng()
+    a, b = param['data'][0], param['data'][1]
+    lexp = np.log(a)
+    rexp = np.log(b)
+    assert not np.isnan(lexp), "Precondition violation, left bound input error, results in nan!"
+    assert not np.isnan(rexp), "Precondition violation, right bound input error, results in nan!"
+    s = np.clip(np.exp(rng.uniform(lexp, rexp, size=N)), a, b)
+    if param['type'] is int:
+        s = np.clip(np.round(s), a, b).astype(int)
     return s
 
 
-def draw_categorical_sample(param):
+def draw_categorical_samples(param, N, rng=None):
     """
-    Function draws a random sample from a categorical list
+    Function draws N random samples from a categorical list at once
 
     :param param: [dict] input hyperparameter discription
+    :param N: [int] number of samples
+    :param rng: [Generator] numpy random Generator, if None a fresh one is created, default=None
 
-    :return: random sample value of type data['type']
+    :return: [list] N random sample values of type data['type']
     """
-    return random.sample(param['data'], 1)[0]
+    if rng is None:
+        rng = np.random.default_rng()
+    choices = rng.integers(0, len(param['data']), size=N)
+    return [param['data'][i] for i in choices]
 
 
-def draw_sample(param):
+def draw_samples(param, N, rng=None):
     """
-    Function draws a sample from the input hyperparameter descriptor depending on it's domain
+    Function draws N samples from the input hyperparameter descriptor depending on it's domain with a single numpy call
 
     :param param: [dict] input hyperparameter discription
+    :param N: [int] number of samples
+    :param rng: [Generator] numpy random Generator, if None a fresh one is created, default=None
 
-    :return: random sample value of type data['type']
+    :return: [list] N random sample values of type data['type']
     """
     assert isinstance(param, dict), "input error, hyperparam descriptors of type {} not allowed!".format(type(param))
     if param['domain'] == "uniform":
-        return draw_uniform_sample(param)
+        return draw_uniform_samples(param, N, rng).tolist()
     elif param['domain'] == "normal":
-        return draw_normal_sample(param)
+        return draw_normal_samples(param, N, rng).tolist()
     elif param['domain'] == "loguniform":
-        return draw_loguniform_sample(param)
+        return draw_loguniform_samples(param, N, rng).tolist()
     elif param['domain'] == "categorical":
-        return draw_categorical_sample(param)
+        return draw_categorical_samples(param, N, rng)
+    else:
+        raise LookupError("Unknown domain {}".format(param['domain']))
+
+
+def inverse_cdf(param, u):
+    """
+    Function maps samples from the unit interval [0, 1) onto the input hyperparameter descriptors domain using the
+    inverse cumulative distribution function of the domain. Stratified unit designs, e.g. latin hypercube or low
+    discrepancy sequences, keep their space filling properties this way. The normal domain is a gaussian truncated to
+    the range with the same mean and sigma the random draws use, int values are spread evenly over all integers of the
+    range and categorical values get equally sized strata of the unit interval.
+
+    :param param: [dict] input hyperparameter discription
+    :param u: [ndarray] samples in [0, 1)
+
+    :return: [ndarray] sample values, for the categorical domain the indices into data['data']
+    """
+    assert isinstance(param, dict), "input error, hyperparam descriptors of type {} not allowed!".format(type(param))
+    u = np.asarray(u, dtype=float)
+    if param['domain'] == "categorical":
+        return np.minimum((u * len(param['data'])).astype(int), len(param['data']) - 1)
+    assert param['type'] is not str, "cannot sample a string list!"
+    assert param['data'][0] < param['data'][1], "precondition violation: data[0] > data[1]!"
+    a, b = param['data'][0], param['data'][1]
+    if param['domain'] == "uniform":
+        if param['type'] is int:
+            return np.minimum(int(a) + np.floor(u * (int(b) - int(a) + 1)), int(b)).astype(int)
+        s = a + u * (b - a)
+    elif param['domain'] == "normal":
+        mu = (b - a) / 2
+        sigma = mu / 3
+        lcdf = norm.cdf(a, loc=a + mu, scale=sigma)
+        rcdf = norm.cdf(b, loc=a + mu, scale=sigma)
+        s = norm.ppf(lcdf + u * (rcdf - lcdf), loc=a + mu, scale=sigma)
+    elif param['domain'] == "loguniform":
+        lexp = np.log(a)
+        rexp = np.log(b)
+        assert not np.isnan(lexp), "Precondition violation, left bound input error, results in nan!"
+        assert not np.isnan(rexp), "Precondition violation, right bound input error, results in nan!"
+        s = np.exp(lexp + u * (rexp - lexp))
     else:
         raise LookupError("Unknown domain {}".format(param['domain']))
+    s = np.clip(s, a, b)
+    if param['type'] is int:
+        s = np.clip(np.round(s), a, b).astype(int)
+    return s
+
+
+def transform_unit_samples(param, u):
+    """
+    Function maps samples from the unit interval [0, 1) onto the input hyperparameter descriptors domain, see
+    inverse_cdf.
+
+    :param param: [dict] input hyperparameter discription
+    :param u: [ndarray] samples in [0, 1)
+
+    :return: [list] sample values of type data['type']
+    """
+    s = inverse_cdf(param, u)
+    if param['domain'] == "categorical":
+        return [param['data'][i] for i in s]
+    return s.tolist()
+
+
+def draw_uniform_sample(param):
+    """
+    Function draws a random sample from a uniform range
+
+    :param param: [dict] input hyperparameter discription
+
+    :return: random sample value of type data['type']
+    """
+    return draw_uniform_samples(param, 1).tolist()[0]
+
+
+def draw_normal_sample(param):
+    """
+    Function draws a random sample from a normal distributed range
+
+    :param param: [dict] input hyperparameter discription
+
+    :return: random sample value of type data['type']
+    """
+    return draw_normal_samples(param, 1).tolist()[0]
+
+
+def draw_loguniform_sample(param):
+    """
+    Function draws a random sample from a logarithmic distributed range
+
+    :param param: [dict] input hyperparameter discription
+
+    :return: random sample value of type data['type']
+    """
+    return draw_loguniform_samples(param, 1).tolist()[0]
+
+
+def draw_categorical_sample(param):
+    """
+    Function draws a random sample from a categorical list
+
+    :param param: [dict] input hyperparameter discription
+
+    :return: random sample value of type data['type']
+    """
+    return draw_categorical_samples(param, 1)[0]
+
+
+def draw_sample(param):
+    """
+    Function draws a sample from the input hyperparameter descriptor depending on it's domain
+
+    :param param: [dict] input hyperparameter discription
+
+    :return: random sample value of type data['type']
+    """
+    return draw_samples(param, 1)[0]
 
 
 class RandomsearchSolver(HyppopySolver):
@@ -166,15 +294,10 @@ class RandomsearchSolver(HyppopySolver):
 
         :param searchspace: converted hyperparameter space
         """
-        candidates_list = list()
         N = self.max_iterations
-        for n in range(N):
-            params = {}
-            for name, p in searchspace.items():
-                params[name] = draw_sample(p)
-            candidates_list.append(CandidateDescriptor(**params))
-
-        return candidates_list
+        names = list(searchspace.keys())
+        columns = [draw_samples(searchspace[name], N, self.rng) for name in names]
+        return [CandidateDescriptor(**dict(zip(names, row))) for row in zip(*columns)]
 
     def execute_solver(self, searchspace):
         """
@@ -0,0 +1,46 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+__all__ = ['SobolSolver']
+
+import os
+import logging
+import warnings
+from scipy.stats import qmc
+from hyppopy.globals import DEBUGLEVEL
+from hyppopy.solvers.LatinHypercubeSolver import LatinHypercubeSolver
+
+LOG = logging.getLogger(os.path.basename(__file__))
+LOG.setLevel(DEBUGLEVEL)
+
+
+class SobolSolver(LatinHypercubeSolver):
+    """
+    The SobolSolver class implements a space filling search based on a scrambled Sobol sequence
+    (https://en.wikipedia.org/wiki/Sobol_sequence). It works like the LatinHypercubeSolver, the unit design is a
+    randomly scrambled Sobol point set instead. Sobol point sets have their best uniformity properties if
+    max_iterations is a power of two.
+    """
+    def get_unit_design(self, N_samples, N_dims):
+        """
+        Returns the design in the unit cube the candidates are created from.
+
+        :param N_samples: [int] number of samples
+        :param N_dims: [int] number of dimensions
+
+        :return: [ndarray] design of shape (N_samples, N_dims) with values in [0, 1)
+        """
+        sampler = qmc.Sobol(d=N_dims, scramble=True, seed=self.rng)
+        with warnings.catch_warnings():
+            # the balance warning for N_samples not being a power of two is expected for arbitrary max_iterations
+            warnings.simplefilter("ignore", UserWarning)
+            return sampler.random(N_samples)
@@ -0,0 +1,352 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+__all__ = ['TPESolver', 'ParzenEstimator', 'get_axis']
+
+import os
+import logging
+import numpy as np
+from pprint import pformat
+from scipy.special import ndtr, ndtri, logsumexp
+from hyppopy.globals import DEBUGLEVEL
+from hyppopy.CandidateDescriptor import CandidateDescriptor
+from hyppopy.solvers.HyppopySolver import HyppopySolver, select_history
+from hyppopy.solvers.RandomsearchSolver import draw_samples
+
+LOG = logging.getLogger(os.path.basename(__file__))
+LOG.setLevel(DEBUGLEVEL)
+
+EPS = 1e-12
+
+
+def get_axis(name, param):
+    """
+    Converts a hyppopy hyperparameter description into the axis description the TPE model works on. Continuous
+    axes are modelled in the internal space z, which is log(x) for loguniform domains and x otherwise, integer axes
+    are extended by 0.5 on both sides so each integer covers an interval of width one. Categorical axes are modelled
+    as index into the data list.
+
+    :param name: [str] hyperparameter name
+    :param param: [dict] hyperparameter description e.g. {'domain': 'uniform', 'data': [0, 1], 'type': float}
+
+    :return: [dict] axis description
+    """
+    domain = param["domain"]
+    dtype = param["type"]
+    data = param["data"]
+    axis = {"name": name, "param": param, "domain": domain, "type": dtype}
+    if domain == "categorical":
+        axis["categorical"] = True
+        axis["n_choices"] = len(data)
+        return axis
+    assert data[0] < data[1], "precondition violation, data[0] > data[1] for hyperparameter {}!".format(name)
+    axis["categorical"] = False
+    axis["log"] = domain == "loguniform"
+    low, high = float(data[0]), float(data[1])
+    if dtype is int:
+        low, high = low - 0.5, high + 0.5
+    if axis["log"]:
+        assert low > 0, "precondition violation, loguniform domain of {} needs positive bounds!".format(name)
+        low, high = np.log(low), np.log(high)
+    axis["low"] = low
+    axis["high"] = high
+    if domain == "normal":
+        axis["prior_mu"] = low + (high - low) / 2
+        axis["prior_sigma"] = (high - low) / 6
+    else:
+        axis["prior_mu"] = low + (high - low) / 2
+        axis["prior_sigma"] = high - low
+    return axis
+
+
+class ParzenEstimator(object):
+    """
+    One dimensional Parzen estimator as used by the tree-structured Parzen estimator approach (Bergstra et al. 2011).
+    Continuous axes are modelled as mixture of normal distributions truncated to the axis bounds, one component per
+    observation plus a prior component, with adaptive bandwidths given by the distance to the neighbouring
+    observations. Categorical axes are modelled as smoothed histogram. Sampling and density evaluation are
+    vectorized over all samples and all components.
+    """
+
+    def __init__(self, axis, observations, prior_weight=1.0):
+        """
+        The constructor fits the estimator.
+
+        :param axis: [dict] axis description, see get_axis
+        :param observations: [ndarray] observed values in the internal space of the axis
+        :param prior_weight: [float] weight of the prior component, default=1.0
+        """
+        self._axis = axis
+        observations = np.asarray(observations, dtype=float)
+        if axis["categorical"]:
+            counts = np.bincount(observations.astype(int), minlength=axis["n_choices"]).astype(float)
+            counts += prior_weight
+            self._probabilities = counts / np.sum(counts)
+            return
+        low, high = axis["low"], axis["high"]
+        prior_mu, prior_sigma = axis["prior_mu"], axis["prior_sigma"]
+        mus = np.append(observations, prior_mu)
+        order = np.argsort(mus, kind="stable")
+        sorted_mus = mus[order]
+        padded = np.concatenate([[low], sorted_mus, [high]])
+        sigmas = np.maximum(sorted_mus - padded[:-2], padded[2:] - sorted_mus)
+        min_sigma = prior_sigma / min(100.0, 1.0 + len(mus))
+        sigmas = np.clip(sigmas, min_sigma, prior_sigma)
+        weights = np.ones(len(mus))
+        weights[order == len(observations)] = prior_weight
+        sigmas[order == len(observations)] = prior_sigma
+        self._mus = sorted_mus
+        self._sigmas = sigmas
+        self._weights = weights / np.sum(weights)
+        self._lower = ndtr((low - self._mus) / self._sigmas)
+        self._upper = ndtr((high - self._mus) / self._sigmas)
+        self._log_norm = np.log(self._weights) - np.log(self._sigmas) - 0.5 * np.log(2 * np.pi) - \
+            np.log(np.maximum(self._upper - self._lower, EPS))
+
+    def sample(self, N, rng):
+        """
+        Draws N samples from the estimator.
+
+        :param N: [int] number of samples
+        :param rng: [Generator] numpy random Generator
+
+        :return: [ndarray] N samples in the internal space of the axis
+        """
+        if self._axis["categorical"]:
+            return rng.choice(self._axis["n_choices"], size=N, p=self._probabilities).astype(float)
+        k = rng.choice(len(self._weights), size=N, p=self._weights)
+        u = self._lower[k] + rng.random(N) * (self._upper[k] - self._lower[k])
+        z = self._mus[k] + self._sigmas[k] * ndtri(np.clip(u, EPS, 1 - EPS))
+        return np.clip(z, self._axis["low"], self._axis["high"])
+
+    def log_pdf(self, z):
+        """
+        Evaluates the log density of the estimator.
+
+        :param z: [ndarray] values in the internal space of the axis
+
+        :return: [ndarray] log densities
+        """
+        if self._axis["categorical"]:
+            return np.log(self._probabilities[np.asarray(z).astype(int)])
+        d = (np.asarray(z)[:, np.newaxis] - self._mus) / self._sigmas
+        return logsumexp(self._log_norm - 0.5 * d * d, axis=1)
+
+
+class TPESolver(HyppopySolver):
+    """
+    The TPESolver class implements the tree-structured Parzen estimator approach natively in numpy. The history is
+    kept in arrays, per axis the finished trials are split into the n_below best ones and the rest, each group is
+    modelled by a ParzenEstimator. Candidates are drawn from the estimator of the good group and the one maximizing
+    the density ratio is proposed. Per step batch_size proposals are made and evaluated at once via
+    loss_function_batch, a proposal pending in the current batch counts as bad trial for the following ones. With
+    history_size set the estimators are fit on at most history_size trials selected by history_strategy (see
+    select_history), which keeps the cost of a suggestion constant for long runs. With asynchronous set there are no
+    batches, a new proposal is made whenever a worker is free, the trials still running count as bad trials.
+    """
+    def __init__(self, project=None):
+        """
+        The constructor accepts a HyppopyProject.
+
+        :param project: [HyppopyProject] project instance, default=None
+        """
+        HyppopySolver.__init__(self, project)
+        self._axes = None
+        self._history_z = None
+        self._history_loss = None
+        self._n_history = 0
+
+    def define_interface(self):
+        """
+        This function is called when HyppopySolver.__init__ function finished. Child classes need to define their
+        individual parameter here by calling the _add_member function for each class member variable need to be defined.
+        Using _add_hyperparameter_signature the structure of a hyperparameter the solver expects must be defined.
+        Both, members and hyperparameter signatures are later get checked, before executing the solver, ensuring
+        settings passed fullfill solver needs.
+        """
+        self._add_member("max_iterations", int)
+        self._add_member("batch_size", int, default=1)
+        self._add_member("n_startup_trials", int, default=20)
+        self._add_member("n_ei_candidates", int, default=24)
+        self._add_member("gamma", float, default=0.25)
+        self._add_member("prior_weight", float, default=1.0)
+        self._add_member("history_size", int, optional=True)
+        self._add_member("history_strategy", str, default="recent")
+        self._add_member("asynchronous", bool, default=False)
+        self._add_hyperparameter_signature(name="domain", dtype=str,
+                                          options=["uniform", "normal", "loguniform", "categorical"])
+        self._add_hyperparameter_signature(name="data", dtype=list)
+        self._add_hyperparameter_signature(name="type", dtype=type)
+
+    def get_history(self):
+        """
+        Returns the finished trials the estimators are fitted on, these are the successful ones of the history_size
+        trials selected by history_strategy, all trials if history_size is not set.
+
+        :return: [ndarray], [ndarray] values of shape (N, N_dims) in the internal space and losses of shape (N,)
+        """
+        loss = self._history_loss[:self._n_history]
+        indices = select_history(loss, self.history_size, self.history_strategy, self.rng)
+        z = self._history_z[indices]
+        loss = loss[indices]
+        valid = np.isfinite(loss)
+        return z[valid], loss[valid]
+
+    def encode(self, params):
+        """
+        Converts a parameter set into the internal space.
+
+        :param params: [dict] parameter set
+
+        :return: [ndarray] values of shape (N_dims,)
+        """
+        z = np.empty(len(self._axes))
+        for n, axis in enumerate(self._axes):
+            value = params[axis["name"]]
+            if axis["categorical"]:
+                z[n] = axis["param"]["data"].index(value)
+            elif axis["log"]:
+                z[n] = np.log(value)
+            else:
+                z[n] = value
+        return z
+
+    def decode(self, z):
+        """
+        Converts values of the internal space into a parameter set.
+
+        :param z: [ndarray] values of shape (N_dims,)
+
+        :return: [dict] parameter set
+        """
+        params = {}
+        for n, axis in enumerate(self._axes):
+            data = axis["param"]["data"]
+            if axis["categorical"]:
+                params[axis["name"]] = data[int(z[n])]
+                continue
+            value = np.exp(z[n]) if axis["log"] else z[n]
+            value = min(max(value, data[0]), data[1])
+            if axis["type"] is int:
+                value = int(min(max(np.round(value), data[0]), data[1]))
+            params[axis["name"]] = float(value) if axis["type"] is float else value
+        return params
+
+    def suggest(self, N, running=None):
+        """
+        Proposes N new points. As long as there are less than n_startup_trials finished trials the points are drawn
+        randomly from the hyperparameter domains.
+
+        :param N: [int] number of proposals
+        :param running: [ndarray] points of the trials still running of shape (M, N_dims), they count as bad trials,
+                        default=None
+
+        :return: [ndarray] proposals of shape (N, N_dims) in the internal space
+        """
+        z, loss = self.get_history()
+        if len(loss) < max(self.n_startup_trials, 2):
+            columns = [draw_samples(axis["param"], N, self.rng) for axis in self._axes]
+            return np.array([self.encode(dict(zip([axis["name"] for axis in self._axes], row)))
+                             for row in zip(*columns)])
+
+        n_below = min(max(int(np.ceil(self.gamma * np.sqrt(len(loss)))), 1), len(loss) - 1)
+        order = np.argsort(loss, kind="stable")
+        below = z[order[:n_below]]
+        above = z[order[n_below:]]
+        if running is not None and len(running) > 0:
+            above = np.concatenate([above, running], axis=0)
+        proposals = np.empty((N, len(self._axes)))
+        below_estimators = [ParzenEstimator(axis, below[:, n], self.prior_weight) for n, axis in enumerate(self._axes)]
+        for i in range(N):
+            # the proposals of this batch are still pending, they count as bad trials for the following proposals
+            pending = np.concatenate([above, proposals[:i]], axis=0)
+            candidates = np.empty((self.n_ei_candidates, len(self._axes)))
+            score = np.zeros(self.n_ei_candidates)
+            for n, axis in enumerate(self._axes):
+                above_estimator = ParzenEstimator(axis, pending[:, n], self.prior_weight)
+                candidates[:, n] = below_estimators[n].sample(self.n_ei_candidates, self.rng)
+                score += below_estimators[n].log_pdf(candidates[:, n]) - above_estimator.log_pdf(candidates[:, n])
+            proposals[i] = candidates[np.argmax(score)]
+        return proposals
+
+    def add_history(self, candidate, result):
+        """
+        Appends a finished trial to the history.
+
+        :param candidate: [CandidateDescriptor] evaluated candidate
+        :param result: [dict] result dict of the candidate
+        """
+        try:
+            loss = float(result['loss'])
+        except (TypeError, ValueError):
+            loss = np.nan
+        self._history_z[self._n_history] = self.encode(candidate.get_values())
+        self._history_loss[self._n_history] = loss
+        self._n_history += 1
+
+    def execute_solver(self, searchspace):
+        """
+        This function is called immediately after convert_searchspace and get the output of the latter as input. It's
+        purpose is to call the solver libs main optimization function.
+
+        :param searchspace: converted hyperparameter space
+        """
+        assert self.batch_size > 0, "precondition violation, batch_size needs to be > 0!"
+        if self.history_size is not None and self.history_size < max(self.n_startup_trials, 2):
+            msg = "history_size needs to be at least n_startup_trials ({}), otherwise the estimators never take " \
+                  "over from the random startup proposals!".format(max(self.n_startup_trials, 2))
+            LOG.error(msg)
+            raise AssertionError(msg)
+        self._axes = searchspace
+        self._history_z = np.empty((self.max_iterations, len(self._axes)))
+        self._history_loss = np.empty(self.max_iterations)
+        self._n_history = 0
+        running = {}
+
+        def ask():
+            points = np.array(list(running.values())).reshape(-1, len(self._axes))
+            candidate = CandidateDescriptor(**self.decode(self.suggest(1, points)[0]))
+            running[candidate.ID] = self.encode(candidate.get_values())
+            return candidate
+
+        def tell(candidate, result):
+            del running[candidate.ID]
+            self.add_history(candidate, result)
+
+        try:
+            if self.asynchronous:
+                self.loss_function_async(ask, tell, self.max_iterations)
+            else:
+                while self._n_history < self.max_iterations:
+                    proposals = self.suggest(min(self.batch_size, self.max_iterations - self._n_history))
+                    candidates = [CandidateDescriptor(**self.decode(z)) for z in proposals]
+                    results = self.loss_function_batch(candidates)
+                    for candidate in candidates:
+                        self.add_history(candidate, results[candidate.ID])
+        except Exception as e:
+            msg = "internal error in tpe execute_solver occured. {}".format(e)
+            LOG.error(msg)
+            raise BrokenPipeError(msg)
+        self.best = self._trials.argmin
+
+    def convert_searchspace(self, hyperparameter):
+        """
+        This function gets the unified hyppopy-like parameterspace description as input and, if necessary, should
+        convert it into a solver lib specific format. The function is invoked when run is called and what it returns
+        is passed as searchspace argument to the function execute_solver.
+
+        :param hyperparameter: [dict] nested parameter description dict e.g. {'name': {'domain':'uniform', 'data':[0,1], 'type':'float'}, ...}
+
+        :return: [object] converted hyperparameter space
+        """
+        LOG.debug("convert input parameter\n\n\t{}\n".format(pformat(hyperparameter)))
+        return [get_axis(name, param) for name, param in hyperparameter.items()]
@@ -0,0 +1,165 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import pickle
+import datetime
+import threading
+import numpy as np
+
+from mpi4py import MPI
+from hyppopy.BlackboxFunction import BlackboxFunction
+from hyppopy.globals import MPI_TAGS
+from hyppopy.solvers.MPISolverWrapper import MPISolverWrapper
+from hyppopy.solvers.RandomsearchSolver import RandomsearchSolver
+
+
+class BatchBlackboxFunction(BlackboxFunction):
+    """
+    BlackboxFunction recording the batches it is called with
+    """
+    def __init__(self, **kwargs):
+        BlackboxFunction.__init__(self, **kwargs)
+        self.batches = []
+
+    def call_batch(self, candidates):
+        self.batches.append(len(candidates))
+        results = {}
+        for candidate in candidates:
+            results[candidate.ID] = {'book_time': datetime.datetime.now(),
+                                     'loss': self.blackbox_func(**candidate.get_values()),
+                                     'refresh_time': datetime.datetime.now()}
+        return results
+
+
+class AsyncBlackboxFunction(BlackboxFunction):
+    """
+    BlackboxFunction with the asynchronous interface of MPIBlackboxFunction, wait_any finishes the most recently
+    submitted candidate first, so results arrive out of order
+    """
+    def __init__(self, slots, **kwargs):
+        BlackboxFunction.__init__(self, **kwargs)
+        self.slots = slots
+        self.pending = []
+        self.max_pending = 0
+
+    def free_slots(self):
+        return self.slots - len(self.pending)
+
+    def submit(self, candidate):
+        self.pending.append(candidate)
+        self.max_pending = max(self.max_pending, len(self.pending))
+
+    def wait_any(self):
+        candidate = self.pending.pop()
+        return {candidate.ID: {'book_time': datetime.datetime.now(),
+                               'loss': self.blackbox_func(**candidate.get_values()),
+                               'refresh_time': datetime.datetime.now()}}
+
+
+class FakeComm(object):
+    """
+    In process stand-in for the point to point part of an MPI communicator, the ranks of a FakeCluster exchange their
+    messages through shared mailboxes
+    """
+    def __init__(self, rank, cluster):
+        self._rank = rank
+        self._cluster = cluster
+
+    def Get_rank(self):
+        return self._rank
+
+    def Get_size(self):
+        return self._cluster.size
+
+    def _find(self, source, tag):
+        for n, (src, msg_tag, payload) in enumerate(self._cluster.mailboxes[self._rank]):
+            if source in (MPI.ANY_SOURCE, src) and tag in (MPI.ANY_TAG, msg_tag):
+                return n
+        return None
+
+    def _post(self, dest, tag, payload):
+        with self._cluster.condition:
+            self._cluster.mailboxes[dest].append((self._rank, tag, payload))
+            self._cluster.condition.notify_all()
+
+    def _take(self, source, tag):
+        with self._cluster.condition:
+            self._cluster.condition.wait_for(lambda: self._find(source, tag) is not None)
+            return self._cluster.mailboxes[self._rank].pop(self._find(source, tag))
+
+    def send(self, obj, dest, tag=0):
+        self._post(dest, tag, pickle.dumps(obj))
+
+    def Send(self, buf, dest, tag=0):
+        self._post(dest, tag, np.array(buf[0], dtype=np.float64).reshape(-1))
+
+    def recv(self, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG):
+        return pickle.loads(self._take(source, tag)[2])
+
+    def Recv(self, buf, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG):
+        buf[0][...] = self._take(source, tag)[2]
+
+    def Probe(self, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=None):
+        with self._cluster.condition:
+            self._cluster.condition.wait_for(lambda: self._find(source, tag) is not None)
+            self.Iprobe(source, tag, status)
+
+    def Iprobe(self, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=None):
+        with self._cluster.condition:
+            n = self._find(source, tag)
+            if n is None:
+                return False
+            src, msg_tag, payload = self._cluster.mailboxes[self._rank][n]
+            if status is not None:
+                status.Set_source(src)
+                status.Set_tag(msg_tag)
+                if isinstance(payload, np.ndarray):
+                    status.Set_elements(MPI.DOUBLE, payload.size)
+                else:
+                    status.Set_elements(MPI.BYTE, len(payload))
+            return True
+
+
+class FakeCluster(object):
+    """
+    Runs the worker ranks of a FakeComm communicator as threads executing MPISolverWrapper.run_worker_mode with the
+    given blackbox_func, the calling thread is the master with communicator comm. Use it as context manager, on exit
+    the workers are sent the finish signal. The ranks evaluating the candidates are recorded in evaluated_by.
+    """
+    def __init__(self, size, blackbox_func):
+        self.size = size
+        self.mailboxes = dict((rank, []) for rank in range(size))
+        self.condition = threading.Condition()
+        self.comm = FakeComm(0, self)
+        self.evaluated_by = []
+        self._threads = []
+
+        def recording_func(**params):
+            self.evaluated_by.append(threading.current_thread().name)
+            return blackbox_func(**params)
+
+        for rank in range(1, size):
+            wrapper = MPISolverWrapper(solver=RandomsearchSolver(), mpi_comm=FakeComm(rank, self))
+            wrapper.blackbox = recording_func
+            self._threads.append(threading.Thread(target=wrapper.run_worker_mode, name="rank {}".format(rank)))
+        self.blackbox_func = recording_func
+
+    def __enter__(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *args):
+        for rank in range(1, self.size):
+            self.comm.send(None, dest=rank, tag=MPI_TAGS.MPI_SEND_CANDIDATE.value)
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,85 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import pickle
+import unittest
+import numpy as np
+
+from hyppopy.CandidateDescriptor import CandidateDescriptor, CandidateBatch
+
+
+class CandidateDescriptorTestSuite(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_descriptor(self):
+        a = CandidateDescriptor(x=0.5, c="a")
+        b = CandidateDescriptor(c="a", x=0.5)
+        c = CandidateDescriptor(x=0.5, c="b")
+        self.assertTrue(isinstance(a.ID, int))
+        self.assertEqual(b.ID, a.ID + 1)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(len({a, b, c}), 2)
+        self.assertEqual(len(a), 2)
+        self.assertTrue("x" in a)
+        self.assertEqual(a["c"], "a")
+        self.assertRaises(KeyError, a.__getitem__, "y")
+        self.assertFalse(hasattr(a, "__dict__"))
+
+        d = pickle.loads(pickle.dumps(a))
+        self.assertEqual(d.ID, a.ID)
+        self.assertEqual(d, a)
+        self.assertEqual(hash(d), hash(a))
+
+        e = CandidateDescriptor(x=[1, 2])
+        self.assertEqual(hash(e), hash(CandidateDescriptor(x=[1, 2])))
+
+    def test_batch_from_dicts(self):
+        dicts = [{"x": 0.5, "y": 1.0, "c": "a"}, {"x": 1.5, "y": 2.0, "c": "b"}, {"x": 0.1, "y": -1.0, "c": "a"}]
+        batch = CandidateBatch.from_dicts(dicts)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(list(batch.keys()), ["x", "y", "c"])
+        self.assertTrue(isinstance(batch.column("x"), np.ndarray))
+        self.assertTrue(batch["x"] > 0)
+        self.assertFalse(batch["x"] < 1)
+        self.assertTrue(0 < batch["x"] < 2)
+        self.assertTrue(batch["y"] >= -1)
+        self.assertTrue(batch["y"] <= 2)
+        self.assertRaises(KeyError, batch.__getitem__, "z")
+
+        mask = batch.in_box({"x": [0, 1], "y": [0, 10]})
+        self.assertEqual(mask.tolist(), [True, False, False])
+        selected = batch.select(mask)
+        self.assertEqual(selected.to_dicts(), [dicts[0]])
+        self.assertEqual(batch.to_dicts(), dicts)
+        self.assertTrue(all(isinstance(d["x"], float) and isinstance(d["c"], str) for d in batch.to_dicts()))
+
+        candidates = batch.to_candidates()
+        self.assertEqual(candidates, [CandidateDescriptor(**d) for d in dicts])
+        self.assertTrue(batch.to_candidates() is candidates)
+        self.assertEqual(len(CandidateBatch.from_dicts([])), 0)
+
+    def test_batch_from_candidates(self):
+        candidates = [CandidateDescriptor(x=float(n), y=n) for n in range(5)]
+        batch = CandidateBatch.from_candidates(candidates)
+        self.assertEqual(batch.column("y").tolist(), list(range(5)))
+        self.assertEqual([c.ID for c in batch], [c.ID for c in candidates])
+        selected = batch.select(batch.in_box({"x": [0.5, 3.5]}))
+        self.assertEqual([c.ID for c in selected.to_candidates()], [c.ID for c in candidates[1:4]])
+        self.assertRaises(AssertionError, CandidateBatch, {"x": [1, 2], "y": [1]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import sys
+import numpy
+import optunity
+import unittest
+from unittest import mock
+
+from hyppopy.Trials import Trials
+from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.PopulationHistory import PopulationHistory
+from hyppopy.solvers.DynamicPSOSolver import DynamicPSOSolver
+from hyppopy.tests.helpers import BatchBlackboxFunction
+
+
+def objective(x, y):
+    return [x, y]
+
+
+def fake_dyn_PSO(func, box, domains, maximize, max_evals, num_args_obj, num_params_obj, pmap, decoder, update_param,
+                 eval_obj, phi1, phi2):
+    """
+    Stand-in for optunity.optimize_dyn_PSO, which is part of a specialized optunity version. It maps func over 5
+    generations of 5 random particles, the first particle of each generation is repeated and one is out of the box.
+    """
+    rng = numpy.random.default_rng(0)
+    best, best_value = None, None
+    for generation in range(5):
+        seq = [dict((key, rng.uniform(lb, ub)) for key, (lb, ub) in box.items()) for n in range(4)]
+        seq.append(dict(seq[0]))
+        seq[1] = dict((key, ub + 1.0) for key, (lb, ub) in box.items())
+        for particle, loss in zip(seq, pmap(func, seq)):
+            value = eval_obj(loss, update_param([], num_params_obj))
+            if best_value is None or value < best_value:
+                best, best_value = particle, value
+    return decoder(best), None
+
+
+class DynamicPSOSolverTestSuite(unittest.TestCase):
+
+    def setUp(self):
+        self.solver = DynamicPSOSolver()
+        self.solver.num_args_obj = 2
+        self.solver.trials = Trials()
+        self.solver._idx = 0
+        searchspace, domains = self.solver.convert_searchspace({"x": {"domain": "uniform", "data": [0, 1], "type": float},
+                                                                 "y": {"domain": "uniform", "data": [0, 10], "type": float}})
+        self.assertEqual(domains, {"x": "uniform", "y": "uniform"})
+        self.solver._box = dict(searchspace)
+        self.solver._constraint_default = sys.float_info.max * numpy.ones(2)
+        self.solver._population_history = None
+        self.solver._batch_cache = {}
+        self.solver.max_iterations = 100
+        self.f = self.solver.wrap_decoder(optunity.functions.logged(self.solver.cached_loss_function))
+        self.f = optunity.constraints.wrap_constraints(self.f, default=self.solver._constraint_default,
+                                                       range_oo=self.solver._box)
+
+    def test_pmap_single_batch(self):
+        blackbox = BatchBlackboxFunction(blackbox_func=objective)
+        self.solver.blackbox = blackbox
+        seq = [{"x": 0.1, "y": 1.0}, {"x": 1.5, "y": 2.0}, {"x": 0.3, "y": 3.0}, {"x": 0.4, "y": -1.0}]
+        result = self.solver.hyppopy_optunity_solver_pmap(self.f, seq)
+
+        self.assertEqual(blackbox.batches, [2])
+        self.assertEqual(len(self.solver.trials.trials), 2)
+        self.assertEqual(len(result), 4)
+        self.assertEqual(list(result[0]), [0.1, 1.0])
+        self.assertEqual(list(result[1]), [sys.float_info.max] * 2)
+        self.assertEqual(list(result[2]), [0.3, 3.0])
+        self.assertEqual(list(result[3]), [sys.float_info.max] * 2)
+        self.assertEqual(self.solver.hyppopy_optunity_solver_pmap(self.f, []), [])
+
+        # evaluated particles are read from the cache, particles beyond max_iterations get the default
+        self.solver.max_iterations = 3
+        seq = [{"x": 0.1, "y": 1.0}, {"x": 0.5, "y": 5.0}, {"x": 0.6, "y": 6.0}]
+        result = self.solver.hyppopy_optunity_solver_pmap(self.f, seq)
+        self.assertEqual(blackbox.batches, [2, 1])
+        self.assertEqual(list(result[0]), [0.1, 1.0])
+        self.assertEqual(list(result[1]), [0.5, 5.0])
+        self.assertEqual(list(result[2]), [sys.float_info.max] * 2)
+        self.assertEqual(len(self.solver.trials.trials), 3)
+
+    def test_execute_solver(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [0, 1],
+                    "type": float
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b", "c"],
+                    "type": str
+                }
+            },
+            "max_iterations": 12,
+            "num_args_obj": 2,
+            "num_params_obj": 2,
+            "combine_obj": lambda args, params: sum([a * p for a, p in zip(args, params)]),
+            "update_param": lambda pop_history, num_params_obj: numpy.ones(num_params_obj),
+            "seed": 0
+        }
+
+        def blackbox_func(x, c):
+            return [x, ["a", "b", "c"].index(c)]
+
+        solver = DynamicPSOSolver(HyppopyProject(config))
+        blackbox = BatchBlackboxFunction(blackbox_func=blackbox_func)
+        solver.blackbox = blackbox
+        with mock.patch("optunity.optimize_dyn_PSO", side_effect=fake_dyn_PSO, create=True) as dyn_PSO:
+            solver.run(print_stats=False)
+        df, best = solver.get_results()
+
+        func = dyn_PSO.call_args[1]["func"]
+        self.assertEqual(dyn_PSO.call_args[1]["max_evals"], 12)
+        # the categorical is sampled as index range
+        self.assertEqual(dyn_PSO.call_args[1]["domains"], {"x": "uniform", "c": "uniform"})
+        self.assertEqual(dyn_PSO.call_args[1]["box"], {"x": [0, 1], "c": [0.0, 3.0]})
+        # 3 new particles per generation, the budget is used up after the 4th generation
+        self.assertEqual(blackbox.batches, [3, 3, 3, 3])
+        self.assertEqual(len(df), 12)
+        self.assertEqual(len(func.call_log), 12)
+        self.assertIn(best["c"], ["a", "b", "c"])
+        self.assertTrue(0 < best["x"] < 1)
+
+    def test_pmap_sequential(self):
+        def blackbox(x, y):
+            if x > 0.5:
+                raise ValueError("failed")
+            return [x, y]
+        self.solver.blackbox = blackbox
+        result = self.solver.hyppopy_optunity_solver_pmap(self.f, [{"x": 0.2, "y": 1.0}, {"x": 0.7, "y": 2.0}])
+        self.assertEqual(list(result[0]), [0.2, 1.0])
+        self.assertEqual(list(result[1]), [sys.float_info.max] * 2)
+
+    def test_pmap_population_history(self):
+        self.solver._population_history = PopulationHistory(2, self.solver._box.keys())
+        self.solver.blackbox = objective
+        seq = [{"x": 0.1, "y": 1.0}, {"x": 1.5, "y": 2.0}, {"x": 0.3, "y": 3.0}]
+        for n in range(3):
+            self.solver.hyppopy_optunity_solver_pmap(self.f, [{"x": p["x"], "y": p["y"] + n} for p in seq])
+        history = self.solver.population_history
+        self.assertEqual(history.generations, 3)
+        self.assertEqual(history.positions.shape, (2, 3, 2))
+        self.assertEqual(history.objectives.shape, (2, 3, 2))
+        self.assertEqual(history.positions[:, 0, 1].tolist(), [2.0, 3.0])
+        self.assertTrue(numpy.all(numpy.isnan(history.objectives[:, 1])))
+        self.assertEqual(history.count.tolist(), [6, 6])
+        self.assertAlmostEqual(history.mean[1], 3.0)
+        self.assertEqual(history.minimum.tolist(), [0.1, 1.0])
+
+        self.solver.update_param = lambda pop_history, num_params_obj: (pop_history, num_params_obj)
+        self.assertEqual(self.solver.update_param_from_history([], 2), (history, 2))
+
+    def test_population_history(self):
+        rng = numpy.random.default_rng(0)
+        history = PopulationHistory(4)
+        self.assertEqual(len(history), 0)
+        self.assertTrue(history.positions is None)
+        self.assertTrue(history.latest_objectives is None)
+        positions = rng.normal(size=(10, 8, 3))
+        objectives = rng.normal(size=(10, 8, 2))
+        objectives[3, 2, 0] = numpy.nan
+        for n in range(10):
+            history.append(positions[n], objectives[n])
+        self.assertEqual(len(history), 4)
+        self.assertEqual(history.generations, 10)
+        numpy.testing.assert_array_equal(history.positions, positions[6:])
+        numpy.testing.assert_array_equal(history.objectives, objectives[6:])
+        numpy.testing.assert_array_equal(history.latest_positions, positions[-1])
+        values = objectives.reshape(-1, 2)
+        self.assertEqual(history.count.tolist(), [79, 80])
+        numpy.testing.assert_allclose(history.mean, numpy.nanmean(values, axis=0))
+        numpy.testing.assert_allclose(history.variance, numpy.nanvar(values, axis=0, ddof=1))
+        numpy.testing.assert_allclose(history.std, numpy.nanstd(values, axis=0, ddof=1))
+        numpy.testing.assert_allclose(history.minimum, numpy.nanmin(values, axis=0))
+        numpy.testing.assert_allclose(history.maximum, numpy.nanmax(values, axis=0))
+        self.assertRaises(AssertionError, history.append, positions[0, :4], objectives[0, :4])
+
+
+if __name__ == '__main__':
+    unittest.main()
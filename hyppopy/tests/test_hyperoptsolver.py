@@ -10,11 +10,15 @@
 #
 # See LICENSE
 
+import time
 import unittest
+from unittest import mock
+from hyperopt.fmin import generate_trials_to_calculate
 
 from hyppopy.solvers.HyperoptSolver import *
 from hyppopy.FunctionSimulator import FunctionSimulator
 from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.tests.helpers import BatchBlackboxFunction, AsyncBlackboxFunction
 
 
 class HyperoptSolverTestSuite(unittest.TestCase):
@@ -60,6 +64,314 @@ class HyperoptSolverTestSuite(unittest.TestCase):
         for loss in df['losses']:
             self.assertTrue(isinstance(loss, float))
 
+    def test_solver_batched(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "uniform",
+                    "data": [300, 700],
+                    "type": float
+                },
+                "axis_01": {
+                    "domain": "uniform",
+                    "data": [0, 0.8],
+                    "type": float
+                },
+                "axis_02": {
+                    "domain": "uniform",
+                    "data": [3.5, 6.5],
+                    "type": float
+                },
+                "axis_03": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                }
+            },
+            "max_iterations": 300,
+            "batch_size": 8,
+            "seed": 42
+            }
+
+        vfunc = FunctionSimulator()
+        vfunc.load_default()
+        project = HyppopyProject(config)
+        solver = HyperoptSolver(project)
+        blackbox = BatchBlackboxFunction(blackbox_func=lambda axis_00, axis_01, axis_02, axis_03:
+                                         vfunc(axis_00=axis_00, axis_01=axis_01, axis_02=axis_02))
+        solver.blackbox = blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(blackbox.batches, [8] * 37 + [4])
+        self.assertEqual(len(df), 300)
+        self.assertTrue(set(df['axis_03']) <= {"a", "b"})
+        self.assertTrue(300 <= df['axis_00'].min() and df['axis_00'].max() <= 700)
+        self.assertTrue(560 <= best['axis_00'] <= 600)
+        self.assertTrue(4.5 <= best['axis_02'] <= 5.5)
+        self.assertTrue(best['axis_03'] in ["a", "b"])
+
+        for status in df['status']:
+            self.assertTrue(status)
+
+    def test_solver_async(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                }
+            },
+            "max_iterations": 100,
+            "asynchronous": True,
+            "seed": 42
+            }
+
+        solver = HyperoptSolver(HyppopyProject(config))
+        blackbox = AsyncBlackboxFunction(4, blackbox_func=lambda x, c: (x - 1) ** 2 + (0 if c == "a" else 1))
+        solver.blackbox = blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(blackbox.max_pending, 4)
+        self.assertEqual(len(blackbox.pending), 0)
+        self.assertEqual(len(df), 100)
+        self.assertEqual(best['c'], "a")
+        self.assertTrue(0 <= best['x'] <= 2)
+
+    def test_best_decoded(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                },
+                "f": {
+                    "domain": "categorical",
+                    "data": [True, False],
+                    "type": bool
+                }
+            },
+            "max_iterations": 40,
+            "seed": 42
+            }
+
+        def blackbox_func(x, c, f):
+            return (x - 1) ** 2 + (0 if c == "b" else 1) + (0 if f else 1)
+
+        bests = []
+        for settings in [{}, {"batch_size": 4}, {"asynchronous": True}]:
+            solver = HyperoptSolver(HyppopyProject(dict(config, **settings)))
+            solver.blackbox = AsyncBlackboxFunction(4, blackbox_func=blackbox_func)
+            solver.run(print_stats=False)
+            _, best = solver.get_results()
+            bests.append(best)
+        for best in bests:
+            self.assertEqual(sorted(best.keys()), ["c", "f", "x"])
+            self.assertTrue(best['c'] in ["a", "b"])
+            self.assertTrue(isinstance(best['f'], bool))
+            self.assertTrue(isinstance(best['x'], float))
+
+    def test_results_decoded(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                },
+                "n": {
+                    "domain": "uniform",
+                    "data": [1, 10],
+                    "type": int
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                }
+            },
+            "max_iterations": 30,
+            "seed": 42
+            }
+
+        def blackbox_func(x, n, c):
+            return (x - 1) ** 2 + n + (0 if c == "b" else 1)
+
+        frames = []
+        for settings in [{}, {"batch_size": 4}, {"asynchronous": True}]:
+            solver = HyperoptSolver(HyppopyProject(dict(config, **settings)))
+            solver.blackbox = AsyncBlackboxFunction(4, blackbox_func=blackbox_func)
+            solver.run(print_stats=False)
+            df, best = solver.get_results()
+            frames.append(df)
+            self.assertEqual(len(df), 30)
+            self.assertTrue(isinstance(best['n'], int))
+            self.assertEqual(set(df['c']), {"a", "b"})
+            self.assertTrue(set(df['n']) <= set(range(1, 11)))
+            self.assertTrue(all(df['status']))
+        for df in frames[1:]:
+            self.assertEqual(sorted(df.columns), sorted(frames[0].columns))
+            self.assertEqual(dict(df.dtypes), dict(frames[0].dtypes))
+
+    def test_solver_history(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "uniform",
+                    "data": [300, 700],
+                    "type": float
+                },
+                "axis_01": {
+                    "domain": "uniform",
+                    "data": [0, 0.8],
+                    "type": float
+                },
+                "axis_02": {
+                    "domain": "uniform",
+                    "data": [3.5, 6.5],
+                    "type": float
+                }
+            },
+            "max_iterations": 150,
+            "history_size": 50,
+            "history_strategy": "stratified",
+            "seed": 1
+            }
+
+        vfunc = FunctionSimulator()
+        vfunc.load_default()
+        for batch_size in [None, 5]:
+            if batch_size is not None:
+                config["batch_size"] = batch_size
+            solver = HyperoptSolver(HyppopyProject(config))
+            solver.blackbox = vfunc
+            sizes = []
+            suggest = tpe.suggest
+
+            def recording_suggest(new_ids, domain, trials, seed):
+                sizes.append(len(trials.trials))
+                return suggest(new_ids, domain, trials, seed)
+
+            with mock.patch.object(tpe, "suggest", recording_suggest):
+                solver.run(print_stats=False)
+            df, best = solver.get_results()
+            self.assertEqual(len(df), 150)
+            self.assertTrue(300 <= best['axis_00'] <= 700)
+            self.assertEqual(len(sizes), 150)
+            self.assertTrue(max(sizes) <= 50 + (batch_size or 0))
+
+    def test_history_suggest_time(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                }
+            },
+            "max_iterations": 20000,
+            "history_size": 30,
+            "seed": 0
+            }
+
+        def suggest_time(n):
+            rng = np.random.default_rng(0)
+            trials = generate_trials_to_calculate([{'x': x} for x in rng.uniform(-5, 5, n)])
+            for doc in trials._dynamic_trials:
+                doc['state'] = JOB_STATE_DONE
+                doc['result'] = {'loss': doc['misc']['vals']['x'][0] ** 2, 'status': STATUS_OK}
+            trials.refresh()
+            solver = HyperoptSolver(HyppopyProject(config))
+            searchspace = solver.convert_searchspace(solver.project.hyperparameter)
+            domain = Domain(lambda params: None, searchspace)
+            solver.reset_history()
+            times = []
+            for tid in range(n, n + 21):
+                start = time.perf_counter()
+                docs = solver.suggest([tid], domain, trials, tid)
+                times.append(time.perf_counter() - start)
+                docs[0]['state'] = JOB_STATE_DONE
+                docs[0]['result'] = {'loss': 1.0, 'status': STATUS_OK}
+                trials.insert_trial_docs(docs)
+                trials.refresh()
+            # the first call collects the trials so far
+            return np.median(times[1:])
+
+        # the history passed to tpe.suggest is bounded, so its cost does not grow with the number of trials
+        self.assertLess(suggest_time(10000), 2 * suggest_time(300))
+
+    def test_history_startup(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                }
+            },
+            "max_iterations": 40,
+            "history_size": 20,
+            "seed": 1
+            }
+
+        solver = HyperoptSolver(HyppopyProject(config))
+        solver.blackbox = lambda x: x ** 2
+        with mock.patch.object(tpe.rand, "suggest", wraps=tpe.rand.suggest) as random_suggest:
+            solver.run(print_stats=False)
+        # after the random startup trials the model takes over although only history_size trials are passed on
+        self.assertEqual(random_suggest.call_count, 20)
+
+        config["history_size"] = 10
+        solver = HyperoptSolver(HyppopyProject(config))
+        solver.blackbox = lambda x: x ** 2
+        self.assertRaises(AssertionError, solver.run, print_stats=False)
+
+    def test_solver_int(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "uniform",
+                    "data": [0, 1000000],
+                    "type": int
+                },
+                "axis_01": {
+                    "domain": "loguniform",
+                    "data": [1, 1000],
+                    "type": int
+                }
+            },
+            "max_iterations": 100,
+            "seed": 7
+            }
+
+        def blackbox_func(axis_00, axis_01):
+            self.assertTrue(isinstance(axis_00, int) and 0 <= axis_00 <= 1000000)
+            self.assertTrue(isinstance(axis_01, int) and 1 <= axis_01 <= 1000)
+            return abs(axis_00 - 250000) / 1000000 + abs(axis_01 - 10)
+
+        for batch_size in [None, 10]:
+            if batch_size is not None:
+                config["batch_size"] = batch_size
+            project = HyppopyProject(config)
+            solver = HyperoptSolver(project)
+            solver.blackbox = BlackboxFunction(blackbox_func=blackbox_func)
+            solver.run(print_stats=False)
+            df, best = solver.get_results()
+            self.assertEqual(len(df), 100)
+            self.assertTrue(isinstance(best['axis_00'], int) and 0 <= best['axis_00'] <= 1000000)
+            self.assertTrue(isinstance(best['axis_01'], int) and 3 <= best['axis_01'] <= 30)
+
     def test_solver_normal(self):
         config = {
             "hyperparameter": {
@@ -11,9 +11,10 @@
 # See LICENSE
 
 import unittest
+import numpy as np
 
 from hyppopy.HyppopyProject import HyppopyProject
-from hyppopy.solvers.HyppopySolver import HyppopySolver
+from hyppopy.solvers.HyppopySolver import HyppopySolver, select_history
 
 
 class FooSolver1(HyppopySolver):
@@ -339,6 +340,22 @@ class HyppopySolverTestSuite(unittest.TestCase):
         self.assertRaises(TypeError, solver.blackbox, 100)
         self.assertRaises(TypeError, solver.best, 100)
 
+    def test_select_history(self):
+        losses = np.random.default_rng(0).random(100)
+        losses[[5, 17]] = np.nan
+        best = int(np.nanargmin(losses))
+        self.assertEqual(list(select_history(losses, None)), list(range(100)))
+        self.assertEqual(list(select_history(losses, 200, "topk")), list(range(100)))
+        self.assertEqual(list(select_history(losses, 10)), list(range(90, 100)))
+        top = select_history(losses, 10, "topk", np.random.default_rng(1))
+        self.assertEqual(len(top), 10)
+        self.assertTrue(set(np.argsort(losses)[:5]) <= set(top))
+        strata = select_history(losses, 10, "stratified", np.random.default_rng(1))
+        self.assertEqual(len(set(strata)), 10)
+        self.assertTrue(best in strata)
+        self.assertEqual(list(strata), sorted(strata))
+        self.assertRaises(LookupError, select_history, losses, 10, "foo")
+
     def test_lossfunccall(self):
         TestLossFuncSolver1().run(print_stats=False)
         TestLossFuncSolver2().run(print_stats=False)
@@ -0,0 +1,84 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import unittest
+import numpy as np
+
+from hyppopy.solvers.LatinHypercubeSolver import *
+from hyppopy.FunctionSimulator import FunctionSimulator
+from hyppopy.HyppopyProject import HyppopyProject
+
+
+class LatinHypercubeTestSuite(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_get_latin_hypercube(self):
+        design = get_latin_hypercube(100, 4, np.random.default_rng(0))
+        self.assertEqual(design.shape, (100, 4))
+        self.assertTrue(np.all(design >= 0) and np.all(design < 1))
+        for d in range(4):
+            strata = np.sort(np.floor(design[:, d] * 100).astype(int))
+            self.assertTrue(np.all(strata == np.arange(100)))
+
+    def test_solver_complete(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "normal",
+                    "data": [300, 700],
+                    "type": float
+                },
+                "axis_01": {
+                    "domain": "loguniform",
+                    "data": [0.01, 0.8],
+                    "type": float
+                },
+                "axis_02": {
+                    "domain": "uniform",
+                    "data": [3.5, 6.5],
+                    "type": float
+                },
+                "axis_03": {
+                    "domain": "categorical",
+                    "data": ["a", "b", "c"],
+                    "type": str
+                }
+            },
+            "max_iterations": 99,
+            "seed": 1
+        }
+
+        project = HyppopyProject(config)
+        solver = LatinHypercubeSolver(project)
+        vfunc = FunctionSimulator()
+        vfunc.load_default()
+        solver.blackbox = lambda axis_00, axis_01, axis_02, axis_03: vfunc(axis_00=axis_00, axis_01=axis_01,
+                                                                           axis_02=axis_02)
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 99)
+        self.assertTrue(300 <= best['axis_00'] <= 700)
+        self.assertTrue(0.01 <= best['axis_01'] <= 0.8)
+        self.assertTrue(3.5 <= best['axis_02'] <= 6.5)
+        for value in ["a", "b", "c"]:
+            self.assertEqual(list(df['axis_03']).count(value), 33)
+
+        for status in df['status']:
+            self.assertTrue(status)
+        for loss in df['losses']:
+            self.assertTrue(isinstance(loss, float))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import time
+import datetime
+import unittest
+import numpy as np
+
+from mpi4py import MPI
+from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.CandidateDescriptor import CandidateDescriptor
+from hyppopy.MPIBlackboxFunction import MPIBlackboxFunction, evaluate_params, split_arrays, join_arrays
+from hyppopy.solvers.TPESolver import TPESolver
+from hyppopy.tests.helpers import FakeCluster
+
+
+def results(eval_times):
+    start = datetime.datetime(2020, 1, 1)
+    return dict((n, {'loss': 0.0, 'book_time': start, 'refresh_time': start + datetime.timedelta(seconds=t)})
+                for n, t in enumerate(eval_times))
+
+
+class MPIBlackboxFunctionTestSuite(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_fixed_chunk_size(self):
+        blackbox = MPIBlackboxFunction(blackbox_func=lambda x: x, mpi_comm=MPI.COMM_SELF, chunk_size=4)
+        self.assertEqual(blackbox.get_chunk_size(100, 3), 4)
+        blackbox.update_timing(10.0, results([0.001]))
+        self.assertEqual(blackbox.get_chunk_size(100, 3), 4)
+        self.assertRaises(AssertionError, MPIBlackboxFunction, blackbox_func=lambda x: x, mpi_comm=MPI.COMM_SELF,
+                          chunk_size=0)
+
+    def test_auto_chunk_size(self):
+        blackbox = MPIBlackboxFunction(blackbox_func=lambda x: x, mpi_comm=MPI.COMM_SELF, chunk_size='auto')
+        self.assertEqual(blackbox.get_chunk_size(100, 3), 1)
+        # 0.01s overhead per message against 0.001s per evaluation needs 100 candidates per message for 10% overhead
+        blackbox.update_timing(0.011, results([0.001]))
+        self.assertEqual(blackbox.get_chunk_size(10000, 3), 100)
+        # but never more than an even share of the queue
+        self.assertEqual(blackbox.get_chunk_size(30, 3), 10)
+        self.assertEqual(blackbox.get_chunk_size(1, 3), 1)
+
+        # expensive evaluations are sent one by one
+        blackbox = MPIBlackboxFunction(blackbox_func=lambda x: x, mpi_comm=MPI.COMM_SELF, chunk_size='auto')
+        blackbox.update_timing(2.001, results([1.0, 1.0]))
+        self.assertEqual(blackbox.get_chunk_size(100, 3), 1)
+
+    def test_split_arrays(self):
+        array = np.arange(6.0).reshape(2, 3)
+        rest, arrays = split_arrays(array)
+        self.assertIsNone(rest)
+        self.assertIs(join_arrays(rest, arrays), array)
+
+        data = {'x': array, 'labels': np.array(['a', 'b'], dtype=object), 'offset': 3.0}
+        rest, arrays = split_arrays(data)
+        self.assertEqual(list(arrays.keys()), ['x'])
+        self.assertEqual(sorted(rest.keys()), ['labels', 'offset'])
+        self.assertEqual(sorted(join_arrays(rest, arrays).keys()), ['labels', 'offset', 'x'])
+
+        rest, arrays = split_arrays([1, 2])
+        self.assertEqual(arrays, {})
+        self.assertEqual(join_arrays(rest, arrays), [1, 2])
+
+    def test_distribute_data(self):
+        def loader(params):
+            return {'x': np.arange(6.0).reshape(2, 3), 'offset': params['offset']}
+
+        for data_mode in ['local', 'bcast', 'shared']:
+            blackbox = MPIBlackboxFunction(blackbox_func=lambda data, params: data['offset'], dataloader_func=loader,
+                                           mpi_comm=MPI.COMM_SELF, data_mode=data_mode, offset=3.0)
+            blackbox.distribute_data()
+            self.assertEqual(blackbox.data_mode, data_mode)
+            self.assertTrue(np.array_equal(blackbox.data['x'], np.arange(6.0).reshape(2, 3)))
+            self.assertEqual(blackbox(x=1.0), 3.0)
+        self.assertRaises(LookupError, MPIBlackboxFunction, blackbox_func=lambda x: x, mpi_comm=MPI.COMM_SELF,
+                          data_mode='nfs')
+
+        # calling distribute_data again replaces the shared windows, free releases them and keeps a private copy
+        blackbox = MPIBlackboxFunction(blackbox_func=lambda data, params: data['offset'], dataloader_func=loader,
+                                       mpi_comm=MPI.COMM_SELF, data_mode='shared', offset=3.0)
+        for n in range(3):
+            blackbox.distribute_data()
+            self.assertEqual(len(blackbox._windows), 1)
+        blackbox.free()
+        self.assertEqual(len(blackbox._windows), 0)
+        self.assertTrue(blackbox.data['x'].flags.owndata)
+        self.assertTrue(np.array_equal(blackbox.data['x'], np.arange(6.0).reshape(2, 3)))
+
+    def test_evaluate_params(self):
+        blackbox = MPIBlackboxFunction(blackbox_func=lambda data, params: data + params['x'], data=1.0,
+                                       mpi_comm=MPI.COMM_SELF, master_evaluates=True)
+        result = evaluate_params(blackbox, {'x': 2.0})
+        self.assertEqual(result['loss'], 3.0)
+        self.assertLessEqual(result['book_time'], result['refresh_time'])
+
+        result = evaluate_params(lambda x: x / 0, {'x': 2.0})
+        self.assertTrue(np.isnan(result['loss']))
+
+    def test_call_batch_ranks(self):
+        def blackbox_func(x, c="a"):
+            return x + (0 if c == "a" else 10)
+
+        # numeric candidates are sent as buffers, categorical ones pickled
+        for params in [{}, {'c': "b"}]:
+            for in_flight in [1, 2]:
+                with FakeCluster(4, blackbox_func) as cluster:
+                    blackbox = MPIBlackboxFunction(blackbox_func=cluster.blackbox_func, mpi_comm=cluster.comm,
+                                                   in_flight=in_flight)
+                    candidates = [CandidateDescriptor(x=float(n), **params) for n in range(20)]
+                    results = blackbox.call_batch(candidates)
+                self.assertEqual(sorted(results.keys()), sorted(candidate.ID for candidate in candidates))
+                for candidate in candidates:
+                    self.assertEqual(results[candidate.ID]['loss'], blackbox_func(**candidate.get_values()))
+                self.assertEqual(sorted(set(cluster.evaluated_by)), ["rank 1", "rank 2", "rank 3"])
+
+    def test_call_batch_auto_in_flight(self):
+        def blackbox_func(x):
+            time.sleep(0.01)
+            return x
+
+        # with queued messages the round trip includes waiting for the previous message, which is no overhead
+        with FakeCluster(3, blackbox_func) as cluster:
+            blackbox = MPIBlackboxFunction(blackbox_func=cluster.blackbox_func, mpi_comm=cluster.comm, in_flight=2,
+                                           chunk_size='auto')
+            for batch in range(2):
+                candidates = [CandidateDescriptor(x=float(n)) for n in range(100)]
+                self.assertEqual(len(blackbox.call_batch(candidates)), 100)
+        self.assertLess(blackbox._message_overhead, blackbox._eval_time)
+        self.assertLessEqual(blackbox.get_chunk_size(1000, 2), 10)
+        for rank in ["rank 1", "rank 2"]:
+            self.assertGreater(cluster.evaluated_by.count(rank), 80)
+
+    def test_call_batch_master_evaluates(self):
+        def blackbox_func(x):
+            time.sleep(0.002)
+            return 2 * x
+
+        with FakeCluster(3, blackbox_func) as cluster:
+            blackbox = MPIBlackboxFunction(blackbox_func=cluster.blackbox_func, mpi_comm=cluster.comm,
+                                           master_evaluates=True)
+            candidates = [CandidateDescriptor(x=float(n)) for n in range(60)]
+            results = blackbox.call_batch(candidates)
+        self.assertEqual(len(results), 60)
+        for candidate in candidates:
+            self.assertEqual(results[candidate.ID]['loss'], 2 * candidate['x'])
+        self.assertEqual(sorted(set(cluster.evaluated_by)), ["MainThread", "rank 1", "rank 2"])
+        self.assertEqual(len(cluster.evaluated_by), 60)
+
+    def test_submit_wait_any(self):
+        with FakeCluster(3, lambda x: 2 * x) as cluster:
+            blackbox = MPIBlackboxFunction(blackbox_func=cluster.blackbox_func, mpi_comm=cluster.comm, in_flight=2,
+                                           master_evaluates=True)
+            self.assertEqual(blackbox.wait_any(), {})
+            self.assertEqual(blackbox.free_slots(), 5)
+            candidates = [CandidateDescriptor(x=float(n)) for n in range(5)]
+            for n, candidate in enumerate(candidates):
+                blackbox.submit(candidate)
+                self.assertEqual(blackbox.free_slots(), 4 - n)
+            self.assertRaises(AssertionError, blackbox.submit, CandidateDescriptor(x=5.0))
+
+            results = {}
+            while len(results) < 5:
+                received = blackbox.wait_any()
+                self.assertGreater(len(received), 0)
+                results.update(received)
+                self.assertEqual(blackbox.free_slots(), len(results))
+            self.assertEqual(blackbox.wait_any(), {})
+        for candidate in candidates:
+            self.assertEqual(results[candidate.ID]['loss'], 2 * candidate['x'])
+        # least loaded first, the master only takes the candidate left over when all workers are full
+        self.assertEqual(sorted(cluster.evaluated_by), ["MainThread", "rank 1", "rank 1", "rank 2", "rank 2"])
+
+    def test_solver_async_ranks(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                }
+            },
+            "max_iterations": 50,
+            "asynchronous": True,
+            "seed": 3
+            }
+
+        with FakeCluster(4, lambda x: (x - 1) ** 2) as cluster:
+            solver = TPESolver(HyppopyProject(config))
+            solver.blackbox = MPIBlackboxFunction(blackbox_func=cluster.blackbox_func, mpi_comm=cluster.comm)
+            solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 50)
+        self.assertEqual(len(cluster.evaluated_by), 50)
+        self.assertEqual(sorted(set(cluster.evaluated_by)), ["rank 1", "rank 2", "rank 3"])
+        self.assertTrue(-1 <= best['x'] <= 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import unittest
+import numpy as np
+
+from mpi4py import MPI
+from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.MPIBlackboxFunction import MPIBlackboxFunction
+from hyppopy.solvers.MPISolverWrapper import MPISolverWrapper, create_solver_groups
+from hyppopy.solvers.RandomsearchSolver import RandomsearchSolver
+
+
+class MPISolverWrapperTestSuite(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_create_solver_groups(self):
+        group, comm = create_solver_groups(1, MPI.COMM_SELF)
+        self.assertEqual(group, 0)
+        self.assertEqual(comm.Get_size(), 1)
+        self.assertEqual(comm.Get_rank(), 0)
+        self.assertRaises(AssertionError, create_solver_groups, 2, MPI.COMM_SELF)
+        self.assertRaises(AssertionError, create_solver_groups, 0, MPI.COMM_SELF)
+
+    def test_blackbox_communicator(self):
+        group, comm = create_solver_groups(1, MPI.COMM_SELF)
+        wrapper = MPISolverWrapper(solver=RandomsearchSolver(), mpi_comm=comm)
+        blackbox = MPIBlackboxFunction(blackbox_func=lambda x: x, mpi_comm=comm)
+        wrapper.blackbox = blackbox
+        self.assertIs(wrapper.blackbox, blackbox)
+        with self.assertRaises(AssertionError):
+            wrapper.blackbox = MPIBlackboxFunction(blackbox_func=lambda x: x, mpi_comm=MPI.COMM_SELF)
+
+    def test_run_frees_data(self):
+        config = {"hyperparameter": {"x": {"domain": "uniform", "data": [-10.0, 10.0], "type": float}},
+                  "max_iterations": 10}
+        wrapper = MPISolverWrapper(solver=RandomsearchSolver(HyppopyProject(config)), mpi_comm=MPI.COMM_SELF)
+        wrapper.blackbox = MPIBlackboxFunction(blackbox_func=lambda data, params: params['x'] ** 2,
+                                               data={'x': np.arange(6.0)}, mpi_comm=MPI.COMM_SELF, data_mode='shared')
+        for n in range(2):
+            wrapper.run(print_stats=False)
+            self.assertEqual(len(wrapper.blackbox._windows), 0)
+        df, best = wrapper.get_results()
+        self.assertEqual(len(df), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import pickle
+import datetime
+import unittest
+import numpy as np
+
+from hyppopy.CandidateDescriptor import CandidateDescriptor
+from hyppopy.MPIWireFormat import CandidateSchema, pack_results, unpack_results
+
+
+class MPIWireFormatTestSuite(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_candidate_schema(self):
+        candidates = [CandidateDescriptor(x=0.5 * n, n=n, flag=n % 2 == 0, y=np.float32(1.5)) for n in range(5)]
+        schema = CandidateSchema.from_candidates(candidates)
+        self.assertEqual(schema.keys, ("flag", "n", "x", "y"))
+        self.assertEqual(schema.types, ("bool", "int", "float", "float"))
+        self.assertEqual(pickle.loads(pickle.dumps(schema)), schema)
+
+        buffer = schema.pack(candidates)
+        self.assertEqual(buffer.dtype, np.float64)
+        self.assertEqual(buffer.shape, (5, 5))
+        self.assertTrue(buffer.flags['C_CONTIGUOUS'])
+        unpacked = schema.unpack(buffer.ravel())
+        self.assertEqual([cand_id for cand_id, _ in unpacked], [c.ID for c in candidates])
+        for (_, params), candidate in zip(unpacked, candidates):
+            self.assertEqual(params, candidate.get_values())
+            self.assertTrue(isinstance(params["n"], int))
+            self.assertTrue(isinstance(params["flag"], bool))
+
+        mixed = CandidateSchema.from_candidates([CandidateDescriptor(x=1), CandidateDescriptor(x=1.5)])
+        self.assertEqual(mixed.types, ("float",))
+
+    def test_candidate_schema_fallback(self):
+        self.assertTrue(CandidateSchema.from_candidates([]) is None)
+        self.assertTrue(CandidateSchema.from_candidates([CandidateDescriptor(x=0.5, c="a")]) is None)
+        self.assertTrue(CandidateSchema.from_candidates([CandidateDescriptor(x=None)]) is None)
+        self.assertTrue(CandidateSchema.from_candidates([CandidateDescriptor(x=2 ** 60)]) is None)
+        self.assertTrue(CandidateSchema.from_candidates([CandidateDescriptor(x=1), CandidateDescriptor(y=1)]) is None)
+        self.assertTrue(CandidateSchema.from_candidates([CandidateDescriptor(x=1), CandidateDescriptor(x=True)]) is None)
+
+    def test_results(self):
+        now = datetime.datetime.now()
+        results = [(n, {'book_time': now, 'loss': float(n) / 3, 'refresh_time': now}) for n in range(4)]
+        results.append((7, {'book_time': now, 'loss': np.nan, 'refresh_time': now}))
+        buffer = pack_results(results)
+        self.assertEqual(buffer.shape, (5, 4))
+        unpacked = unpack_results(buffer.ravel())
+        self.assertEqual(sorted(unpacked.keys()), [0, 1, 2, 3, 7])
+        self.assertEqual(unpacked[2]['loss'], 2.0 / 3)
+        self.assertTrue(np.isnan(unpacked[7]['loss']))
+        self.assertEqual(unpacked[1]['book_time'], now)
+
+        self.assertTrue(pack_results([(0, {'book_time': now, 'loss': [1, 2], 'refresh_time': now})]) is None)
+        self.assertTrue(pack_results([(0, {'book_time': now, 'loss': None, 'refresh_time': now})]) is None)
+        self.assertTrue(pack_results([(0, {'book_time': now, 'loss': 1.0, 'refresh_time': now,
+                                           'status': 'pruned'})]) is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,11 +10,17 @@
 #
 # See LICENSE
 
+import os
+import time
+import shutil
 import unittest
+import tempfile
 
 from hyppopy.solvers.OptunaSolver import *
+from hyppopy.BlackboxFunction import BlackboxFunction
 from hyppopy.FunctionSimulator import FunctionSimulator
 from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.tests.helpers import BatchBlackboxFunction, AsyncBlackboxFunction
 
 
 class OptunaSolverTestSuite(unittest.TestCase):
@@ -60,6 +66,192 @@ class OptunaSolverTestSuite(unittest.TestCase):
         for loss in df['losses']:
             self.assertTrue(isinstance(loss, float))
 
+    def test_history_study(self):
+        study = optuna.create_study(sampler=optuna.samplers.RandomSampler(seed=0))
+        study.optimize(lambda trial: trial.suggest_float("x", -1, 1) ** 2, n_trials=30)
+        running = study.ask()
+        for strategy in ["recent", "topk", "stratified"]:
+            sampler = HistorySampler(optuna.samplers.RandomSampler(), 10, strategy, 0)
+            proxy = sampler._proxy(study, running)
+            trials = proxy._get_trials(deepcopy=False, states=(TrialState.COMPLETE,))
+            self.assertEqual(len(trials), 10)
+            self.assertEqual(len(proxy.get_trials(deepcopy=False)), 11)
+            self.assertEqual(proxy.directions, study.directions)
+            if strategy != "recent":
+                self.assertTrue(study.best_trial.number in [trial.number for trial in trials])
+            self.assertEqual([t.number for t in trials],
+                             [t.number for t in HistorySampler(optuna.samplers.RandomSampler(), 10, strategy, 0)._proxy(
+                                 study, running).get_trials(deepcopy=False, states=(TrialState.COMPLETE,))])
+            # the selection of a trial is cached, the trials are not copied unless asked for
+            self.assertIs(sampler.select(study, running), sampler.select(study, running))
+            self.assertIsNot(proxy.get_trials()[0], proxy.get_trials(deepcopy=False)[0])
+
+        # trials finished later are added incrementally
+        sampler = HistorySampler(optuna.samplers.RandomSampler(), 50, "recent", 0)
+        self.assertEqual(len(sampler.select(study, running)), 31)
+        study.tell(running, 0.5)
+        trial = study.ask()
+        selection = sampler.select(study, trial)
+        self.assertEqual([t.number for t in selection], list(range(32)))
+        self.assertEqual(selection[30].state, TrialState.COMPLETE)
+
+    def test_history_sample_time(self):
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+        def sample_time(n):
+            rng = np.random.default_rng(0)
+            distributions = {"x": optuna.distributions.FloatDistribution(-5, 5)}
+            study = optuna.create_study(sampler=HistorySampler(optuna.samplers.TPESampler(seed=0), 30, "recent", 0))
+            study.add_trials([optuna.trial.create_trial(params={"x": x}, distributions=distributions, value=x ** 2)
+                              for x in rng.uniform(-5, 5, n)])
+            times = []
+            for _ in range(21):
+                start = time.perf_counter()
+                trial = study.ask()
+                x = trial.suggest_float("x", -5, 5)
+                times.append(time.perf_counter() - start)
+                study.tell(trial, x ** 2)
+            # the first call collects the trials so far
+            return np.median(times[1:])
+
+        # the history passed to the sampler is bounded and not copied, so its cost does not grow with the trials
+        self.assertLess(sample_time(10000), 2 * sample_time(300))
+
+    def test_solver_history(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "uniform",
+                    "data": [300, 800],
+                    "type": float
+                },
+                "axis_01": {
+                    "domain": "uniform",
+                    "data": [-1, 1],
+                    "type": float
+                },
+                "axis_02": {
+                    "domain": "uniform",
+                    "data": [0, 10],
+                    "type": float
+                }
+            },
+            "max_iterations": 100,
+            "history_size": 30,
+            "history_strategy": "topk",
+            "seed": 0
+        }
+
+        project = HyppopyProject(config)
+        solver = OptunaSolver(project)
+        self.assertTrue(isinstance(solver.get_sampler(), optuna.samplers.BaseSampler))
+        vfunc = FunctionSimulator()
+        vfunc.load_default()
+        solver.blackbox = vfunc
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 100)
+        self.assertTrue(300 <= best['axis_00'] <= 800)
+        self.assertTrue(0 <= best['axis_02'] <= 10)
+
+    def test_solver_batched(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                },
+                "n": {
+                    "domain": "uniform",
+                    "data": [0, 100],
+                    "type": int
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                }
+            },
+            "max_iterations": 60,
+            "batch_size": 8,
+            "seed": 0
+        }
+
+        def blackbox_func(x, n, c):
+            self.assertTrue(isinstance(n, int))
+            if n == 13:
+                return None
+            return (x - 1) ** 2 + abs(n - 40) / 10 + (0 if c == "a" else 1)
+
+        solver = OptunaSolver(HyppopyProject(config))
+        blackbox = BatchBlackboxFunction(blackbox_func=blackbox_func)
+        solver.blackbox = blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(blackbox.batches, [8] * 7 + [4])
+        self.assertEqual(len(df), 60)
+        self.assertEqual(len(solver.study.trials), 60)
+        self.assertTrue(-5 <= best['x'] <= 5)
+        self.assertTrue(isinstance(best['n'], int))
+
+    def test_solver_async(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                }
+            },
+            "max_iterations": 60,
+            "asynchronous": True,
+            "seed": 0
+        }
+
+        solver = OptunaSolver(HyppopyProject(config))
+        blackbox = AsyncBlackboxFunction(4, blackbox_func=lambda x, c: (x - 1) ** 2 + (0 if c == "a" else 1))
+        solver.blackbox = blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(blackbox.max_pending, 4)
+        self.assertEqual(len(df), 60)
+        self.assertEqual(len(solver.study.trials), 60)
+        self.assertTrue(all(trial.state == TrialState.COMPLETE for trial in solver.study.trials))
+        self.assertTrue(-5 <= best['x'] <= 5)
+
+    def test_solver_storage(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                }
+            },
+            "max_iterations": 15,
+            "batch_size": 5,
+            "study_name": "shared"
+        }
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            for storage in [os.path.join(tmp_dir, "study.log"), "sqlite:///" + os.path.join(tmp_dir, "study.db")]:
+                config["storage"] = storage
+                for n in range(2):
+                    solver = OptunaSolver(HyppopyProject(config))
+                    solver.blackbox = BlackboxFunction(blackbox_func=lambda x: x ** 2)
+                    solver.run(print_stats=False)
+                    self.assertEqual(len(solver.study.trials), 15 * (n + 1))
+                    df, best = solver.get_results()
+                    self.assertEqual(len(df), 15)
+        finally:
+            shutil.rmtree(tmp_dir)
+
 
 if __name__ == '__main__':
     unittest.main()
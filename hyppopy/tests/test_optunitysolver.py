@@ -15,6 +15,11 @@ import unittest
 from hyppopy.solvers.OptunitySolver import *
 from hyppopy.FunctionSimulator import FunctionSimulator
 from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.tests.helpers import BatchBlackboxFunction
+
+
+def objective(x, y, mode):
+    return x ** 2 + (y - 1) ** 2 + (0 if mode == "a" else 1)
 
 
 class OptunitySolverTestSuite(unittest.TestCase):
@@ -60,6 +65,94 @@ class OptunitySolverTestSuite(unittest.TestCase):
         for loss in df['losses']:
             self.assertTrue(isinstance(loss, float))
 
+    def test_convert_searchspace(self):
+        hyperparameter = {"x": {"domain": "uniform", "data": [0, 1], "type": float},
+                          "y": {"domain": "uniform", "data": [-1, 1, 10], "type": float}}
+        for n in range(3):
+            hyperparameter["c{}".format(n)] = {"domain": "categorical", "data": list(range(10 * n, 10 * n + 10)),
+                                               "type": int}
+        solver = OptunitySolver()
+        searchspace = solver.convert_searchspace(hyperparameter)
+        self.assertEqual(searchspace, {"x": [0, 1], "y": [-1, 1], "c0": [0.0, 10.0], "c1": [0.0, 10.0],
+                                       "c2": [0.0, 10.0]})
+        params = solver.decode({"x": 0.5, "y": 0.1, "c0": 0.2, "c1": 5.5, "c2": 10.0})
+        self.assertEqual(params, {"x": 0.5, "y": 0.1, "c0": 0, "c1": 15, "c2": 29})
+
+    def test_solver_batched(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-2, 2],
+                    "type": float
+                },
+                "y": {
+                    "domain": "uniform",
+                    "data": [-2, 2],
+                    "type": float
+                },
+                "mode": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                }
+            },
+            "max_iterations": 100,
+            "population_size": 10,
+            "seed": 42
+        }
+
+        project = HyppopyProject(config)
+        solver = OptunitySolver(project)
+        blackbox = BatchBlackboxFunction(blackbox_func=objective)
+        solver.blackbox = blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertTrue(len(blackbox.batches) >= 5)
+        self.assertTrue(all(0 < size <= 10 for size in blackbox.batches))
+        self.assertEqual(sum(blackbox.batches), len(df))
+        self.assertTrue(len(df) <= 100)
+        self.assertTrue(-2 <= best['x'] <= 2)
+        self.assertTrue(best['mode'] in ["a", "b"])
+        self.assertAlmostEqual(df['losses'].min(), objective(**best))
+
+        solver = OptunitySolver(project)
+        solver.blackbox = BatchBlackboxFunction(blackbox_func=objective)
+        solver.run(print_stats=False)
+        self.assertEqual(solver.best, best)
+
+    def test_solver_name(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-2, 2],
+                    "type": float
+                },
+                "y": {
+                    "domain": "uniform",
+                    "data": [-2, 2],
+                    "type": float
+                },
+                "mode": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                }
+            },
+            "max_iterations": 50,
+            "solver_name": "random search"
+        }
+
+        project = HyppopyProject(config)
+        solver = OptunitySolver(project)
+        blackbox = BatchBlackboxFunction(blackbox_func=objective)
+        solver.blackbox = blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(blackbox.batches, [50])
+        self.assertEqual(len(df), 50)
+
 
 if __name__ == '__main__':
     unittest.main()
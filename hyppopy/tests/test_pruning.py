@@ -0,0 +1,164 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import unittest
+import numpy as np
+import optuna
+
+from hyppopy.Pruning import *
+from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.BlackboxFunction import BlackboxFunction
+from hyppopy.solvers.RandomsearchSolver import RandomsearchSolver
+from hyppopy.solvers.HyperoptSolver import HyperoptSolver
+from hyppopy.solvers.OptunaSolver import OptunaSolver
+
+
+def iterative_blackbox(x, reporter):
+    """
+    Simulated training, the loss curve converges to (x - 1)^2 within 20 epochs.
+    """
+    loss = None
+    for epoch in range(20):
+        loss = (x - 1) ** 2 + 10.0 / (epoch + 1)
+        reporter.report(loss, epoch)
+    return loss
+
+
+class PruningTestSuite(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-10, 10],
+                    "type": float
+                }
+            },
+            "max_iterations": 40,
+            "seed": 0
+        }
+
+    def test_reporter(self):
+        reporter = Reporter()
+        self.assertTrue(np.isnan(reporter.last_value))
+        reporter.report(3.0)
+        reporter.report(2.0)
+        reporter.report(5.0, step=7)
+        self.assertEqual(reporter.values, {0: 3.0, 1: 2.0, 7: 5.0})
+        self.assertEqual(reporter.last_step, 7)
+        self.assertEqual(reporter.last_value, 5.0)
+        self.assertFalse(reporter.should_prune())
+
+    def test_pruners(self):
+        pruner = MedianPruner(n_startup_trials=3)
+        for offset in [1.0, 2.0, 3.0]:
+            reporter = Reporter(pruner)
+            for step in range(3):
+                reporter.report(offset + step)
+            pruner.complete(reporter)
+        reporter = Reporter(pruner)
+        self.assertRaises(TrialPruned, reporter.report, 2.5)
+        reporter = Reporter(pruner)
+        reporter.report(1.5)
+        reporter.report(3.5)
+
+        pruner = PercentilePruner(percentile=10.0, n_startup_trials=3, n_warmup_steps=1)
+        for offset in [1.0, 2.0, 3.0]:
+            reporter = Reporter(pruner)
+            reporter.report(offset)
+            reporter.report(offset)
+            pruner.complete(reporter)
+        reporter = Reporter(pruner)
+        reporter.report(2.0)
+        self.assertRaises(TrialPruned, reporter.report, 2.0)
+
+        reporter = Reporter(ThresholdPruner(upper=5.0))
+        reporter.report(4.0)
+        self.assertRaises(TrialPruned, reporter.report, 6.0)
+        reporter = Reporter(ThresholdPruner())
+        self.assertRaises(TrialPruned, reporter.report, np.nan)
+
+        self.assertTrue(isinstance(get_pruner("median"), MedianPruner))
+        self.assertTrue(get_pruner(None) is None)
+        self.assertRaises(LookupError, get_pruner, "foo")
+        self.assertTrue(accepts_reporter(iterative_blackbox))
+        self.assertFalse(accepts_reporter(lambda x: x))
+        self.assertTrue(accepts_keywords(iterative_blackbox, ['x', 'reporter']))
+        self.assertTrue(accepts_keywords(lambda **kwargs: 0, ['x']))
+        self.assertFalse(accepts_keywords(lambda params: 0, ['x']))
+
+    def test_solver_pruning(self):
+        for blackbox in [iterative_blackbox, BlackboxFunction(blackbox_func=iterative_blackbox)]:
+            self.config["pruner"] = "median"
+            solver = RandomsearchSolver(HyppopyProject(self.config))
+            solver.blackbox = blackbox
+            solver.run(print_stats=False)
+            df, best = solver.get_results()
+            self.assertEqual(len(df), 40)
+            self.assertTrue(set(df['state']) == {'ok', 'pruned'})
+            self.assertEqual(list(df['status']), list(df['state'] == 'ok'))
+            self.assertTrue(-3 <= best['x'] <= 5)
+
+        self.config["pruner"] = ThresholdPruner(upper=50.0)
+        solver = HyperoptSolver(HyppopyProject(self.config))
+        solver.blackbox = iterative_blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 40)
+        self.assertTrue('pruned' in set(df['state']))
+
+    def test_blackbox_errors(self):
+        calls = []
+
+        def failing_blackbox(x, reporter=None):
+            calls.append(x)
+            if len(calls) % 2 == 1:
+                raise RuntimeError("training diverged")
+            return iterative_blackbox(x, reporter)
+
+        # a failing reporter aware blackbox is not evaluated again without the reporter
+        self.config["pruner"] = "median"
+        self.config["max_iterations"] = 5
+        solver = RandomsearchSolver(HyppopyProject(self.config))
+        solver.blackbox = failing_blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(int(np.sum(np.isnan(df['losses']))), 3)
+
+        # blackboxes taking the parameter dict get the reporter as keyword
+        def dict_blackbox(params, reporter):
+            return iterative_blackbox(params['x'], reporter)
+
+        solver = RandomsearchSolver(HyppopyProject(self.config))
+        solver.blackbox = dict_blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertFalse(any(np.isnan(df['losses'])))
+
+    def test_optuna_pruning(self):
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        self.config["pruner"] = optuna.pruners.MedianPruner(n_startup_trials=5)
+        self.config["batch_size"] = 4
+        solver = OptunaSolver(HyppopyProject(self.config))
+        solver.blackbox = iterative_blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 40)
+        states = [trial.state for trial in solver.study.trials]
+        self.assertTrue(optuna.trial.TrialState.PRUNED in states)
+        self.assertEqual(states.count(optuna.trial.TrialState.PRUNED), list(df['state']).count('pruned'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,10 +11,12 @@
 # See LICENSE
 
 import unittest
+import numpy as np
 
 from hyppopy.solvers.QuasiRandomsearchSolver import *
 from hyppopy.FunctionSimulator import FunctionSimulator
 from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.tests.helpers import BatchBlackboxFunction
 
 
 class QuasiRandomsearchTestSuite(unittest.TestCase):
@@ -22,6 +24,63 @@ class QuasiRandomsearchTestSuite(unittest.TestCase):
     def setUp(self):
         pass
 
+    def test_get_primes(self):
+        self.assertEqual(list(get_primes(10)), [2, 3, 5, 7, 11, 13, 17, 19, 23, 29])
+        self.assertEqual(get_primes(1000)[-1], 7919)
+
+    def test_halton_sequence(self):
+        def vdc(n, base):
+            value, denom = 0, 1
+            while n:
+                denom *= base
+                n, remainder = divmod(n, base)
+                value += remainder / float(denom)
+            return value
+
+        generator = HaltonSequenceGenerator()
+        points = generator.get_points(1000, 6000, 3)
+        self.assertEqual(points.shape, (5000, 3))
+        for d, base in enumerate(generator.get_bases(3)):
+            expected = np.array([vdc(i, base) for i in range(1000, 6000)])
+            self.assertTrue(np.allclose(points[:, d], expected, rtol=0, atol=1e-12))
+        self.assertTrue(np.allclose(generator.get_points_at(np.arange(1000, 6000, 7), 3), points[::7], rtol=0, atol=1e-12))
+        self.assertTrue(np.allclose(generator.get_unit_space(100, 3), generator.get_points(0, 100, 3).T))
+
+    def test_scrambled_halton_sequence(self):
+        points = HaltonSequenceGenerator(True, np.random.default_rng(3)).get_points(0, 625, 4)
+        self.assertTrue(np.all(points >= 0) and np.all(points < 1))
+        # the scrambled base 5 axis still hits each of the 625 strata exactly once
+        self.assertEqual(len(np.unique(np.floor(points[:, 0] * 625))), 625)
+        shard = HaltonSequenceGenerator(True, np.random.default_rng(3)).get_points_at(np.arange(1, 625, 4), 4)
+        self.assertTrue(np.allclose(shard, points[1::4], rtol=0, atol=1e-12))
+        other = HaltonSequenceGenerator(True, np.random.default_rng(4)).get_points(0, 625, 4)
+        self.assertFalse(np.allclose(other, points))
+
+    def test_sample_generator(self):
+        sampler = QuasiRandomSampleGenerator(1000, np.random.default_rng(0))
+        sampler.set_axis("a", [0, 9], "uniform", int)
+        sampler.set_axis("b", [1, 1000], "loguniform", float)
+        sampler.set_axis("c", [0, 6], "normal", float)
+        sampler.set_axis("d", ["x", "y"], "categorical", str)
+        samples = []
+        while True:
+            sample = sampler.next()
+            if sample is None:
+                break
+            samples.append(sample)
+        self.assertEqual(len(samples), 1000)
+        for i in range(10):
+            self.assertTrue(97 <= [s["a"] for s in samples].count(i) <= 103)
+        self.assertTrue(490 <= [s["d"] for s in samples].count("x") <= 510)
+        b = np.array([s["b"] for s in samples])
+        self.assertTrue(np.all((1 <= b) & (b <= 1000)))
+        self.assertTrue(300 < np.sum(b < 10) < 366)
+        c = np.array([s["c"] for s in samples])
+        self.assertTrue(np.all((0 <= c) & (c <= 6)))
+        self.assertTrue(np.sum(np.abs(c - 3) < 1) > 600)
+        self.assertEqual(sorted([s["b"] for s in samples]), sorted(sampler.get_samples(0, 1000)[:, 1].tolist()))
+        self.assertEqual(sampler.to_params(sampler.get_samples_at([5])), sampler.to_params(sampler.get_samples(5, 6)))
+
     def test_solver_uniform(self):
         config = {
             "hyperparameter": {
@@ -60,6 +119,116 @@ class QuasiRandomsearchTestSuite(unittest.TestCase):
         for loss in df['losses']:
             self.assertTrue(isinstance(loss, float))
 
+    def test_solver_complete(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "normal",
+                    "data": [300, 700],
+                    "type": float
+                },
+                "axis_01": {
+                    "domain": "loguniform",
+                    "data": [0.01, 0.8],
+                    "type": float
+                },
+                "axis_02": {
+                    "domain": "uniform",
+                    "data": [3.5, 6.5],
+                    "type": float
+                }
+            },
+            "max_iterations": 300,
+            "scramble": True
+        }
+
+        solver = QuasiRandomsearchSolver(config)
+        vfunc = FunctionSimulator()
+        vfunc.load_default()
+        solver.blackbox = vfunc
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 300)
+        self.assertTrue(300 <= best['axis_00'] <= 700)
+        self.assertTrue(0.01 <= best['axis_01'] <= 0.8)
+        self.assertTrue(3.5 <= best['axis_02'] <= 6.5)
+
+    def test_solver_batches_and_shards(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-10, 10],
+                    "type": float
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b", "c"],
+                    "type": str
+                }
+            },
+            "max_iterations": 100,
+            "batch_size": 30
+        }
+
+        solver = QuasiRandomsearchSolver(config)
+        solver.blackbox = BatchBlackboxFunction(blackbox_func=lambda x, c: x ** 2)
+        solver.run(print_stats=False)
+        self.assertEqual(solver.blackbox.batches, [30, 30, 30, 10])
+        df, best = solver.get_results()
+        design = sorted(zip(df['x'], df['c']))
+
+        sharded = []
+        for shard in range(3):
+            config["shard_index"] = shard
+            config["num_shards"] = 3
+            solver = QuasiRandomsearchSolver(config)
+            solver.blackbox = lambda x, c: x ** 2
+            solver.run(print_stats=False)
+            df, _ = solver.get_results()
+            self.assertEqual(len(df), len(range(shard, 100, 3)))
+            sharded += list(zip(df['x'], df['c']))
+        self.assertEqual(sorted(sharded), design)
+
+    def test_scrambled_shards(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-10, 10],
+                    "type": float
+                },
+                "y": {
+                    "domain": "loguniform",
+                    "data": [0.01, 1],
+                    "type": float
+                }
+            },
+            "max_iterations": 100,
+            "scramble": True,
+            "seed": 7
+        }
+
+        solver = QuasiRandomsearchSolver(config)
+        solver.blackbox = lambda x, y: x ** 2 + y
+        solver.run(print_stats=False)
+        df, _ = solver.get_results()
+        design = sorted(zip(df['x'], df['y']))
+
+        sharded = []
+        for shard in range(4):
+            solver = QuasiRandomsearchSolver(dict(config, shard_index=shard, num_shards=4))
+            solver.blackbox = lambda x, y: x ** 2 + y
+            solver.run(print_stats=False)
+            df, _ = solver.get_results()
+            sharded += list(zip(df['x'], df['y']))
+        self.assertEqual(sorted(sharded), design)
+
+        del config["seed"]
+        solver = QuasiRandomsearchSolver(dict(config, shard_index=0, num_shards=4))
+        solver.blackbox = lambda x, y: x ** 2 + y
+        self.assertRaises(AssertionError, solver.run, print_stats=False)
+
 
 if __name__ == '__main__':
     unittest.main()
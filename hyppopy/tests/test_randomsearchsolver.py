@@ -85,6 +85,35 @@ class RandomsearchTestSuite(unittest.TestCase):
         for i in range(3):
             self.assertTrue(0.45 < hist[0][i] < 0.55)
 
+    def test_draw_samples(self):
+        params = [{"domain": "uniform", "data": [0, 10], "type": int},
+                  {"domain": "normal", "data": [-1, 1], "type": float},
+                  {"domain": "loguniform", "data": [1e-3, 1e3], "type": float},
+                  {"domain": "categorical", "data": ["a", "b", "c"], "type": str}]
+        for param in params:
+            values = draw_samples(param, 10000)
+            self.assertEqual(len(values), 10000)
+            for value in values:
+                self.assertTrue(isinstance(value, param["type"]))
+                if param["domain"] == "categorical":
+                    self.assertTrue(value in param["data"])
+                else:
+                    self.assertTrue(param["data"][0] <= value <= param["data"][1])
+
+    def test_transform_unit_samples(self):
+        u = (np.arange(1000) + 0.5) / 1000
+        values = transform_unit_samples({"domain": "uniform", "data": [0, 9], "type": int}, u)
+        self.assertEqual([values.count(i) for i in range(10)], [100] * 10)
+        values = transform_unit_samples({"domain": "categorical", "data": ["a", "b"], "type": str}, u)
+        self.assertEqual(values.count("a"), 500)
+        values = np.array(transform_unit_samples({"domain": "loguniform", "data": [1, 100], "type": float}, u))
+        self.assertTrue(np.all(np.diff(values) > 0))
+        self.assertAlmostEqual(np.median(values), 10, places=1)
+        values = np.array(transform_unit_samples({"domain": "normal", "data": [0, 6], "type": float}, u))
+        self.assertTrue(0 <= values.min() and values.max() <= 6)
+        self.assertAlmostEqual(np.median(values), 3)
+        self.assertTrue(1 < np.percentile(values, 16) < 2.2)
+
     def test_solver_uniform(self):
         config = {
             "hyperparameter": {
@@ -160,6 +189,37 @@ class RandomsearchTestSuite(unittest.TestCase):
         for loss in df['losses']:
             self.assertTrue(isinstance(loss, float))
 
+    def test_solver_seed(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "loguniform",
+                    "data": [1, 1000],
+                    "type": float
+                },
+                "axis_01": {
+                    "domain": "categorical",
+                    "data": ["a", "b", "c"],
+                    "type": str
+                }
+            },
+            "max_iterations": 50,
+            "seed": 42
+        }
+
+        results = []
+        for n in range(2):
+            solver = RandomsearchSolver(config)
+            solver.blackbox = lambda axis_00, axis_01: axis_00
+            solver.run(print_stats=False)
+            results.append(solver.get_results()[0])
+        self.assertEqual(list(results[0]['axis_00']), list(results[1]['axis_00']))
+        self.assertEqual(list(results[0]['axis_01']), list(results[1]['axis_01']))
+
+        del config["seed"]
+        solver = RandomsearchSolver(config)
+        self.assertIsNone(solver.seed)
+
 
 if __name__ == '__main__':
     unittest.main()
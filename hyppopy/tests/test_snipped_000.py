@@ -0,0 +1,49 @@
+# DKFZ
+#
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import os
+import unittest
+
+class ReadmeSnipped_000TestSuite(unittest.TestCase):
+
+	def test_scripts(self):
+
+		# Import the HyppopyProject class
+		from hyppopy.HyppopyProject import HyppopyProject
+		
+		# Create a nested dict with a section hyperparameter. We define a 2 dimensional
+		# hyperparameter space with a numerical dimension named myNumber of type float and
+		# a uniform sampling. The second dimension is a categorical parameter of type string.
+		config = {
+		"hyperparameter": {
+		    "myNumber": {
+		        "domain": "uniform",
+		        "data": [0, 100],
+		        "type": float
+		    },
+		    "myOption": {
+		        "domain": "categorical",
+		        "data": ["a", "b", "c"],
+		        "type": str
+		    }
+		}}
+		
+		# Create a HyppopyProject instance and pass the config dict to
+		# the constructor. Alternatively one can use set_config method.
+		project = HyppopyProject(config=config)
+		
+		
+		# We can also add hyperparameter using the add_hyperparameter method
+		project = HyppopyProject()
+		project.add_hyperparameter(name="myNumber", domain="uniform", data=[0, 100], dtype=float)
+		project.add_hyperparameter(name="myOption", domain="categorical", data=["a", "b", "c"], dtype=str)
@@ -0,0 +1,52 @@
+# DKFZ
+#
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import os
+import unittest
+
+class ReadmeSnipped_001TestSuite(unittest.TestCase):
+
+	def test_scripts(self):
+
+		from hyppopy.HyppopyProject import HyppopyProject
+		
+		config = {
+		"hyperparameter": {
+		    "myNumber": {
+		        "domain": "uniform",
+		        "data": [0, 100],
+		        "type": float
+		    },
+		    "myOption": {
+		        "domain": "categorical",
+		        "data": ["a", "b", "c"],
+		        "type": str
+		    }
+		},
+		"max_iterations": 500,
+		"anything_you_want": 42
+		}
+		project = HyppopyProject(config=config)
+		print("max_iterations:", project.max_iterations)
+		print("anything_you_want:", project.anything_you_want)
+		
+		#alternatively
+		project = HyppopyProject()
+		project.set_settings(max_iterations=500, anything_you_want=42)
+		print("anything_you_want:", project.anything_you_want)
+		
+		#alternatively
+		project = HyppopyProject()
+		project.add_setting(name="max_iterations", value=500)
+		project.add_setting(name="anything_you_want", value=42)
+		print("anything_you_want:", project.anything_you_want)
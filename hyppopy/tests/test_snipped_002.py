@@ -0,0 +1,49 @@
+# DKFZ
+#
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import os
+import unittest
+
+class ReadmeSnipped_002TestSuite(unittest.TestCase):
+
+	def test_scripts(self):
+
+		# Import the HyppopyProject class
+		from hyppopy.HyppopyProject import HyppopyProject
+		
+		# Import the HyperoptSolver class, in this case wh use Hyperopt
+		from hyppopy.solvers.HyperoptSolver import HyperoptSolver
+		
+		# Our function to optimize
+		def my_loss_func(x, y):
+		    return x**2+y**2
+		
+		# Creating a HyppopyProject instance
+		project = HyppopyProject()
+		project.add_hyperparameter(name="x", domain="uniform", data=[-10, 10], type=float)
+		project.add_hyperparameter(name="y", domain="uniform", data=[-10, 10], type=float)
+		project.add_setting(name="max_iterations", value=300)
+		
+		# create a solver instance
+		solver = HyperoptSolver(project)
+		# pass the loss function to the solver
+		solver.blackbox = my_loss_func
+		# run the solver
+		solver.run()
+		
+		df, best = solver.get_results()
+		
+		print("\n")
+		print("*"*100)
+		print("Best Parameter Set:\n{}".format(best))
+		print("*"*100)
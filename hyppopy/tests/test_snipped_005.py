@@ -0,0 +1,48 @@
+# DKFZ
+#
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import os
+import unittest
+
+class ReadmeSnipped_005TestSuite(unittest.TestCase):
+
+	def test_scripts(self):
+
+		# import the SolverPool class
+		from hyppopy.solvers.GridsearchSolver import GridsearchSolver
+		
+		# Import the HyppopyProject class
+		from hyppopy.HyppopyProject import HyppopyProject
+		
+		# Our function to optimize
+		def my_loss_func(x, y):
+		    return x**2+y**2
+		
+		# Creating a HyppopyProject instance
+		project = HyppopyProject()
+		project.add_hyperparameter(name="x", domain="uniform", data=[-1.1, 1], frequency=10, type=float)
+		project.add_hyperparameter(name="y", domain="uniform", data=[-1.1, 1], frequency=12, type=float)
+		
+		solver = GridsearchSolver(project=project)
+		
+		# pass the loss function to the solver
+		solver.blackbox = my_loss_func
+		# run the solver
+		solver.run()
+		
+		df, best = solver.get_results()
+		
+		print("\n")
+		print("*"*100)
+		print("Best Parameter Set:\n{}".format(best))
+		print("*"*100)
@@ -0,0 +1,75 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import unittest
+
+from hyppopy.solvers.SobolSolver import *
+from hyppopy.FunctionSimulator import FunctionSimulator
+from hyppopy.HyppopyProject import HyppopyProject
+
+
+class SobolTestSuite(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_solver_complete(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "normal",
+                    "data": [300, 700],
+                    "type": float
+                },
+                "axis_01": {
+                    "domain": "loguniform",
+                    "data": [0.01, 0.8],
+                    "type": float
+                },
+                "axis_02": {
+                    "domain": "uniform",
+                    "data": [3.5, 6.5],
+                    "type": float
+                },
+                "axis_03": {
+                    "domain": "categorical",
+                    "data": ["a", "b", "c"],
+                    "type": str
+                }
+            },
+            "max_iterations": 96,
+            "seed": 1
+        }
+
+        project = HyppopyProject(config)
+        solver = SobolSolver(project)
+        vfunc = FunctionSimulator()
+        vfunc.load_default()
+        solver.blackbox = lambda axis_00, axis_01, axis_02, axis_03: vfunc(axis_00=axis_00, axis_01=axis_01,
+                                                                           axis_02=axis_02)
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 96)
+        self.assertTrue(300 <= best['axis_00'] <= 700)
+        self.assertTrue(0.01 <= best['axis_01'] <= 0.8)
+        self.assertTrue(3.5 <= best['axis_02'] <= 6.5)
+        for value in ["a", "b", "c"]:
+            self.assertTrue(28 <= list(df['axis_03']).count(value) <= 36)
+
+        for status in df['status']:
+            self.assertTrue(status)
+        for loss in df['losses']:
+            self.assertTrue(isinstance(loss, float))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,6 +35,9 @@ class SolverPoolTestSuite(unittest.TestCase):
         self.assertTrue("optuna" in names)
         self.assertTrue("randomsearch" in names)
         self.assertTrue("quasirandomsearch" in names)
+        self.assertTrue("latinhypercube" in names)
+        self.assertTrue("sobol" in names)
+        self.assertTrue("tpe" in names)
         self.assertTrue("gridsearch" in names)
 
     def test_getHyperoptSolver(self):
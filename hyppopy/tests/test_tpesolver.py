@@ -0,0 +1,221 @@
+# Hyppopy - A Hyper-Parameter Optimization Toolbox
+#
+# Copyright (c) German Cancer Research Center,
+# Division of Medical Image Computing.
+# All rights reserved.
+#
+# This software is distributed WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR
+# A PARTICULAR PURPOSE.
+#
+# See LICENSE
+
+import unittest
+import numpy as np
+from unittest import mock
+
+from hyppopy.solvers.TPESolver import *
+from hyppopy.solvers.RandomsearchSolver import draw_samples
+from hyppopy.Trials import Trials
+from hyppopy.BlackboxFunction import BlackboxFunction
+from hyppopy.FunctionSimulator import FunctionSimulator
+from hyppopy.HyppopyProject import HyppopyProject
+from hyppopy.tests.helpers import AsyncBlackboxFunction
+
+
+class TPETestSuite(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_parzen_estimator(self):
+        rng = np.random.default_rng(0)
+        axis = get_axis("x", {"domain": "uniform", "data": [0, 10], "type": float})
+        estimator = ParzenEstimator(axis, np.array([2.0, 2.1, 1.9, 2.05]))
+        samples = estimator.sample(1000, rng)
+        self.assertTrue(np.all(samples >= 0) and np.all(samples <= 10))
+        self.assertTrue(np.mean(samples < 5) > 0.7)
+        log_pdf = estimator.log_pdf(np.array([2.0, 8.0]))
+        self.assertTrue(log_pdf[0] > log_pdf[1])
+        z = np.linspace(0, 10, 10001)
+        self.assertAlmostEqual(np.sum(np.exp(estimator.log_pdf(z))) * (z[1] - z[0]), 1.0, places=2)
+
+        axis = get_axis("c", {"domain": "categorical", "data": ["a", "b", "c"], "type": str})
+        estimator = ParzenEstimator(axis, np.array([1, 1, 1, 2]))
+        self.assertTrue(np.allclose(np.exp(estimator.log_pdf(np.arange(3))), [1 / 7, 4 / 7, 2 / 7]))
+
+        axis = get_axis("n", {"domain": "loguniform", "data": [1, 1000], "type": int})
+        self.assertAlmostEqual(axis["low"], np.log(0.5))
+        self.assertAlmostEqual(axis["high"], np.log(1000.5))
+
+    def test_trials(self):
+        trials = Trials()
+        self.assertRaises(AssertionError, getattr, trials, "argmin")
+        for tid, loss, status in [(0, 3.0, 'ok'), (1, np.nan, 'failed'), (2, 1.0, 'ok'), (3, 2.0, 'ok')]:
+            trials.trials.append({'tid': tid, 'result': {'loss': loss, 'status': status},
+                                  'misc': {'tid': tid, 'idxs': {'x': [tid]}, 'vals': {'x': [tid * 10]}}})
+        self.assertEqual(len(trials), 4)
+        self.assertEqual(trials.argmin, {'x': 20})
+        self.assertEqual(trials.statuses(), ['ok', 'failed', 'ok', 'ok'])
+
+    def test_solver_complete(self):
+        config = {
+            "hyperparameter": {
+                "axis_00": {
+                    "domain": "uniform",
+                    "data": [300, 700],
+                    "type": float
+                },
+                "axis_01": {
+                    "domain": "uniform",
+                    "data": [0, 0.8],
+                    "type": float
+                },
+                "axis_02": {
+                    "domain": "uniform",
+                    "data": [3.5, 6.5],
+                    "type": float
+                }
+            },
+            "max_iterations": 500,
+            "seed": 1
+            }
+
+        project = HyppopyProject(config)
+        solver = TPESolver(project)
+        vfunc = FunctionSimulator()
+        vfunc.load_default()
+        solver.blackbox = vfunc
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 500)
+        self.assertTrue(570 <= best['axis_00'] <= 590)
+        self.assertTrue(0.1 <= best['axis_01'] <= 0.8)
+        self.assertTrue(4.7 <= best['axis_02'] <= 5.5)
+
+        for status in df['status']:
+            self.assertTrue(status)
+        for loss in df['losses']:
+            self.assertTrue(isinstance(loss, float))
+
+    def test_solver_batches_and_history(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "normal",
+                    "data": [-5, 5],
+                    "type": float
+                },
+                "n": {
+                    "domain": "loguniform",
+                    "data": [1, 1000],
+                    "type": int
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b", "c"],
+                    "type": str
+                }
+            },
+            "max_iterations": 200,
+            "batch_size": 10,
+            "history_size": 50,
+            "seed": 3
+            }
+
+        def blackbox_func(x, n, c):
+            self.assertTrue(isinstance(n, int) and 1 <= n <= 1000)
+            return (x - 1) ** 2 + abs(np.log(n) - np.log(20)) + (0 if c == "b" else 1)
+
+        project = HyppopyProject(config)
+        solver = TPESolver(project)
+        solver.blackbox = BlackboxFunction(blackbox_func=blackbox_func)
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 200)
+        self.assertEqual(best['c'], "b")
+        self.assertTrue(0 <= best['x'] <= 2)
+        self.assertTrue(5 <= best['n'] <= 80)
+        self.assertTrue(list(df['c'][100:]).count("b") > 50)
+
+        solver = TPESolver(project)
+        solver.blackbox = BlackboxFunction(blackbox_func=blackbox_func)
+        solver.run(print_stats=False)
+        df_repeated, _ = solver.get_results()
+        self.assertEqual(list(df['losses']), list(df_repeated['losses']))
+
+    def test_solver_async(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                },
+                "c": {
+                    "domain": "categorical",
+                    "data": ["a", "b"],
+                    "type": str
+                }
+            },
+            "max_iterations": 100,
+            "asynchronous": True,
+            "seed": 3
+            }
+
+        def blackbox_func(x, c):
+            return (x - 1) ** 2 + (0 if c == "b" else 1)
+
+        solver = TPESolver(HyppopyProject(config))
+        blackbox = AsyncBlackboxFunction(4, blackbox_func=blackbox_func)
+        solver.blackbox = blackbox
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(blackbox.max_pending, 4)
+        self.assertEqual(len(df), 100)
+        self.assertEqual(best['c'], "b")
+        self.assertTrue(0 <= best['x'] <= 2)
+
+        # without asynchronous interface the candidates are evaluated one after another
+        solver = TPESolver(HyppopyProject(config))
+        solver.blackbox = BlackboxFunction(blackbox_func=blackbox_func)
+        solver.run(print_stats=False)
+        df, best = solver.get_results()
+        self.assertEqual(len(df), 100)
+        self.assertEqual(best['c'], "b")
+
+    def test_history_startup(self):
+        config = {
+            "hyperparameter": {
+                "x": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                },
+                "y": {
+                    "domain": "uniform",
+                    "data": [-5, 5],
+                    "type": float
+                }
+            },
+            "max_iterations": 30,
+            "n_startup_trials": 10,
+            "history_size": 10,
+            "seed": 1
+            }
+
+        solver = TPESolver(HyppopyProject(config))
+        solver.blackbox = lambda x, y: x ** 2 + y ** 2
+        with mock.patch("hyppopy.solvers.TPESolver.draw_samples", wraps=draw_samples) as random_samples:
+            solver.run(print_stats=False)
+        # one draw per axis for each of the random startup proposals, the estimators propose the rest
+        self.assertEqual(random_samples.call_count, 2 * 10)
+
+        config["history_size"] = 5
+        solver = TPESolver(HyppopyProject(config))
+        solver.blackbox = lambda x, y: x ** 2 + y ** 2
+        self.assertRaises(AssertionError, solver.run, print_stats=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
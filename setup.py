@@ -39,15 +39,15 @@ setup(
     # Since this one is so simple this is empty.
     install_requires=[
 		'bayesian-optimization>=1.0.1',
-		'hyperopt>=0.1.2',
+		'hyperopt>=0.2.7',
 		'matplotlib>=3.0.3',
-		'numpy>=1.16.2',
-		'optuna>=0.9.0',
+		'numpy>=1.17.0',
+		'optuna>=3.1.0',
 		'Optunity>=1.1.1',
 		'pandas>=0.24.2',
 		'pytest>=4.3.1',
 		'scikit-learn>=0.20.3',
-		'scipy>=1.2.1',
+		'scipy>=1.7.0',
 		'visdom>=0.1.8.8'
 	],
 )